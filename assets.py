@@ -0,0 +1,87 @@
+# Central asset registry: every sprite, sound and font is loaded once at startup and shared from then on.
+
+from pathlib import Path
+import random
+import pygame
+from engine import SHIPS
+
+SPRITES = {"hit": "./Sprites/hit.png",
+           "miss": "./Sprites/miss.png",
+           "rotate": "./Sprites/Rotate_button.png",
+           "lock-in": "./Sprites/lock-in_button.png"}
+
+SOUNDS = {"boom": ["./Sounds/boom1.mp3", "./Sounds/boom2.mp3", "./Sounds/boom3.mp3"],
+          "splash": ["./Sounds/splash1.mp3", "./Sounds/splash2.mp3", "./Sounds/splash3.mp3"],
+          "sink": "./Sounds/sink.mp3",
+          "bgm": "./Sounds/valkyries.mid"}
+
+# name -> (font file, size). A file of None uses pygame's default font.
+FONTS = {"title_60": ("./Fonts/INVASION2000.TTF", 60),
+         "title_80": ("./Fonts/INVASION2000.TTF", 80),
+         "grid_header": ("./Fonts/ARCADECLASSIC.TTF", 35),
+         "instruction": (None, 42),
+         "body": ("./Fonts/INVASION2000.TTF", 35),
+         "overlay": (None, 20)}
+
+
+class AssetRegistry:
+    """Loads the SPRITES, ship sprites, SOUNDS and FONTS once and hands out shared instances.
+    load() must be called after the display mode is set, as sprites are converted to the display format."""
+    def __init__(self):
+        self.sprites = {}  # Path -> Surface
+        self.scaled = {}  # (Path, scale) -> Surface, made on first use
+        self.rotated = {}  # (Path, scale) -> (Surface turned a quarter turn for vertical ships, Surface)
+        self.sounds = {}  # sound name -> list of decoded Sound variants
+        self.fonts = {}  # font name -> Font
+
+    def load(self, ship_sprites=(), ship_scale=1):
+        """ship_sprites are the image paths of any ships beyond those in SHIPS, e.g. from a GameConfig. Every ship
+        sprite is also prepared in both orientations at ship_scale, the scale the ships are drawn at."""
+        ship_paths = [ship[1] for ship in SHIPS.values()] + list(ship_sprites)
+        for path in list(SPRITES.values()) + ship_paths:
+            self.sprites[Path(path)] = pygame.image.load(Path(path)).convert_alpha()
+        for path in ship_paths:
+            self.ship_sprites(path, ship_scale)
+        # The background music is streamed by pygame.mixer.music rather than decoded up front
+        if pygame.mixer.get_init():
+            for name, paths in SOUNDS.items():
+                if name != "bgm":
+                    paths = paths if isinstance(paths, list) else [paths]
+                    self.sounds[name] = [pygame.mixer.Sound(Path(path)) for path in paths]
+        for name, (path, size) in FONTS.items():
+            if path is None:
+                self.fonts[name] = pygame.font.SysFont(None, size)
+            else:
+                self.fonts[name] = pygame.font.Font(Path(path), size)
+
+    def sprite(self, path, scale=1) -> pygame.Surface:
+        """Returns the shared surface for an image path, which may be given as a str or Path, optionally scaled.
+        Surfaces are shared, so callers must not draw onto them."""
+        if scale == 1:
+            return self.sprites[Path(path)]
+        key = (Path(path), scale)
+        if key not in self.scaled:
+            image = self.sprites[Path(path)]
+            size = (max(round(image.get_width() * scale), 1), max(round(image.get_height() * scale), 1))
+            self.scaled[key] = pygame.transform.smoothscale(image, size)
+        return self.scaled[key]
+
+    def ship_sprites(self, path, scale=1) -> tuple:
+        """Returns the shared (vertical, horizontal) surfaces of a ship sprite, so it can be indexed by whether the
+        ship is horizontal and turning it is a lookup."""
+        key = (Path(path), scale)
+        if key not in self.rotated:
+            image = self.sprite(path, scale)
+            self.rotated[key] = (pygame.transform.rotate(image, 90), image)
+        return self.rotated[key]
+
+    def sound(self, name: str):
+        """Returns one of the decoded variants of a sound at random, or None if the mixer is unavailable."""
+        variants = self.sounds.get(name)
+        return random.choice(variants) if variants else None
+
+    def font(self, name: str) -> pygame.font.Font:
+        return self.fonts[name]
+
+
+assets = AssetRegistry()
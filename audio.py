@@ -0,0 +1,67 @@
+# Sound effects and background music. Effects play from the copies assets.load() decoded at startup, each category
+# on its own reserved channels so a sink never has to wait for, or cut off, the hit that came just before it.
+
+from pathlib import Path
+import pygame
+from assets import SOUNDS, assets
+
+# Effect category -> (sound in SOUNDS, channels reserved for it)
+EFFECTS = {"hit": ("boom", 2),
+           "miss": ("splash", 2),
+           "sink": ("sink", 2)}
+
+
+class Audio:
+    """Plays effects on a fixed pool of channels per category, and streams the background MIDI, which is only
+    loaded once however many games are played. Everything is silently skipped when there is no mixer, e.g. no
+    audio device, or the music can't be played."""
+    def __init__(self):
+        self.pools = {}  # category -> its reserved Channels
+        self.next_channel = {}  # category -> index in its pool of the channel to take over if all are busy
+        self.music_loaded = False
+
+    def init(self):
+        """Reserves the channel pools and loads the music. Call after pygame.init() and assets.load()."""
+        if not pygame.mixer.get_init():
+            return
+        reserved = sum(count for _, count in EFFECTS.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), reserved))
+        # Reserved channels are never picked by Sound.play(), so the pools are only ever used from here
+        pygame.mixer.set_reserved(reserved)
+        first = 0
+        for category, (_, count) in EFFECTS.items():
+            self.pools[category] = [pygame.mixer.Channel(index) for index in range(first, first + count)]
+            self.next_channel[category] = 0
+            first += count
+        try:
+            pygame.mixer.music.load(Path(SOUNDS["bgm"]))
+            self.music_loaded = True
+        except pygame.error:
+            pass
+
+    def channel(self, category: str):
+        """Returns an idle channel from the category's pool, or if all are busy takes them over in turn."""
+        pool = self.pools[category]
+        for channel in pool:
+            if not channel.get_busy():
+                return channel
+        index = self.next_channel[category]
+        self.next_channel[category] = (index + 1) % len(pool)
+        return pool[index]
+
+    def play(self, category: str):
+        """Plays a random variant of the category's sound, "hit", "miss" or "sink"."""
+        sound = assets.sound(EFFECTS[category][0])
+        if sound and category in self.pools:
+            self.channel(category).play(sound)
+
+    def start_music(self):
+        """Plays the background music from the beginning."""
+        if self.music_loaded:
+            try:
+                pygame.mixer.music.play()
+            except pygame.error:
+                pass
+
+
+audio = Audio()
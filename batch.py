@@ -0,0 +1,241 @@
+# Lockstep batch engine: plays many computer vs computer games at once as NumPy arrays. Run with:
+# python batch.py [num_games] [seed] [--targeting FIRST SECOND] [--config PATH]
+# Each player's board in every game is a row of an (N, rows, cols) array, fleets are placed in bulk by
+# PlacementEngine.sample_batch and every step fires one shot in every unfinished game, so the Python overhead is
+# paid once per step rather than once per shot. The players follow RandomStrategy ("random") or EnemyAi's hunt/target
+# heuristics ("hunt") move for move, and ships sink and games are won as on engine.Board.
+
+import argparse
+import time
+
+import numpy as np
+
+from engine import SHIPS, GameResult
+from placement import placement_engine
+
+
+class BatchGames:
+    """num_games games on num_rows x num_cols boards between two players, player 0 firing first in every game.
+    targeting gives each player's mode, "random" or "hunt", and fleet maps ship names to lengths, by default the
+    ships in SHIPS. With play_out the loser keeps firing after the game is won, as in engine.play_game."""
+    TARGETING_MODES = ("random", "hunt")
+    NO_CELL = -1
+
+    def __init__(self, num_games: int, num_rows=10, num_cols=10, targeting=("hunt", "hunt"), fleet=None, seed=None,
+                 play_out=False):
+        for mode in targeting:
+            if mode not in self.TARGETING_MODES:
+                raise ValueError(f"Unknown batch targeting mode {mode!r}")
+        self.num_games = num_games
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.targeting = tuple(targeting)
+        self.fleet = dict(fleet or {name: ship[0] for name, ship in SHIPS.items()})
+        self.play_out = play_out
+        self.rng = np.random.default_rng(seed)
+        num_cells = num_rows * num_cols
+        # ships[player, game] is the player's own board, each cell holding the index of its ship in fleet or -1;
+        # shot[player, game] marks the cells of that board the other player has fired at
+        self.ships = np.stack([self.place_fleets() for _ in range(2)])
+        self.shot = np.zeros((2, num_games, num_rows, num_cols), dtype=bool)
+        self.afloat_cells = np.tile(np.array(list(self.fleet.values()), dtype=np.int32), (2, num_games, 1))
+        self.shots = np.zeros((num_games, 2), dtype=np.int32)
+        self.turn = np.zeros(num_games, dtype=np.int8)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+        self.finished = np.zeros(num_games, dtype=bool)
+        # The flat cell of each player's first and second hit on the ship it chases, as HitLog keeps them
+        self.first_hit = np.full((2, num_games), self.NO_CELL, dtype=np.int64)
+        self.second_hit = np.full((2, num_games), self.NO_CELL, dtype=np.int64)
+        self.first_miss = np.zeros((2, num_games), dtype=bool)
+        self.second_miss = np.zeros((2, num_games), dtype=bool)
+        # Random picks walk a shuffled order of the cells per player and game, skipping those already fired at,
+        # which draws uniformly from the untried cells without new random numbers for every cell on every shot
+        self.firing_order = self.rng.random((2, num_games, num_cells)).argsort(axis=2).astype(np.int32)
+        self.next_in_order = np.zeros((2, num_games), dtype=np.int64)
+
+    def place_fleets(self) -> np.ndarray:
+        """Returns an (N, rows, cols) array of ship indexes, each game's fleet drawn as Strategy.randomise_ships
+        draws one."""
+        lengths = tuple(self.fleet.values())
+        engine = placement_engine(self.num_rows, self.num_cols, lengths)
+        fleets = engine.sample_batch(self.num_games, seed=self.rng.integers(1 << 63))
+        boards = np.full((self.num_games, self.num_rows * self.num_cols), -1, dtype=np.int8)
+        games = np.arange(self.num_games)
+        for ship, length in enumerate(lengths):
+            starting_x, starting_y, horizontal = fleets[:, ship].T
+            step = np.where(horizontal, 1, self.num_cols)
+            first = starting_y * self.num_cols + starting_x
+            for offset in range(length):
+                boards[games, first + offset * step] = ship
+        return boards.reshape(self.num_games, self.num_rows, self.num_cols)
+
+    def run(self) -> tuple:
+        """Plays every game to the end. Returns (winner, shots): the winning player of each game, and the shots
+        each player fired in it as an (N, 2) array."""
+        while not self.finished.all():
+            self.step()
+        return self.winner, self.shots
+
+    def results(self) -> list:
+        """Plays every game to the end and returns a GameResult per game, as engine.simulate does."""
+        winner, shots = self.run()
+        return [GameResult(int(game_winner), tuple(int(count) for count in game_shots))
+                for game_winner, game_shots in zip(winner, shots)]
+
+    def step(self):
+        """Fires one shot in every unfinished game, from whichever player's turn it is there."""
+        for player in (0, 1):
+            games = np.flatnonzero(~self.finished & (self.turn == player))
+            if len(games):
+                self.fire(player, games, self.pick_targets(player, games))
+
+    def fire(self, player: int, games: np.ndarray, targets: np.ndarray):
+        """Fires player's shots at the flat cells targets of the other player's boards in games, and applies the
+        sink and win rules."""
+        opponent = 1 - player
+        cells = games * (self.num_rows * self.num_cols) + targets
+        self.shot[opponent].reshape(-1)[cells] = True
+        self.shots[games, player] += 1
+        ship = self.ships[opponent].reshape(-1)[cells].astype(np.int64)
+        hit = ship >= 0
+        afloat_cells = self.afloat_cells[opponent]
+        ships_hit = games[hit] * afloat_cells.shape[1] + ship[hit]
+        afloat_cells.reshape(-1)[ships_hit] -= 1
+        sunk = np.zeros(len(games), dtype=bool)
+        sunk[hit] = afloat_cells.reshape(-1)[ships_hit] == 0
+        won = sunk.copy()
+        if sunk.any():
+            won[sunk] = ~afloat_cells[games[sunk]].any(axis=1)
+        if self.targeting[player] == "hunt":
+            self.record_results(player, games, targets, hit, sunk)
+        first_win = won & (self.winner[games] < 0)
+        self.winner[games[first_win]] = player
+        # As in play_game: the first win ends the game unless it is played out, and then the loser's win ends it
+        self.finished[games[won & (~first_win | (not self.play_out))]] = True
+        self.turn[games[(self.winner[games] < 0) | first_win]] = opponent
+
+    def record_results(self, player: int, games: np.ndarray, targets: np.ndarray, hit: np.ndarray, sunk: np.ndarray):
+        """HitLog.record for every game in games at once."""
+        first_hit, second_hit = self.first_hit[player], self.second_hit[player]
+        first_miss, second_miss = self.first_miss[player], self.second_miss[player]
+        new_first = hit & (first_hit[games] == self.NO_CELL)
+        first_hit[games[new_first]] = targets[new_first]
+        new_second = hit & ~new_first
+        second_hit[games[new_second]] = targets[new_second]
+        chasing = ~hit & (first_hit[games] != self.NO_CELL) & (second_hit[games] != self.NO_CELL)
+        missed_before = first_miss[games]
+        first_miss[games[chasing & ~missed_before]] = True
+        second_miss[games[chasing & missed_before]] = True
+        reset = games[sunk]
+        first_hit[reset] = self.NO_CELL
+        second_hit[reset] = self.NO_CELL
+        first_miss[reset] = False
+        second_miss[reset] = False
+
+    def pick_targets(self, player: int, games: np.ndarray) -> np.ndarray:
+        """EnemyAi.enemy_turn for every game in games at once, returning the flat cell each fires at."""
+        targets = np.full(len(games), self.NO_CELL, dtype=np.int64)
+        if self.targeting[player] == "hunt":
+            first_hit, second_hit = self.first_hit[player], self.second_hit[player]
+            # Two misses after two hits send the search back to the cells around the first hit for good
+            second_hit[games[self.second_miss[player, games]]] = self.NO_CELL
+            chasing_line = (first_hit[games] != self.NO_CELL) & (second_hit[games] != self.NO_CELL)
+            if chasing_line.any():
+                targets[chasing_line] = self.pick_after_second_hit(player, games[chasing_line])
+                # A line that can't be followed any further is dropped, as pick_target_after_second_hit does
+                second_hit[games[chasing_line & (targets == self.NO_CELL)]] = self.NO_CELL
+            around_first = (targets == self.NO_CELL) & (first_hit[games] != self.NO_CELL)
+            if around_first.any():
+                targets[around_first] = self.pick_after_first_hit(player, games[around_first])
+        unpicked = targets == self.NO_CELL
+        if unpicked.any():
+            targets[unpicked] = self.random_picks(player, games[unpicked])
+        return targets
+
+    def untried(self, player: int, games: np.ndarray, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """Whether each (rows, columns) cell, an array per game, is on the board and not yet fired at by player."""
+        on_board = (rows >= 0) & (rows < self.num_rows) & (columns >= 0) & (columns < self.num_cols)
+        cells = games[:, None] * (self.num_rows * self.num_cols) + np.where(on_board, rows * self.num_cols + columns, 0)
+        return on_board & ~self.shot[1 - player].reshape(-1)[cells]
+
+    def choose(self, rows: np.ndarray, columns: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Picks one valid candidate per game uniformly at random, returning its flat cell or NO_CELL."""
+        keys = np.where(valid, self.rng.random(valid.shape), -1.0)
+        choice = keys.argmax(axis=1)
+        picked = np.arange(len(valid))
+        cells = rows[picked, choice] * self.num_cols + columns[picked, choice]
+        return np.where(valid.any(axis=1), cells, self.NO_CELL)
+
+    def pick_after_first_hit(self, player: int, games: np.ndarray) -> np.ndarray:
+        """A random untried neighbour of each game's first hit, or NO_CELL if it has none."""
+        row, column = np.divmod(self.first_hit[player, games], self.num_cols)
+        rows = row[:, None] + np.array([1, -1, 0, 0])
+        columns = column[:, None] + np.array([0, 0, 1, -1])
+        return self.choose(rows, columns, self.untried(player, games, rows, columns))
+
+    def pick_after_second_hit(self, player: int, games: np.ndarray) -> np.ndarray:
+        """The nearest untried cells beyond either end of each game's line of two hits, one picked at random,
+        or NO_CELL if the line runs off the board before finding one."""
+        first_row, first_column = np.divmod(self.first_hit[player, games], self.num_cols)
+        second_row, second_column = np.divmod(self.second_hit[player, games], self.num_cols)
+        same_row = first_row == second_row
+        # The line runs along the row if both hits are on it and down the first hit's column otherwise, and the
+        # candidates at each distance are that far beyond its far end and before its near end
+        ends = np.stack([np.where(same_row, first_row, np.maximum(first_row, second_row)),
+                         np.where(same_row, np.maximum(first_column, second_column), first_column),
+                         np.where(same_row, first_row, np.minimum(first_row, second_row)),
+                         np.where(same_row, np.minimum(first_column, second_column), first_column)], axis=1)
+        steps = np.stack([~same_row, same_row], axis=1).astype(np.int64)
+        steps = np.concatenate([steps, -steps], axis=1)
+        targets = np.full(len(games), self.NO_CELL, dtype=np.int64)
+        left = np.arange(len(games))
+        for distance in range(1, max(self.num_rows, self.num_cols) + 1):
+            cells = ends[left] + distance * steps[left]
+            rows, columns = cells[:, 0::2], cells[:, 1::2]
+            targets[left] = self.choose(rows, columns, self.untried(player, games[left], rows, columns))
+            left = left[targets[left] == self.NO_CELL]
+            if not len(left):
+                break
+        return targets
+
+    def random_picks(self, player: int, games: np.ndarray) -> np.ndarray:
+        """A cell drawn uniformly from each game's untried cells: the next untried one in its firing order."""
+        num_cells = self.num_rows * self.num_cols
+        order, position = self.firing_order[player].reshape(-1), self.next_in_order[player]
+        shot = self.shot[1 - player].reshape(-1)
+        waiting = games
+        while len(waiting):
+            offsets = waiting * num_cells
+            waiting = waiting[shot[offsets + order[offsets + position[waiting]]]]
+            position[waiting] += 1
+        return order[games * num_cells + position[games]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play computer vs computer games in a NumPy batch.")
+    parser.add_argument("num_games", type=int, nargs="?", default=100000)
+    parser.add_argument("seed", type=int, nargs="?", default=None)
+    parser.add_argument("--targeting", nargs=2, choices=BatchGames.TARGETING_MODES, default=["hunt", "hunt"],
+                        metavar=("FIRST", "SECOND"), help="targeting mode of each player (random or hunt)")
+    parser.add_argument("--config", metavar="PATH", help="JSON board size and fleet (see config.py)")
+    args = parser.parse_args()
+    if args.num_games < 1:
+        parser.error("num_games must be at least 1")
+    options = {}
+    if args.config:
+        from config import GameConfig
+        try:
+            config = GameConfig.load(args.config)
+        except (OSError, ValueError) as error:
+            parser.error(f"can't use {args.config}: {error}")
+        options = {"num_rows": config.num_rows, "num_cols": config.num_cols, "fleet": config.fleet}
+    start = time.perf_counter()
+    winner, shots = BatchGames(args.num_games, targeting=args.targeting, seed=args.seed, **options).run()
+    elapsed = time.perf_counter() - start
+    print(f"{args.num_games} games in {elapsed:.2f}s ({args.num_games / elapsed:.0f} games/sec)")
+    print(f"First player win rate: {np.mean(winner == 0):.1%}")
+    print(f"Mean shots to win: {shots[np.arange(args.num_games), winner].mean():.1f}")
+
+
+if __name__ == '__main__':
+    main()
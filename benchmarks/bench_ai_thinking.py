@@ -0,0 +1,61 @@
+# Measures how long frames take while the enemy works out its moves on EnemyThinker's thread, against how long a
+# move takes to think about, which is how long every frame would stall if the move were worked out in the frame.
+
+import random
+import time
+
+from benchmarks.common import use_dummy_drivers
+
+use_dummy_drivers()
+
+import main  # noqa: E402  (dummy drivers must be set before pygame starts)
+from metrics import Histogram, metrics  # noqa: E402
+
+MOVES = 10
+THINK_TIMES = [0.05, 0.25, 1.0]
+FRAME_MS = 1000 // main.FPS
+
+
+def play_moves(think_time: float) -> tuple:
+    """Plays MOVES turns each against a perfect EnemyAi, drawing frames as fast as possible on a game clock that
+    moves on a frame's worth each one. Returns the Histogram of frame times while the enemy was thinking and
+    the mean think time in milliseconds."""
+    random.seed(1)
+    game = main.Game(difficulty="perfect", think_time=think_time)
+    now = [0]
+    game.scheduler.clock = lambda: now[0]
+    for row, ship in enumerate(game.ship_list.sprites()):
+        ship.rect.midleft = game.player_grid.cell_at(0, row).rect.midleft
+    _, game.instruction_text = main.lock_in_ships(game.player_grid, True, game.ship_list)
+    game.ships_locked_in()
+    targets = list(game.enemy_grid.cells)
+    random.shuffle(targets)
+    frames = Histogram()
+    think = metrics.histogram("ai_think")
+    thought = think.count
+    think_total = think.total
+    while think.count - thought < MOVES and game.phase != main.Game.GAME_OVER:
+        if game.phase == main.Game.PLAYER_TURN:
+            main.enemy_cell_clicked(game, targets.pop().rect.center)
+        start = time.perf_counter()
+        game.scheduler.run_due()
+        game.draw()
+        if game.thinker.future is not None:
+            frames.record((time.perf_counter() - start) * 1000)
+        now[0] += FRAME_MS
+    game.close()
+    return frames, (think.total - think_total) / max(think.count - thought, 1)
+
+
+def main_benchmark():
+    main.init_display()
+    print(f"{'budget':>7} {'think':>8} {'frames':>7} {'p50':>7} {'p99':>7} {'max':>7}"
+          "  (ms, frames drawn while thinking)")
+    for think_time in THINK_TIMES:
+        frames, think_ms = play_moves(think_time)
+        print(f"{think_time * 1000:>7.0f} {think_ms:>8.1f} {frames.count:>7} {frames.percentile(50):>7.2f} "
+              f"{frames.percentile(99):>7.2f} {frames.max:>7.2f}")
+
+
+if __name__ == '__main__':
+    main_benchmark()
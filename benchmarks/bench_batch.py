@@ -0,0 +1,46 @@
+# Compares the throughput of BatchGames with playing the same games one at a time through engine.simulate,
+# for each pairing of random and hunt targeting, and checks both give the same mean shots to win.
+
+import time
+
+import numpy as np
+
+from batch import BatchGames
+from engine import BitBoard, Board, simulate
+from strategies import RandomStrategy
+
+LOOP_GAMES = 2000
+BATCH_GAMES = 50000
+PAIRINGS = [("hunt", "hunt"), ("random", "hunt"), ("random", "random")]
+
+
+def bench_loop(targeting: tuple, board_class) -> tuple:
+    """Returns (games/sec, mean shots to win) of simulate."""
+    players = tuple(RandomStrategy if mode == "random" else mode for mode in targeting)
+    start = time.perf_counter()
+    results = simulate(LOOP_GAMES, 1, board_class, players)
+    elapsed = time.perf_counter() - start
+    return LOOP_GAMES / elapsed, np.mean([result.shots[result.winner] for result in results])
+
+
+def bench_batch(targeting: tuple) -> tuple:
+    """Returns (games/sec, mean shots to win) of BatchGames."""
+    start = time.perf_counter()
+    winner, shots = BatchGames(BATCH_GAMES, targeting=targeting, seed=1).run()
+    elapsed = time.perf_counter() - start
+    return BATCH_GAMES / elapsed, shots[np.arange(BATCH_GAMES), winner].mean()
+
+
+def main_benchmark():
+    print(f"{'pairing':<15} {'Board':>8} {'BitBoard':>9} {'batch':>8} {'speedup':>8}  (games/sec)   mean shots to win")
+    for targeting in PAIRINGS:
+        board_rate, board_mean = bench_loop(targeting, Board)
+        bitboard_rate, _ = bench_loop(targeting, BitBoard)
+        batch_rate, batch_mean = bench_batch(targeting)
+        speedup = batch_rate / max(board_rate, bitboard_rate)
+        print(f"{' v '.join(targeting):<15} {board_rate:>8.0f} {bitboard_rate:>9.0f} {batch_rate:>8.0f} "
+              f"{speedup:>7.1f}x   {board_mean:.1f} looped, {batch_mean:.1f} batched")
+
+
+if __name__ == '__main__':
+    main_benchmark()
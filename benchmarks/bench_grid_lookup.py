@@ -0,0 +1,41 @@
+# Measures Grid cell lookups at increasing grid sizes. The cost per call should stay flat as the grid grows.
+
+import random
+
+from benchmarks.common import time_per_call, use_dummy_drivers
+
+use_dummy_drivers()
+
+import main  # noqa: E402  (dummy drivers must be set before pygame starts)
+
+SIZES = [10, 100, 1000]
+CELL_WIDTH = 2
+CALLS = 10000
+
+
+def bench_grid(size: int) -> dict:
+    grid = main.Grid(num_rows=size, num_cols=size, cell_width=CELL_WIDTH)
+    grid.create_cells()
+    pixel_span = size * CELL_WIDTH
+    points = [(grid.x_loc + random.randrange(pixel_span), grid.y_loc + random.randrange(pixel_span))
+              for _ in range(CALLS)]
+    coordinates = [(random.randrange(size), random.randrange(size)) for _ in range(CALLS)]
+    return {
+        "get_cell": time_per_call(grid.get_cell, points),
+        "return_cell": time_per_call(grid.return_cell, [(coords,) for coords in coordinates]),
+        "check_ship": time_per_call(grid.check_ship, [(point, True) for point in points]),
+        "update_cells_with_ship": time_per_call(grid.update_cells_with_ship,
+                                                [(x, y, "Battleship", 5, True) for x, y in coordinates]),
+    }
+
+
+def main_benchmark():
+    print(f"{'size':>11} {'get_cell':>10} {'return_cell':>12} {'check_ship':>11} {'update_ship':>12}  (ns/call)")
+    for size in SIZES:
+        result = bench_grid(size)
+        print(f"{size:>5}x{size:<5} {result['get_cell'] * 1e9:>10.0f} {result['return_cell'] * 1e9:>12.0f} "
+              f"{result['check_ship'] * 1e9:>11.0f} {result['update_cells_with_ship'] * 1e9:>12.0f}")
+
+
+if __name__ == '__main__':
+    main_benchmark()
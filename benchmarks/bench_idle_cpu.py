@@ -0,0 +1,75 @@
+# Measures the CPU the frame loop uses in each phase of a game, as a share of one core, against a loop that draws
+# every frame at the FPS cap whether or not anything changed.
+
+import time
+
+from benchmarks.common import use_dummy_drivers
+
+use_dummy_drivers()
+
+import pygame  # noqa: E402
+import main  # noqa: E402  (dummy drivers must be set before pygame starts)
+
+SECONDS = 3.0
+
+
+def cpu_share(frame, before_frame=None) -> tuple:
+    """Runs frame repeatedly for SECONDS and returns (CPU time / wall time, frames run)."""
+    frames = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while time.perf_counter() - wall_start < SECONDS:
+        if before_frame:
+            before_frame()
+        frame()
+        frames += 1
+    return (time.process_time() - cpu_start) / (time.perf_counter() - wall_start), frames
+
+
+def main_benchmark():
+    main.init_display()
+    clock = pygame.time.Clock()
+    overlay_list = pygame.sprite.GroupSingle()
+    overlay = main.MetricsOverlay(clock)
+
+    def fixed_rate_frame(game):
+        pygame.event.get()
+        game.scheduler.run_due()
+        game.draw(overlay_list)
+        clock.tick(main.FPS)
+
+    def phases():
+        game = main.Game()
+        game.draw(overlay_list)
+        yield "setup, idle", game, None
+        game.selected = 0
+        ship = game.ship_list.sprites()[0]
+        game.shipmove_x = game.shipmove_y = 0
+
+        def drag():
+            x = main.layout.player_grid_x + (ship.rect.x + 7) % 200
+            pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(x, main.layout.grid_top + 20),
+                                                 rel=(7, 0), buttons=(0, 0, 0)))
+        yield "setup, dragging", game, drag
+        game.selected = None
+        for row, ship in enumerate(game.ship_list.sprites()):
+            ship.rect.midleft = game.player_grid.cell_at(0, row).rect.midleft
+        _, game.instruction_text = main.lock_in_ships(game.player_grid, True, game.ship_list)
+        game.ships_locked_in()
+        main.enemy_cell_clicked(game, game.enemy_grid.cell_at(0, 0).rect.center)
+        yield "enemy turn", game, None
+        game.close()
+
+    print(f"{'phase':<18} {'adaptive':>9} {'frames':>7} {'every frame':>12} {'frames':>7}  (% of a core)")
+    for (name, game, before_frame), fixed in zip(phases(), [True, False, True]):
+        adaptive, frames = cpu_share(lambda: main.run_frame(game, clock, overlay_list, overlay), before_frame)
+        line = f"{name:<18} {adaptive:>9.1%} {frames:>7}"
+        if fixed:
+            # Only phases that end on their own or repeat can be measured again from the same state
+            fixed_share, fixed_frames = cpu_share(lambda: fixed_rate_frame(game), before_frame)
+            line += f" {fixed_share:>12.1%} {fixed_frames:>7}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,95 @@
+# Measures the construction time and memory of a Grid's cells at increasing grid sizes, and of many computer
+# players' boards in one process, the cost of every game a server or tournament holds at once, and the pixel memory
+# and rotate time of the ship sprites of many fleets.
+
+import time
+import tracemalloc
+
+import pygame
+
+from benchmarks.common import use_dummy_drivers
+
+use_dummy_drivers()
+
+import main  # noqa: E402  (dummy drivers must be set before pygame starts)
+from engine import Board, EnemyAi  # noqa: E402
+
+SIZES = [10, 100, 1000]
+CELL_WIDTH = 2
+PLAYERS = 1000
+FLEETS = 100
+
+
+def measure(build) -> tuple:
+    """Returns the seconds build takes and the bytes of Python memory still held by what it returns."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return elapsed, held
+
+
+def bench_cells(size: int) -> tuple:
+    def build():
+        grid = main.Grid(num_rows=size, num_cols=size, cell_width=CELL_WIDTH)
+        grid.create_cells()
+        return grid
+    return measure(build)
+
+
+def bench_players(count: int) -> tuple:
+    def build():
+        players = [EnemyAi(Board(10, 10)) for _ in range(count)]
+        for player in players:
+            player.randomise_ships()
+        return players
+    return measure(build)
+
+
+def bench_ships(count: int) -> tuple:
+    """Builds count fleets of Ships and turns every ship upright and back. Returns the mean microseconds a
+    rotate takes, the same with the old per-call pygame.transform.rotate, and the bytes of pixels the ships
+    refer to, counting each distinct Surface once."""
+    fleets = []
+    for _ in range(count):
+        ships = pygame.sprite.Group()
+        main.create_ships(ships)
+        fleets.append(ships.sprites())
+    ships = [ship for fleet in fleets for ship in fleet]
+    start = time.perf_counter()
+    for ship in ships:
+        ship.rotate(0, 0)
+        ship.rotate(0, 0)
+    lookup = (time.perf_counter() - start) / (2 * len(ships))
+    start = time.perf_counter()
+    for ship in ships:
+        for _ in range(2):
+            image = pygame.transform.rotate(ship.image, 90)
+            rect = image.get_rect()
+            rect.centerx = rect.centery = 0
+    transform = (time.perf_counter() - start) / (2 * len(ships))
+    surfaces = {id(image): image for ship in ships for image in ship.images}
+    pixels = sum(image.get_bytesize() * image.get_width() * image.get_height() for image in surfaces.values())
+    return lookup * 1e6, transform * 1e6, pixels
+
+
+def main_benchmark():
+    print("Timed under tracemalloc, which slows allocation, so times are for comparison between runs only")
+    print(f"{'grid':>11} {'create_cells':>13} {'memory':>10} {'per cell':>9}")
+    for size in SIZES:
+        elapsed, held = bench_cells(size)
+        print(f"{size:>5}x{size:<5} {elapsed * 1e3:>11.1f}ms {held / 1e6:>8.2f}MB {held / size ** 2:>8.0f}B")
+    elapsed, held = bench_players(PLAYERS)
+    print(f"{PLAYERS} placed EnemyAi fleets on 10x10 Boards: {elapsed * 1e3:.1f}ms, {held / 1e6:.2f}MB "
+          f"({held / PLAYERS / 1e3:.1f}kB each)")
+    main.init_display()
+    lookup, transform, pixels = bench_ships(FLEETS)
+    print(f"{FLEETS} fleets of ship sprites: {pixels / 1e3:.0f}kB of pixels shared by all, rotate {lookup:.2f}us "
+          f"(pygame.transform.rotate {transform:.2f}us)")
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,37 @@
+# Measures shots per second and shot round trip latency of the game server, with scripted clients playing
+# concurrent games against it over localhost. Server and clients share one event loop, and so one CPU.
+
+import asyncio
+import time
+
+from client import play_scripted_games
+from server import GameServer
+
+GAME_COUNTS = [1, 100, 1000]
+
+
+async def bench_network(num_games: int) -> dict:
+    game_server = GameServer()
+    server = await game_server.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    players = await play_scripted_games(num_games, port=port)
+    elapsed = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+    game_server.close()
+    latencies = sorted(latency for player in players for latency in player.shot_latencies)
+    return {"shots_per_sec": len(latencies) / elapsed, "p50": latencies[len(latencies) // 2],
+            "p99": latencies[int(len(latencies) * 0.99)]}
+
+
+def main_benchmark():
+    print(f"{'games':>6} {'shots/sec':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for num_games in GAME_COUNTS:
+        result = asyncio.run(bench_network(num_games))
+        print(f"{num_games:>6} {result['shots_per_sec']:>10.0f} {result['p50'] * 1e3:>8.2f} "
+              f"{result['p99'] * 1e3:>8.2f}")
+
+
+if __name__ == '__main__':
+    main_benchmark()
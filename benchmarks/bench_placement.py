@@ -0,0 +1,41 @@
+# Measures random fleet generation, one fleet at a time and in NumPy batches.
+
+import random
+import time
+
+from engine import SHIPS
+from placement import PlacementEngine
+
+SIZES = [10, 20, 50]
+SINGLE_FLEETS = 20000
+BATCH_FLEETS = 200000
+BATCH_MAX_SIZE = 20  # the batch sampler's cost grows with placements x cells, it is meant for small boards
+
+
+def bench_placement(size: int) -> dict:
+    engine = PlacementEngine(size, size, tuple(ship[0] for ship in SHIPS.values()))
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(SINGLE_FLEETS):
+        engine.sample(rng)
+    single = SINGLE_FLEETS / (time.perf_counter() - start)
+    if size > BATCH_MAX_SIZE:
+        return {"sample": single, "sample_batch": None}
+    engine.sample_batch(1)  # build the batch tables outside the timed section
+    num_fleets = BATCH_FLEETS * 100 // (size * size)
+    start = time.perf_counter()
+    engine.sample_batch(num_fleets, seed=1)
+    batch = num_fleets / (time.perf_counter() - start)
+    return {"sample": single, "sample_batch": batch}
+
+
+def main_benchmark():
+    print(f"{'size':>7} {'sample':>12} {'sample_batch':>14}  (fleets/sec)")
+    for size in SIZES:
+        result = bench_placement(size)
+        batch = f"{result['sample_batch']:.0f}" if result["sample_batch"] else "-"
+        print(f"{size:>3}x{size:<3} {result['sample']:>12.0f} {batch:>14}")
+
+
+if __name__ == '__main__':
+    main_benchmark()
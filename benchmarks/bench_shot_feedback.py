@@ -0,0 +1,78 @@
+# Measures the latency of the feedback for one shot (hit marker sprite plus explosion sound), loading the
+# files from disk each time as the game used to, and using the shared copies from the asset registry. Also
+# measures click-to-sound latency: from a click on the enemy grid being queued to the effect's channel playing,
+# through one pass of the frame loop.
+
+from pathlib import Path
+import random
+import time
+
+from benchmarks.common import use_dummy_drivers
+
+use_dummy_drivers()
+
+import pygame  # noqa: E402
+import main  # noqa: E402  (dummy drivers must be set before pygame starts)
+from assets import SOUNDS, SPRITES  # noqa: E402
+from audio import audio  # noqa: E402
+
+SHOTS = 50
+
+
+def uncached_shot():
+    image = pygame.image.load(Path(SPRITES["hit"]))
+    pygame.mixer.Sound(Path(random.choice(SOUNDS["boom"]))).play()
+    return image
+
+
+def cached_shot():
+    marker = main.CellHit(Path(SPRITES["hit"]), (100, 100))
+    main.play_sound("hit")
+    return marker
+
+
+def click_shots():
+    """Returns a function that clicks the next untried cell of a game's enemy grid and runs a frame, ready for
+    the player's turn again afterwards."""
+    game = main.Game()
+    for row, ship in enumerate(game.ship_list.sprites()):
+        ship.rect.midleft = game.player_grid.cell_at(0, row).rect.midleft
+    main.lock_in_ships(game.player_grid, True, game.ship_list)
+    game.ships_locked_in()
+    clock = pygame.time.Clock()
+    overlay_list = pygame.sprite.GroupSingle()
+    overlay = main.MetricsOverlay(clock)
+    cells = iter(game.enemy_grid.cells)
+    channels = [channel for pool in audio.pools.values() for channel in pool]
+
+    def click_shot():
+        game.phase = main.Game.PLAYER_TURN
+        game.scheduler.clear()
+        pygame.mixer.stop()
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=next(cells).rect.center, button=1))
+        main.run_frame(game, clock, overlay_list, overlay)
+        assert any(channel.get_busy() for channel in channels)
+    return click_shot
+
+
+def measure(shot) -> dict:
+    latencies = []
+    for _ in range(SHOTS):
+        start = time.perf_counter()
+        shot()
+        latencies.append(time.perf_counter() - start)
+    pygame.mixer.stop()
+    latencies.sort()
+    return {"mean": sum(latencies) / SHOTS, "p50": latencies[SHOTS // 2], "max": latencies[-1]}
+
+
+def main_benchmark():
+    main.init_display()
+    print(f"{'':>15} {'mean':>10} {'p50':>10} {'max':>10}  (ms/shot)")
+    for name, shot in (("uncached", uncached_shot), ("cached", cached_shot), ("click to sound", click_shots())):
+        result = measure(shot)
+        print(f"{name:>15} {result['mean'] * 1e3:>10.3f} {result['p50'] * 1e3:>10.3f} {result['max'] * 1e3:>10.3f}")
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,56 @@
+# Measures import time of the headless engine and of main.py, and time to first frame, each in a fresh process.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import use_dummy_drivers
+
+RUNS = 5
+
+# Each snippet prints a JSON dict of timings in seconds, measured inside the child process
+IMPORT_ENGINE = """
+import json, time
+start = time.perf_counter()
+import engine
+print(json.dumps({"import": time.perf_counter() - start}))
+"""
+
+FIRST_FRAME = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.init_display()
+game = main.Game()
+game.draw()
+print(json.dumps({"import": imported - start, "first_frame": time.perf_counter() - start}))
+"""
+
+
+def run_snippet(snippet: str) -> dict:
+    output = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True,
+                            env=os.environ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup() -> dict:
+    use_dummy_drivers()
+    engine_runs = [run_snippet(IMPORT_ENGINE) for _ in range(RUNS)]
+    main_runs = [run_snippet(FIRST_FRAME) for _ in range(RUNS)]
+    return {"import_engine": statistics.median(run["import"] for run in engine_runs),
+            "import_main": statistics.median(run["import"] for run in main_runs),
+            "first_frame": statistics.median(run["first_frame"] for run in main_runs)}
+
+
+def main_benchmark():
+    result = bench_startup()
+    print(f"import engine:       {result['import_engine'] * 1e3:8.1f} ms")
+    print(f"import main:         {result['import_main'] * 1e3:8.1f} ms")
+    print(f"time to first frame: {result['first_frame'] * 1e3:8.1f} ms  (includes import main)")
+
+
+if __name__ == '__main__':
+    main_benchmark()
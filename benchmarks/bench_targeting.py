@@ -0,0 +1,40 @@
+# Measures the time EnemyAi's density targeting takes per move over whole games at several board sizes.
+
+import random
+import time
+
+from engine import SHIPS, Board, EnemyAi
+
+SIZES = [10, 30, 100]
+GAMES = 20
+
+
+def bench_targeting(size: int) -> dict:
+    move_times = []
+    for game in range(GAMES):
+        random.seed(game)
+        board = Board(size, size)
+        EnemyAi(board).randomise_ships()
+        ai = EnemyAi(Board(size, size), targeting="density")
+        hits_needed = sum(ship[0] for ship in SHIPS.values())
+        while hits_needed:
+            start = time.perf_counter()
+            target = ai.enemy_turn()
+            result = board.fire(target)
+            ai.record_result(target, result.ship is not None, result.sunk, result.ship)
+            move_times.append(time.perf_counter() - start)
+            hits_needed -= result.ship is not None
+    move_times.sort()
+    return {"mean": sum(move_times) / len(move_times), "p99": move_times[int(len(move_times) * 0.99)],
+            "moves": len(move_times)}
+
+
+def main_benchmark():
+    print(f"{'size':>9} {'mean':>8} {'p99':>8}  (us/move)")
+    for size in SIZES:
+        result = bench_targeting(size)
+        print(f"{size:>4}x{size:<4} {result['mean'] * 1e6:>8.0f} {result['p99'] * 1e6:>8.0f}")
+
+
+if __name__ == '__main__':
+    main_benchmark()
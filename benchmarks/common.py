@@ -0,0 +1,25 @@
+# Shared helpers for the benchmark scripts.
+# Run the scripts from the repository root so the asset paths resolve, e.g. python -m benchmarks.bench_grid_lookup
+
+import os
+import time
+
+
+def use_dummy_drivers():
+    """Points SDL at its dummy video and audio drivers so benchmarks run without a display or sound card.
+    Must be called before pygame is initialised."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+
+def time_per_call(func, args_list: list, repeat=5) -> float:
+    """Calls func once for every argument tuple in args_list, repeat times over, and returns the best
+    average time per call in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        best = min(best, (time.perf_counter() - start) / len(args_list))
+    return best
@@ -0,0 +1,221 @@
+# Runs the core game benchmarks at several grid sizes and writes the results as JSON, so runs from different
+# commits can be compared. Runs under the SDL dummy drivers, from the repository root:
+# python -m benchmarks.suite [--output results.json] [--compare baseline.json]
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+
+from benchmarks.common import time_per_call, use_dummy_drivers
+
+use_dummy_drivers()
+
+import pygame  # noqa: E402
+import main  # noqa: E402  (dummy drivers must be set before pygame starts)
+from engine import Board, EnemyAi  # noqa: E402
+from events import EventStream, FleetTracker  # noqa: E402
+
+SIZES = [10, 20, 50]
+CALLS = 2000
+GAMES = 20
+GRID_PIXELS = 400  # grids are scaled to the on-screen size of the standard 10x10 grid
+
+
+def make_grid(size: int, x_loc=40, bitboard=True):
+    cell_width = GRID_PIXELS // size
+    grid = main.Grid(num_rows=size, num_cols=size, cell_width=cell_width, x_loc=x_loc, bitboard=bitboard)
+    grid.draw_grid()
+    grid.create_cells()
+    return grid
+
+
+def placed_ships(grid) -> pygame.sprite.Group:
+    """Returns the player's ship sprites, one per row down the left edge of grid, ready to be locked in."""
+    ship_list = pygame.sprite.Group()
+    main.create_ships(ship_list)
+    for row, ship in enumerate(ship_list.sprites()):
+        ship.rect.midleft = grid.cell_at(0, row).rect.midleft
+    return ship_list
+
+
+def bench_randomise_ships(size: int) -> float:
+    """Seconds per randomise_ships call on an empty board."""
+    def randomise():
+        EnemyAi(Board(size, size)).randomise_ships()
+    return time_per_call(randomise, [()] * (CALLS // 10))
+
+
+def bench_enemy_turn(size: int) -> dict:
+    """Seconds per enemy_turn over whole games of hunt targeting, each until the fleet is sunk."""
+    move_times = []
+    for game in range(GAMES):
+        random.seed(game)
+        board = Board(size, size)
+        EnemyAi(board).randomise_ships()
+        ai = EnemyAi(Board(size, size))
+        result = None
+        while not (result and result.won):
+            start = time.perf_counter()
+            target = ai.enemy_turn()
+            move_times.append(time.perf_counter() - start)
+            result = board.fire(target)
+            ai.record_result(target, result.ship is not None, result.sunk, result.ship)
+    move_times.sort()
+    return {"mean": sum(move_times) / len(move_times), "p99": move_times[int(len(move_times) * 0.99)]}
+
+
+def bench_grid(size: int) -> dict:
+    """Seconds per call of the Grid lookups used by mouse clicks, ship placement and the enemy's shots."""
+    grid = make_grid(size)
+    pixel_span = size * grid.cell_width
+    points = [(grid.x_loc + random.randrange(pixel_span), grid.y_loc + random.randrange(pixel_span))
+              for _ in range(CALLS)]
+    coordinates = [(random.randrange(size), random.randrange(size)) for _ in range(CALLS)]
+    return {"get_cell": time_per_call(grid.get_cell, points),
+            "return_cell": time_per_call(grid.return_cell, [(coords,) for coords in coordinates]),
+            "check_ship": time_per_call(grid.check_ship, [(point, True) for point in points])}
+
+
+def bench_lock_in_ships(size: int) -> float:
+    """Seconds per successful lock_in_ships of a full fleet, including clearing the grid for the next call."""
+    grid = make_grid(size)
+    ship_list = placed_ships(grid)
+
+    def lock_in():
+        setting_up, _ = main.lock_in_ships(grid, True, ship_list)
+        assert not setting_up
+        grid.clear_ships()
+    return time_per_call(lock_in, [()] * (CALLS // 10))
+
+
+def bench_drag_validation(size: int) -> float:
+    """Seconds per check of where a dragged ship would snap to and whether it fits there, as done on every
+    mouse movement while placing ships."""
+    grid = make_grid(size)
+    ship_list = placed_ships(grid)
+    ships = ship_list.sprites()
+    placements = main.ShipIndex(size, size)
+    for row, ship in enumerate(ships[1:], 1):
+        placements.place(ship.name, 0, row, ship.length, True)
+    dragged = ships[0]
+    pixel_span = size * grid.cell_width
+    points = [(grid.x_loc + random.randrange(pixel_span), grid.y_loc + random.randrange(pixel_span))
+              for _ in range(CALLS)]
+
+    def validate(point):
+        dragged.rect.midleft = point
+        snap = main.ship_snap(grid, dragged)
+        return snap and placements.fits(snap[1], snap[2], dragged.length, dragged.horizontal)
+    return time_per_call(validate, [(point,) for point in points])
+
+
+def bench_resolve_shot(size: int) -> dict:
+    """Seconds per FleetTracker.fire for a hit and a miss at random cells, with nothing subscribed. Its counters
+    make this the same at every size."""
+    result = {}
+    targets = [((random.randrange(size), random.randrange(size)),) for _ in range(CALLS)]
+    for name, ship in (("hit", "Battleship"), ("miss", None)):
+        tracker = FleetTracker({"Battleship": 10 ** 9}, EventStream(), 0)  # never sunk
+        result[name] = time_per_call(lambda target: tracker.fire(target, ship), targets)
+    return result
+
+
+def bench_refresh_screen(size: int) -> dict:
+    """Seconds per refresh_screen frame during setup: the first frame draws everything, an idle frame with
+    nothing changed draws nothing, and a dragging frame redraws one moving ship."""
+    player_grid = make_grid(size)
+    enemy_grid = make_grid(size, x_loc=720)
+    ship_list = pygame.sprite.Group()
+    main.create_ships(ship_list)
+    button_list = pygame.sprite.Group()
+    hit_list = pygame.sprite.Group()
+    text = "Move the ships to the player grid, then press 'Lock-in ships'"
+
+    def frame(invalidate=False):
+        if invalidate:
+            main.renderer.invalidate()
+        main.refresh_screen(player_grid, enemy_grid, button_list, ship_list, text, hit_list)
+
+    def drag():
+        ship = ship_list.sprites()[0]
+        ship.rect.x = 480 + (ship.rect.x + 1) % 40
+        frame()
+    frame(True)
+    return {"full": time_per_call(frame, [(True,)] * 20),
+            "idle": time_per_call(frame, [()] * CALLS),
+            "drag": time_per_call(drag, [()] * (CALLS // 10))}
+
+
+BENCHMARKS = {"randomise_ships": bench_randomise_ships,
+              "enemy_turn": bench_enemy_turn,
+              "grid": bench_grid,
+              "lock_in_ships": bench_lock_in_ships,
+              "drag_validation": bench_drag_validation,
+              "resolve_shot": bench_resolve_shot,
+              "refresh_screen": bench_refresh_screen}
+
+
+def flatten(results: dict) -> dict:
+    """Flattens {benchmark: {size: value or {name: value}}} to {"benchmark.name@size": value}."""
+    flat = {}
+    for benchmark, by_size in results.items():
+        for size, value in by_size.items():
+            for name, seconds in (value.items() if isinstance(value, dict) else [(None, value)]):
+                flat[f"{benchmark}.{name}@{size}" if name else f"{benchmark}@{size}"] = seconds
+    return flat
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes=SIZES) -> dict:
+    """Runs every benchmark at every size. Times are in seconds per call."""
+    main.init_display()
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        results[name] = {str(size): benchmark(size) for size in sizes}
+    return {"commit": git_commit(), "python": platform.python_version(), "pygame": pygame.version.ver,
+            "sizes": list(sizes), "results": results}
+
+
+def compare(baseline: dict, current: dict):
+    """Prints each benchmark's time against the baseline run's, as a ratio where above 1 is slower."""
+    before = flatten(baseline["results"])
+    after = flatten(current["results"])
+    print(f"{'benchmark':<32} {baseline['commit'] or 'baseline':>12} {current['commit'] or 'current':>12} {'ratio':>7}"
+          "  (us/call)")
+    for key, seconds in after.items():
+        if key in before:
+            print(f"{key:<32} {before[key] * 1e6:>12.2f} {seconds * 1e6:>12.2f} {seconds / before[key]:>7.2f}")
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and write the results as JSON.")
+    parser.add_argument("--output", help="file to write the JSON results to, default benchmarks-<commit>.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="grid sizes to run at")
+    args = parser.parse_args()
+
+    current = run_suite(args.sizes)
+    output = args.output or f"benchmarks-{current['commit'] or 'local'}.json"
+    with open(output, "w") as file:
+        json.dump(current, file, indent=2)
+    print(f"Wrote {output}")
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), current)
+    else:
+        for key, seconds in flatten(current["results"]).items():
+            print(f"{key:<32} {seconds * 1e6:>12.2f} us")
+
+
+if __name__ == '__main__':
+    main_benchmark()
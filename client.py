@@ -0,0 +1,141 @@
+# Clients for server.py: NetworkOpponent, polled from the pygame frame loop, and ScriptedPlayer, an asyncio
+# client driven by EnemyAi for testing the server over localhost. Run to play scripted games against a server:
+# python client.py [num_games] [--host HOST] [--port PORT]
+
+import argparse
+import asyncio
+import select
+import socket
+import time
+
+from engine import Board, EnemyAi
+from placement import placement_engine
+from protocol import (Decoder, Error, Join, JoinAi, OpponentLeft, Place, Result, Shot, Start, Turn, encode,
+                      read_message)
+from server import DEFAULT_PORT
+
+
+class NetworkOpponent:
+    """Connection to a game server standing in for EnemyAi. Messages are sent straight away and received
+    without blocking, by calling poll() once a frame."""
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = Decoder()
+        self.player = None  # our seat, 0 or 1, once the server has paired us
+        self.pending_place = None  # fleet locked in before an opponent was found, sent once we are paired
+        self.send(Join())
+
+    def send(self, message):
+        self.sock.sendall(encode(message))
+
+    def place(self, ships):
+        """Sends the player's fleet, given as sprites or FleetShips with name, column, row and horizontal."""
+        message = Place(tuple((ship.name, ship.column, ship.row, ship.horizontal) for ship in ships))
+        if self.player is None:
+            self.pending_place = message
+        else:
+            self.send(message)
+
+    def fire(self, row: int, column: int):
+        self.send(Shot(row, column))
+
+    def poll(self) -> list:
+        """Returns every message that has arrived since the last call. Raises ConnectionError if the server
+        has closed the connection."""
+        messages = []
+        if self.sock is None:
+            return messages
+        while select.select([self.sock], [], [], 0)[0]:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("The server closed the connection")
+            messages.extend(self.decoder.feed(data))
+        for message in messages:
+            if isinstance(message, Start):
+                self.player = message.player
+                if self.pending_place:
+                    self.send(self.pending_place)
+                    self.pending_place = None
+        return messages
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class ScriptedPlayer:
+    """Plays one game against the server, placing a random fleet and choosing shots with EnemyAi.
+    hosted_ai is the targeting mode of a server-side EnemyAi to play against, or None to be paired with
+    another player. shot_latencies holds the seconds from sending each shot to receiving its result."""
+    def __init__(self, targeting="hunt", hosted_ai=None):
+        self.targeting = targeting
+        self.hosted_ai = hosted_ai
+        self.shot_latencies = []
+        self.won = None  # True or False once the game is over, None if the opponent left first
+
+    async def play(self, host="127.0.0.1", port=DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            if self.hosted_ai:
+                writer.write(encode(JoinAi(EnemyAi.TARGETING_MODES.index(self.hosted_ai))))
+            else:
+                writer.write(encode(Join()))
+            start = await read_message(reader)
+            if not isinstance(start, Start):
+                raise ConnectionError(f"Expected Start, got {start}")
+            ai = EnemyAi(Board(start.num_rows, start.num_cols), self.targeting)
+            placements = placement_engine(start.num_rows, start.num_cols,
+                                          tuple(ship.length for ship in ai.ships)).sample()
+            writer.write(encode(Place(tuple((ship.name, placement.starting_x, placement.starting_y,
+                                             placement.horizontal)
+                                            for ship, placement in zip(ai.ships, placements)))))
+            sent_at = None
+            while True:
+                message = await read_message(reader)
+                if isinstance(message, Turn) and message.player == start.player:
+                    target = ai.enemy_turn()
+                    sent_at = time.perf_counter()
+                    writer.write(encode(Shot(*target)))
+                elif isinstance(message, Result):
+                    if message.shooter == start.player:
+                        self.shot_latencies.append(time.perf_counter() - sent_at)
+                        ai.record_result((message.row, message.column), message.ship is not None, message.sunk,
+                                         message.ship)
+                    if message.won:
+                        self.won = message.shooter == start.player
+                        return
+                elif isinstance(message, (Error, OpponentLeft)):
+                    if isinstance(message, Error):
+                        raise ConnectionError(f"The server rejected a move, error code {message.code}")
+                    return
+        finally:
+            writer.close()
+
+
+async def play_scripted_games(num_games: int, host="127.0.0.1", port=DEFAULT_PORT) -> list:
+    """Plays num_games games at once, each between two ScriptedPlayers, and returns the players."""
+    players = [ScriptedPlayer() for _ in range(num_games * 2)]
+    await asyncio.gather(*(player.play(host, port) for player in players))
+    return players
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play scripted games against a Battleships server.")
+    parser.add_argument("num_games", type=int, nargs="?", default=100)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    players = asyncio.run(play_scripted_games(args.num_games, args.host, args.port))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for player in players for latency in player.shot_latencies)
+    print(f"{args.num_games} games, {len(latencies)} shots in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} shots/sec)")
+    print(f"Shot latency p50 {latencies[len(latencies) // 2] * 1e3:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Board size and fleet of a game. The defaults are the classic 10x10 board and the ships in engine.SHIPS, and a JSON
+# file passed with --config overrides any of them, e.g.
+# {"rows": 12, "cols": 16, "cell_width": 32, "fleet": {"Battleship": 5, "Cruiser": 4, "Tug": [2, "./Sprites/tug.png"]}}
+# A ship is given by its length, or by [length, sprite path]. Ships named as in SHIPS keep their sprite and any other
+# is drawn with the sprite of the SHIPS ship closest in length. Replays and the network protocol identify ships by
+# their index in SHIPS, so they need a fleet made of those names.
+
+import json
+import random
+
+from engine import SHIPS
+from placement import placement_engine
+
+CONFIG_KEYS = {"rows", "cols", "cell_width", "fleet"}
+PLACEMENT_CHECKS = 64  # random fleets that must place without running out of room for a fleet to be accepted
+
+
+class GameConfig:
+    """num_rows x num_cols board drawn with cells cell_width pixels wide, and the fleet each player places.
+    fleet maps ship names to lengths, and sprites ship names to image paths. Raises ValueError if the fleet
+    can't fit on the board, or if random placement would often leave no room for its last ships."""
+    def __init__(self, num_rows=10, num_cols=10, cell_width=40, fleet=None, sprites=None):
+        if fleet is None:
+            fleet = {name: ship[0] for name, ship in SHIPS.items()}
+        if num_rows < 1 or num_cols < 1 or cell_width < 1:
+            raise ValueError("rows, cols and cell_width must be at least 1")
+        if not fleet:
+            raise ValueError("the fleet needs at least one ship")
+        for name, length in fleet.items():
+            if not 1 <= length <= max(num_rows, num_cols):
+                raise ValueError(f"{name} of length {length} doesn't fit on a {num_rows}x{num_cols} board")
+        if sum(fleet.values()) > num_rows * num_cols:
+            raise ValueError(f"the fleet covers more cells than a {num_rows}x{num_cols} board has")
+        # Ships are placed one at a time, so a tight fleet such as 3, 2, 2 and 2 on a 3x3 board can be placed, but
+        # usually isn't. A seeded run of placements makes sure the computer players can always place theirs
+        engine = placement_engine(num_rows, num_cols, tuple(fleet.values()))
+        rng = random.Random(0)
+        try:
+            for _ in range(PLACEMENT_CHECKS):
+                engine.sample(rng)
+        except ValueError:
+            raise ValueError(f"the fleet is too tight to place at random on a {num_rows}x{num_cols} board") from None
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.cell_width = cell_width
+        self.fleet = dict(fleet)
+        self.sprites = {name: SHIPS[name][1] if name in SHIPS else self.default_sprite(length)
+                        for name, length in self.fleet.items()}
+        self.sprites.update(sprites or {})
+
+    @classmethod
+    def load(cls, path):
+        """Reads a config from a JSON file. Raises OSError if it can't be read and ValueError if it isn't valid."""
+        with open(path) as file:
+            settings = json.load(file)
+        if not isinstance(settings, dict):
+            raise ValueError("the config must be a JSON object")
+        unknown = settings.keys() - CONFIG_KEYS
+        if unknown:
+            raise ValueError(f"unknown settings: {', '.join(sorted(unknown))}")
+        fleet = sprites = None
+        if "fleet" in settings:
+            if not isinstance(settings["fleet"], dict) or not settings["fleet"]:
+                raise ValueError("fleet must map at least one ship name to its length")
+            fleet, sprites = {}, {}
+            for name, ship in settings["fleet"].items():
+                try:
+                    if isinstance(ship, list):
+                        fleet[name], sprites[name] = int(ship[0]), str(ship[1])
+                    else:
+                        fleet[name] = int(ship)
+                except (IndexError, TypeError):
+                    raise ValueError(f"{name} must be a length or a [length, sprite] pair") from None
+        try:
+            num_rows, num_cols = int(settings.get("rows", 10)), int(settings.get("cols", 10))
+            cell_width = int(settings.get("cell_width", 40))
+        except TypeError:
+            raise ValueError("rows, cols and cell_width must be whole numbers") from None
+        return cls(num_rows, num_cols, cell_width, fleet, sprites)
+
+    def resized(self, num_rows: int, num_cols: int):
+        """Returns a copy of this config for a num_rows x num_cols board."""
+        return GameConfig(num_rows, num_cols, self.cell_width, self.fleet, self.sprites)
+
+    @staticmethod
+    def default_sprite(length: int) -> str:
+        """Returns the sprite of the SHIPS ship closest in length."""
+        return min(SHIPS.values(), key=lambda ship: abs(ship[0] - length))[1]
+
+    def uses_ships(self) -> bool:
+        """Whether every ship of the fleet is a ship in SHIPS at its length there, as replays require."""
+        return all(name in SHIPS and length == SHIPS[name][0] for name, length in self.fleet.items())
+
+    def total_length(self) -> int:
+        return sum(self.fleet.values())
+
+
+DEFAULT_CONFIG = GameConfig()
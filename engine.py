@@ -0,0 +1,534 @@
+# Headless Battleships rules engine, no pygame required.
+# Run directly to play EnemyAi vs EnemyAi games in bulk:
+# python engine.py [num_games] [seed] [--bitboard] [--targeting FIRST SECOND] [--config PATH] [--record PATH]
+
+from abc import ABC, abstractmethod
+import argparse
+import itertools
+import random
+import time
+from typing import NamedTuple, Optional
+
+from placement import placement_engine
+
+SHIPS = {"Battleship": [5, "./Sprites/Battleship5.png"],
+         "Cruiser": [4, "./Sprites/Cruiser4.png"],
+         "Submarine": [4, "./Sprites/Submarine3.png"],
+         "Rescue Ship": [3, "./Sprites/RescueShip3.png"],
+         "Destroyer": [2, "./Sprites/Destroyer2.png"],
+         "Aeroplane": [1, "./Sprites/Plane1.png"]}
+
+# Debugging ship set for quicker game
+# SHIPS = {"Battleship": [5, r".\Sprites\Battleship5.png"],
+#          "Cruiser": [4, r".\Sprites\Cruiser4.png"]}
+
+
+class ShotResult(NamedTuple):
+    """Outcome of a single shot. ship is the name of the ship hit, or None for a miss."""
+    ship: Optional[str]
+    sunk: bool
+    won: bool
+
+
+class GameResult(NamedTuple):
+    """Outcome of a simulated game. shots holds the number of shots each player fired."""
+    winner: int
+    shots: tuple
+
+
+class Board:
+    """Headless counterpart of Grid. Owns ship placement, shot resolution, sink and win detection.
+    Cells are addressed as (row, column) tuples, the same order EnemyAi uses for its targets.
+    Only the cells holding a ship and the cells fired at are stored, so memory grows with the fleet and the shots
+    rather than the area, and boards of millions of cells cost no more to set up than small ones."""
+    def __init__(self, num_rows=10, num_cols=10):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.ships = {}  # (row, column) -> ship name
+        self.remaining = {}  # ship name -> number of cells not yet hit
+        self.shots = set()
+        self.ships_afloat = 0
+
+    def update_cells_with_ship(self, starting_x: int, starting_y: int, ship_name: str, length: int, horizontal: bool):
+        """Places a ship using the same arguments as Grid.update_cells_with_ship, x being the column and y the row.
+        Raises ValueError if the ship would leave the board or overlap another ship."""
+        if horizontal:
+            ship_cells = [(starting_y, starting_x + i) for i in range(length)]
+        else:
+            ship_cells = [(starting_y + i, starting_x) for i in range(length)]
+        for row, column in ship_cells:
+            if not (0 <= row < self.num_rows and 0 <= column < self.num_cols):
+                raise ValueError(f"{ship_name} does not fit on the board")
+            if (row, column) in self.ships:
+                raise ValueError(f"{ship_name} overlaps the {self.ships[(row, column)]}")
+        if ship_name in self.remaining:
+            raise ValueError(f"{ship_name} has already been placed")
+        for cell in ship_cells:
+            self.ships[cell] = ship_name
+        self.remaining[ship_name] = length
+        self.ships_afloat += 1
+
+    def is_shot(self, coordinates: tuple) -> bool:
+        return coordinates in self.shots
+
+    def fire(self, coordinates: tuple) -> ShotResult:
+        """Resolves a shot at the (row, column) coordinates, returning which ship was hit and whether
+        it was sunk and the whole fleet destroyed as a result."""
+        if coordinates in self.shots:
+            raise ValueError(f"{coordinates} has already been fired at")
+        self.shots.add(coordinates)
+        ship_name = self.ships.get(coordinates)
+        if ship_name is None:
+            return ShotResult(None, False, False)
+        self.remaining[ship_name] -= 1
+        if self.remaining[ship_name]:
+            return ShotResult(ship_name, False, False)
+        self.ships_afloat -= 1
+        return ShotResult(ship_name, True, self.ships_afloat == 0)
+
+    def all_sunk(self) -> bool:
+        return self.ships_afloat == 0
+
+
+class BitBoard:
+    """Compact alternative to Board holding the state as Python big-int bitmasks, one bit per cell in row-major
+    order. Overlap, already-shot and win checks are each a single bitwise operation.
+    Cells are addressed as (row, column) tuples, as for Board. Each operation costs time in proportion to the
+    area, so Board is the better choice for very large boards."""
+    __slots__ = ("num_rows", "num_cols", "occupancy", "ship_masks", "shots", "hits")
+
+    def __init__(self, num_rows=10, num_cols=10):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.occupancy = 0  # cells holding any ship
+        self.ship_masks = {}  # ship name -> cells holding that ship
+        self.shots = 0  # cells fired at
+        self.hits = 0  # cells fired at that held a ship
+
+    def bit(self, coordinates: tuple) -> int:
+        return 1 << (coordinates[0] * self.num_cols + coordinates[1])
+
+    def ship_mask(self, starting_x: int, starting_y: int, length: int, horizontal: bool) -> int:
+        """Returns the mask of the cells a ship covers, leaving out any that fall off the board."""
+        mask = 0
+        for i in range(length):
+            row, column = (starting_y, starting_x + i) if horizontal else (starting_y + i, starting_x)
+            if 0 <= row < self.num_rows and 0 <= column < self.num_cols:
+                mask |= 1 << (row * self.num_cols + column)
+        return mask
+
+    def add_ship(self, ship_name: str, mask: int):
+        """Adds a ship without validating it, as Grid does while the player is still positioning ships."""
+        self.ship_masks[ship_name] = self.ship_masks.get(ship_name, 0) | mask
+        self.occupancy |= mask
+
+    def update_cells_with_ship(self, starting_x: int, starting_y: int, ship_name: str, length: int, horizontal: bool):
+        """Places a ship using the same arguments as Board.update_cells_with_ship.
+        Raises ValueError if the ship would leave the board or overlap another ship."""
+        mask = self.ship_mask(starting_x, starting_y, length, horizontal)
+        if mask.bit_count() != length:
+            raise ValueError(f"{ship_name} does not fit on the board")
+        if mask & self.occupancy:
+            raise ValueError(f"{ship_name} overlaps another ship")
+        if ship_name in self.ship_masks:
+            raise ValueError(f"{ship_name} has already been placed")
+        self.add_ship(ship_name, mask)
+
+    def clear_ships(self):
+        self.occupancy = 0
+        self.ship_masks = {}
+
+    def occupied_count(self) -> int:
+        return self.occupancy.bit_count()
+
+    def is_shot(self, coordinates: tuple) -> bool:
+        return bool(self.shots & self.bit(coordinates))
+
+    def mark_shot(self, coordinates: tuple):
+        """Records a shot at the (row, column) coordinates without resolving it, for boards whose shots are
+        resolved elsewhere, as main.Grid's are by events.FleetTracker."""
+        self.shots |= self.bit(coordinates)
+
+    def fire(self, coordinates: tuple) -> ShotResult:
+        """Resolves a shot at the (row, column) coordinates, as Board.fire."""
+        bit = 1 << (coordinates[0] * self.num_cols + coordinates[1])
+        if self.shots & bit:
+            raise ValueError(f"{coordinates} has already been fired at")
+        self.shots |= bit
+        if not self.occupancy & bit:
+            return ShotResult(None, False, False)
+        self.hits |= bit
+        for ship_name, mask in self.ship_masks.items():
+            if mask & bit:
+                sunk = mask & self.hits == mask
+                return ShotResult(ship_name, sunk, sunk and self.all_sunk())
+
+    def all_sunk(self) -> bool:
+        return self.occupancy & self.hits == self.occupancy
+
+
+class FleetShip:
+    """Logical ship used by EnemyAi to record where its fleet was placed. Unlike Ship it has no sprite,
+    since the enemy fleet is never drawn."""
+    __slots__ = ("name", "length", "column", "row", "horizontal")
+
+    def __init__(self, name: str, length: int, column=0, row=0, horizontal=True):
+        self.name = name
+        self.length = length
+        self.column = column
+        self.row = row
+        self.horizontal = horizontal
+
+
+class UntriedCells:
+    """The cells a strategy has not fired at yet, with O(1) membership, removal and random choice."""
+    def __init__(self, cells):
+        self.cells = list(cells)
+        # Position of each untried cell in self.cells, so lookups and removals are O(1)
+        self.positions = {cell: i for i, cell in enumerate(self.cells)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.positions
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def random_pick(self) -> tuple:
+        return random.choice(self.cells)
+
+    def remove(self, cell):
+        """Removes cell by swapping it with the last entry, avoiding a list scan."""
+        position = self.positions.pop(cell)
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[position] = last
+            self.positions[last] = position
+
+
+class SparseUntriedCells:
+    """UntriedCells for boards too big to list every cell: only the cells fired at are stored, and a random
+    untried cell is found by drawing cells until one hasn't been tried. Once half the board has been tried the
+    rest are listed in an UntriedCells, so draws stay quick."""
+    def __init__(self, num_rows: int, num_cols: int):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.tried = set()
+        self.listed = None  # UntriedCells, once half the board has been tried
+
+    def __len__(self):
+        if self.listed is not None:
+            return len(self.listed)
+        return self.num_rows * self.num_cols - len(self.tried)
+
+    def __contains__(self, cell):
+        if self.listed is not None:
+            return cell in self.listed
+        row, column = cell
+        return 0 <= row < self.num_rows and 0 <= column < self.num_cols and cell not in self.tried
+
+    def __iter__(self):
+        if self.listed is not None:
+            return iter(self.listed)
+        return (cell for cell in itertools.product(range(self.num_rows), range(self.num_cols))
+                if cell not in self.tried)
+
+    def random_pick(self) -> tuple:
+        if self.listed is not None:
+            return self.listed.random_pick()
+        while True:
+            cell = (random.randrange(self.num_rows), random.randrange(self.num_cols))
+            if cell not in self.tried:
+                return cell
+
+    def remove(self, cell):
+        if self.listed is not None:
+            return self.listed.remove(cell)
+        if cell not in self:
+            raise KeyError(cell)
+        self.tried.add(cell)
+        if len(self.tried) * 2 >= self.num_rows * self.num_cols:
+            self.listed = UntriedCells(iter(self))
+            self.tried = None
+
+
+class Strategy(ABC):
+    """Interface of a computer player. A strategy owns a fleet, placed on its grid by randomise_ships, and picks
+    shots at an opponent's board of the same size: enemy_turn returns an untried (row, column) target and
+    record_result is told how that shot landed. Subclasses implement those two; the untried cells are tracked
+    here so no strategy can fire at the same cell twice.
+    fleet maps each ship name to its length, by default the ships in SHIPS."""
+    # Boards with more cells than this only track the cells fired at, see SparseUntriedCells
+    SPARSE_CELLS = 1 << 16
+
+    def __init__(self, grid, fleet=None):
+        self.grid = grid
+        self.fleet = dict(fleet or {name: ship[0] for name, ship in SHIPS.items()})
+        self.ships = [FleetShip(name, length) for name, length in self.fleet.items()]
+        self.available_cells = self.populate_available_cells()
+
+    @abstractmethod
+    def enemy_turn(self) -> tuple:
+        """Returns the next cell to fire at, and removes it from the available cells."""
+
+    @abstractmethod
+    def record_result(self, target: tuple, hit: bool, sunk: bool, ship_name=None):
+        """Tells the strategy the outcome of the last shot returned by enemy_turn. ship_name is the name of
+        the ship hit, if any."""
+
+    def populate_available_cells(self):
+        """Creates the collection of coordinate pair tuples that keeps track of available targets."""
+        num_rows, num_cols = self.grid.num_rows, self.grid.num_cols
+        if num_rows * num_cols > self.SPARSE_CELLS:
+            return SparseUntriedCells(num_rows, num_cols)
+        return UntriedCells(itertools.product(range(num_rows), range(num_cols)))
+
+    def randomise_ships(self, seed=None):
+        """Places each ship in turn on self.grid, drawing it uniformly from the placements that don't overlap
+        the ships already placed, so no retries are needed. Passing a seed makes the layout reproducible."""
+        rng = random.Random(seed) if seed is not None else random
+        engine = placement_engine(self.grid.num_rows, self.grid.num_cols, tuple(ship.length for ship in self.ships))
+        for ship, placement in zip(self.ships, engine.sample(rng)):
+            ship.column = placement.starting_x
+            ship.row = placement.starting_y
+            ship.horizontal = placement.horizontal
+            self.grid.update_cells_with_ship(starting_x=ship.column,
+                                             starting_y=ship.row,
+                                             ship_name=ship.name,
+                                             length=ship.length,
+                                             horizontal=ship.horizontal)
+
+    def random_pick(self):
+        return self.available_cells.random_pick()
+
+    def remove_available_cell(self, cell):
+        self.available_cells.remove(cell)
+
+
+class HitLog:
+    """EnemyAi's memory of the ship it is chasing. first_hit and second_hit are its first two hits on it, and
+    first_miss and second_miss the misses that followed the second hit. Cleared when a ship is sunk."""
+    __slots__ = ("first_hit", "second_hit", "first_miss", "second_miss")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """After a ship is sunk, the hit memory resets to None so the enemy goes back to random choices."""
+        self.first_hit = None
+        self.second_hit = None
+        self.first_miss = None
+        self.second_miss = None
+
+    def record(self, target: tuple, hit: bool, sunk: bool):
+        if hit:
+            if not self.first_hit:
+                self.first_hit = target
+            else:
+                self.second_hit = target
+            if sunk:
+                self.reset()
+        elif self.first_hit and self.second_hit:
+            if not self.first_miss:
+                # record the miss if 2 hits are logged
+                self.first_miss = target
+            else:
+                # if a miss again after a miss already logged, this means the enemy is not
+                # correctly tracking a ship (eg if 2 ships next to each other)
+                # set second_miss to go back to the cells around the first hit
+                self.second_miss = target
+
+
+class EnemyAi(Strategy):
+    """Enemy AI for battleships, contains basic logic for choosing a target to ensure once ship is hit it will
+    target relevant cells until ship is sunk.
+    targeting selects how targets are chosen: "hunt" for the hunt/target heuristics below, "density" to
+    fire at the most likely cell of a heatmap of every placement still possible (see targeting.py), or "perfect"
+    to fire at the cell most likely to hold a ship given every fleet still possible (see solver.py), taking up
+    to time_budget seconds a move."""
+    TARGETING_MODES = ("hunt", "density", "perfect")
+
+    def __init__(self, grid, targeting="hunt", time_budget=0.05, fleet=None):
+        if targeting not in self.TARGETING_MODES:
+            raise ValueError(f"Unknown targeting mode {targeting!r}")
+        super().__init__(grid, fleet)
+        self.targeting = targeting
+        self.density = None
+        # targeting.py and solver.py use NumPy, so only games that need them pay for importing it
+        if targeting == "density":
+            from targeting import DensityTargeter
+            self.density = DensityTargeter(grid.num_rows, grid.num_cols, tuple(ship.length for ship in self.ships))
+        self.solver = None
+        if targeting == "perfect":
+            from solver import Solver
+            self.solver = Solver(grid.num_rows, grid.num_cols, self.fleet, time_budget)
+        self.hits = HitLog()
+
+    def record_result(self, target: tuple, hit: bool, sunk: bool, ship_name=None):
+        """Updates the hit memory with the outcome of the last shot fired by enemy_turn.
+        ship_name is the name of the ship hit, which density and perfect targeting need to know which ship was
+        hit and sunk."""
+        if self.solver:
+            self.solver.record_result(target, hit, sunk, ship_name)
+        if self.density:
+            self.density.record_result(target, hit, sunk, self.fleet.get(ship_name))
+        self.hits.record(target, hit, sunk)
+
+    def enemy_turn(self):
+        hits = self.hits
+        if self.solver:
+            pick = self.solver.next_target()
+        elif self.density:
+            pick = self.density.next_target()
+        # If no hits have been registered, pick any random available cell
+        elif not hits.first_hit:
+            pick = self.random_pick()
+        # If there have been 2 misses after 2 logged hits set second_hit back to none to go back to the original targets
+        elif hits.second_miss:
+            hits.second_hit = None
+            pick = self.pick_target_after_first_hit()
+        # After the first successful hit, check the adjacent cells
+        elif hits.first_hit and not hits.second_hit:
+            pick = self.pick_target_after_first_hit()
+        # If two successful hits, check in a line extending outwards from those hits
+        elif hits.first_hit and hits.second_hit:
+            pick = self.pick_target_after_second_hit(1)
+        # Catchall in case unable to choose valid location, goes back to choosing a random target
+        else:
+            pick = self.random_pick()
+        self.remove_available_cell(pick)
+        return pick
+
+    def pick_target_after_first_hit(self):
+        """Picks a random adjacent target to the cell with the successful hit"""
+        first_hit = self.hits.first_hit
+        next_targets = [(first_hit[0] + 1, first_hit[1]),
+                        (first_hit[0] - 1, first_hit[1]),
+                        (first_hit[0], first_hit[1] + 1),
+                        (first_hit[0], first_hit[1] - 1)]
+        # compares the list of 4 targets to the available cells to ensure valid target returned
+        next_targets_verified = [cell for cell in next_targets if cell in self.available_cells]
+        if not next_targets_verified:
+            # Every neighbour has already been tried, so the hit cannot be followed up
+            return self.random_pick()
+        pick = random.choice(next_targets_verified)
+        return pick
+
+    def pick_target_after_second_hit(self, check_distance):
+        """If enemy makes two successful hits, it will check along the same axis as those hits,
+        check distance gets incremented and method recursively called to expand search area"""
+        first_hit, second_hit = self.hits.first_hit, self.hits.second_hit
+        if first_hit[0] == second_hit[0]:  # Check for same X axis coordinate on each hit
+            next_targets = [(first_hit[0], (max(first_hit[1], second_hit[1]) + check_distance)),
+                            (first_hit[0], (min(first_hit[1], second_hit[1]) - check_distance))]
+        else:  # Check for same Y axis coordinate on each hit
+            next_targets = [((max(first_hit[0], second_hit[0]) + check_distance), first_hit[1]),
+                            ((min(first_hit[0], second_hit[0]) - check_distance), first_hit[1])]
+        next_targets_verified = [cell for cell in next_targets if cell in self.available_cells]
+        if next_targets_verified:
+            return random.choice(next_targets_verified)
+        # If no targets available, and there has already been two misses, or the search has run off the board,
+        # reset the second hit and go back to the cells around the first hit. This prevents recursion from
+        # continuing if enemy is on the wrong track, i.e caused by two adjacent ships being hit 1 and hit 2.
+        if self.hits.second_miss or check_distance >= max(self.grid.num_rows, self.grid.num_cols):
+            self.hits.second_hit = None
+            return self.pick_target_after_first_hit()
+        # If no unsuccessful second hit, increase the check distance and try again.
+        return self.pick_target_after_second_hit(check_distance + 1)
+
+
+def play_game(seed=None, num_rows=10, num_cols=10, board_class=Board, targeting=("hunt", "hunt"),
+              recorder=None, play_out=False, fleet=None) -> GameResult:
+    """Plays a full computer vs computer game on two headless boards, player 0 firing first.
+    board_class can be Board or BitBoard. targeting gives each player as an EnemyAi targeting mode, or as a
+    callable taking a board and a fleet and returning a Strategy. fleet maps ship names to lengths, by default
+    the ships in SHIPS.
+    recorder is an optional replay.ReplayWriter the game is written to as it is played.
+    With play_out the loser keeps firing after the game is won until it has sunk the winner's fleet too, so
+    shots holds how many shots each player needed to win."""
+    if seed is not None:
+        random.seed(seed)
+    boards = [board_class(num_rows, num_cols), board_class(num_rows, num_cols)]
+    players = [mode(board, fleet) if callable(mode) else EnemyAi(board, mode, fleet=fleet)
+               for board, mode in zip(boards, targeting)]
+    for player in players:
+        player.randomise_ships()
+    if recorder:
+        recorder.start_game(num_rows, num_cols, [player.ships for player in players], seed)
+    shots = [0, 0]
+    turn = 0
+    winner = None
+    while True:
+        target = players[turn].enemy_turn()
+        result = boards[1 - turn].fire(target)
+        players[turn].record_result(target, result.ship is not None, result.sunk, result.ship)
+        if recorder and winner is None:
+            recorder.shot(turn, target, result)
+        shots[turn] += 1
+        if result.won:
+            if winner is None:
+                winner = turn
+                if recorder:
+                    recorder.end_game()
+            if not play_out or turn != winner:
+                return GameResult(winner, tuple(shots))
+            turn = 1 - turn
+        elif winner is None:
+            turn = 1 - turn
+
+
+def simulate(num_games: int, seed=None, board_class=Board, targeting=("hunt", "hunt"), recorder=None,
+             num_rows=10, num_cols=10, fleet=None) -> list:
+    """Plays num_games games back to back. Passing a seed makes the whole batch reproducible."""
+    if seed is not None:
+        random.seed(seed)
+    return [play_game(num_rows=num_rows, num_cols=num_cols, board_class=board_class, targeting=targeting,
+                      recorder=recorder, fleet=fleet)
+            for _ in range(num_games)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play EnemyAi vs EnemyAi games without a display.")
+    parser.add_argument("num_games", type=int, nargs="?", default=10000)
+    parser.add_argument("seed", type=int, nargs="?", default=None)
+    parser.add_argument("--bitboard", action="store_true", help="use the BitBoard backend")
+    parser.add_argument("--targeting", nargs=2, choices=EnemyAi.TARGETING_MODES, default=["hunt", "hunt"],
+                        metavar=("FIRST", "SECOND"), help="targeting mode of each player (hunt, density or perfect)")
+    parser.add_argument("--config", metavar="PATH", help="JSON board size and fleet (see config.py)")
+    parser.add_argument("--record", metavar="PATH", help="write every game to a replay file (see replay.py)")
+    args = parser.parse_args()
+    if args.num_games < 1:
+        parser.error("num_games must be at least 1")
+    # config.py and replay.py import this module, so they are only imported when needed
+    if args.config:
+        from config import GameConfig
+        try:
+            config = GameConfig.load(args.config)
+        except (OSError, ValueError) as error:
+            parser.error(f"can't use {args.config}: {error}")
+        if args.record and not config.uses_ships():
+            parser.error("only fleets made of the ships in SHIPS, at their lengths there, can be recorded")
+        options = {"num_rows": config.num_rows, "num_cols": config.num_cols, "fleet": config.fleet}
+    else:
+        options = {}
+    start = time.perf_counter()
+    board_class = BitBoard if args.bitboard else Board
+    if args.record:
+        from replay import ReplayWriter
+        with open(args.record, "wb") as file:
+            results = simulate(args.num_games, args.seed, board_class, tuple(args.targeting), ReplayWriter(file),
+                               **options)
+    else:
+        results = simulate(args.num_games, args.seed, board_class, tuple(args.targeting), **options)
+    elapsed = time.perf_counter() - start
+    first_player_wins = sum(1 for result in results if result.winner == 0)
+    winning_shots = sum(result.shots[result.winner] for result in results)
+    print(f"{args.num_games} games in {elapsed:.2f}s ({args.num_games / elapsed:.0f} games/sec)")
+    print(f"First player win rate: {first_player_wins / args.num_games:.1%}")
+    print(f"Mean shots to win: {winning_shots / args.num_games:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# Typed events describing the shots of a game, and the FleetTracker that produces them. Each fleet keeps a counter
+# of the hits each ship can still take and of the ships still afloat, so resolving a shot is O(1) however big the
+# board or fleet, and the UI, sound, EnemyAi and statistics subscribe to the events rather than working it out again.
+# shooter is 0 for the player and 1 for the enemy, and targets are (row, column) as in engine.py.
+
+from typing import NamedTuple, Optional
+
+from engine import ShotResult
+
+
+class ShotFired(NamedTuple):
+    """Published for every shot. ship is the name of the ship hit, or None for a miss."""
+    shooter: int
+    target: tuple
+    ship: Optional[str]
+
+
+class Hit(NamedTuple):
+    """Published after ShotFired when a ship was hit. remaining is the hits the ship can still take."""
+    shooter: int
+    target: tuple
+    ship: str
+    remaining: int
+
+
+class Sunk(NamedTuple):
+    """Published after Hit when that hit sank the ship. ships_left is the ships of the fleet still afloat."""
+    shooter: int
+    target: tuple
+    ship: str
+    ships_left: int
+
+
+class FleetDestroyed(NamedTuple):
+    """Published after Sunk when the last ship of the fleet went down. shots is the shots it took."""
+    shooter: int
+    shots: int
+
+
+class EventStream:
+    """Delivers each published event to the handlers subscribed to its type, in the order they subscribed."""
+    def __init__(self):
+        self.handlers = {}  # event type -> list of handlers
+
+    def subscribe(self, event_type: type, handler):
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    def publish(self, event):
+        for handler in self.handlers.get(type(event), ()):
+            handler(event)
+
+
+class FleetTracker:
+    """Resolves the shots fired at one fleet, publishing the events each shot causes to stream.
+    fleet maps each ship name to its length, and shooter is the player firing at the fleet."""
+    def __init__(self, fleet: dict, stream: EventStream, shooter: int):
+        self.remaining = dict(fleet)  # ship name -> hits it can still take
+        self.ships_left = len(fleet)
+        self.shots = 0
+        self.stream = stream
+        self.shooter = shooter
+
+    @property
+    def destroyed(self) -> bool:
+        return self.ships_left == 0
+
+    def fire(self, target: tuple, ship=None) -> list:
+        """Records a shot at target that hit the named ship, or missed if ship is None, and returns the events
+        it published, ShotFired first."""
+        self.shots += 1
+        events = [ShotFired(self.shooter, target, ship)]
+        if ship is not None:
+            self.remaining[ship] -= 1
+            remaining = self.remaining[ship]
+            events.append(Hit(self.shooter, target, ship, remaining))
+            if remaining == 0:
+                self.ships_left -= 1
+                events.append(Sunk(self.shooter, target, ship, self.ships_left))
+                if self.ships_left == 0:
+                    events.append(FleetDestroyed(self.shooter, self.shots))
+        for event in events:
+            self.stream.publish(event)
+        return events
+
+
+def shot_result(events: list) -> ShotResult:
+    """Returns the outcome of the shot that published events, as FleetTracker.fire returned them."""
+    return ShotResult(events[0].ship, isinstance(events[-1], (Sunk, FleetDestroyed)),
+                      isinstance(events[-1], FleetDestroyed))
+
+
+class ShotTally:
+    """Statistics collector counting each shooter's shots, hits and ships sunk from an EventStream."""
+    def __init__(self, stream: EventStream):
+        self.shots = [0, 0]
+        self.hits = [0, 0]
+        self.sunk = [0, 0]
+        stream.subscribe(ShotFired, self.shot_fired)
+        stream.subscribe(Sunk, self.ship_sunk)
+
+    def shot_fired(self, event: ShotFired):
+        self.shots[event.shooter] += 1
+        if event.ship is not None:
+            self.hits[event.shooter] += 1
+
+    def ship_sunk(self, event: Sunk):
+        self.sunk[event.shooter] += 1
+
+    def accuracy(self, shooter: int) -> float:
+        """Returns the share of the shooter's shots that hit, or 0 before their first shot."""
+        return self.hits[shooter] / self.shots[shooter] if self.shots[shooter] else 0.0
@@ -0,0 +1,119 @@
+# Load generator for server.py. Keeps a number of scripted games running against the server at once until a total
+# has been played, then reports throughput and shot latency percentiles. Run with:
+# python loadgen.py [--games N] [--concurrency N] [--host HOST] [--port PORT] [--opponent MODE]
+#                   [--spawn-server] [--ai-workers N]
+
+import argparse
+import asyncio
+from pathlib import Path
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from client import ScriptedPlayer
+from engine import EnemyAi
+from server import DEFAULT_PORT
+
+PERCENTILES = [50, 90, 99, 99.9]
+SERVER_STOP_TIMEOUT = 10  # seconds
+
+
+async def run_load(num_games: int, concurrency: int, host: str, port: int, opponent: str) -> list:
+    """Plays num_games games, at most concurrency at a time, and returns the players. Against "player" the games
+    are between pairs of scripted clients; otherwise each client plays a hosted EnemyAi of that targeting mode."""
+    slots = asyncio.Semaphore(concurrency)
+    players_per_game = 2 if opponent == "player" else 1
+
+    async def play_game():
+        async with slots:
+            players = [ScriptedPlayer(hosted_ai=None if opponent == "player" else opponent)
+                       for _ in range(players_per_game)]
+            await asyncio.gather(*(player.play(host, port) for player in players))
+            return players
+
+    games = await asyncio.gather(*(play_game() for _ in range(num_games)), return_exceptions=True)
+    players = []
+    for game in games:
+        if isinstance(game, Exception):
+            print(f"Game failed: {game!r}", file=sys.stderr)
+        else:
+            players.extend(game)
+    return players
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port: int, ai_workers: int) -> subprocess.Popen:
+    """Starts server.py in its own process and waits until it accepts connections."""
+    command = [sys.executable, str(Path(__file__).with_name("server.py")), "--port", str(port),
+               "--ai-workers", str(ai_workers)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("The server didn't start")
+
+
+def stop_server(server: subprocess.Popen):
+    """Interrupts the spawned server, which server.main handles like Ctrl-C by closing its sessions and shutting
+    down its AI worker processes, so none are left running. Kills it if it hasn't exited after SERVER_STOP_TIMEOUT."""
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(SERVER_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def report(players: list, elapsed: float):
+    latencies = sorted(latency for player in players for latency in player.shot_latencies)
+    if not latencies:
+        print("No shots completed")
+        return
+    finished = sum(1 for player in players if player.won is not None)
+    print(f"{finished} players finished {len(latencies)} shots in {elapsed:.2f}s")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} shots/sec")
+    percentiles = []
+    for percent in PERCENTILES:
+        latency = latencies[min(int(len(latencies) * percent / 100), len(latencies) - 1)]
+        percentiles.append(f"p{percent:g} {latency * 1e3:.2f} ms")
+    print(f"Shot latency: {', '.join(percentiles)}, max {latencies[-1] * 1e3:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate load against a Battleships server.")
+    parser.add_argument("--games", type=int, default=1000, help="total games to play")
+    parser.add_argument("--concurrency", type=int, default=500, help="games in progress at once")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--opponent", choices=EnemyAi.TARGETING_MODES + ("player",), default="hunt",
+                        help="hosted EnemyAi targeting mode to play, or player to pair scripted clients up")
+    parser.add_argument("--spawn-server", action="store_true", help="start a server on a free port for the run")
+    parser.add_argument("--ai-workers", type=int, default=0, help="--ai-workers of the spawned server")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn_server:
+        args.host, args.port = "127.0.0.1", free_port()
+        server = spawn_server(args.port, args.ai_workers)
+    try:
+        start = time.perf_counter()
+        players = asyncio.run(run_load(args.games, args.concurrency, args.host, args.port, args.opponent))
+        report(players, time.perf_counter() - start)
+    finally:
+        if server:
+            stop_server(server)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,150 +1,261 @@
 # Battleships in Pygame
 
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import itertools
-import sys
 import random
+import sys
+import time
 import pygame
 from pygame.locals import *
+from assets import SPRITES, assets
+from audio import audio
+from config import DEFAULT_CONFIG, GameConfig
+from engine import SHIPS, BitBoard, EnemyAi
+from events import EventStream, FleetDestroyed, FleetTracker, Hit, ShotFired, ShotTally, Sunk, shot_result
+from metrics import metrics
+from protocol import ALREADY_SHOT, OFF_BOARD, Error, OpponentLeft, Result, Start, Turn
+from scheduler import Scheduler
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 BLUE = (52, 140, 235)
 RED = (206, 10, 10)
+GREEN = (20, 180, 60)
 GREY = (107, 99, 99)
 DARK_GREY = (41, 41, 46)
 
-SHIPS = {"Battleship": [5, "./Sprites/Battleship5.png"],
-         "Cruiser": [4, "./Sprites/Cruiser4.png"],
-         "Submarine": [4, "./Sprites/Submarine3.png"],
-         "Rescue Ship": [3, "./Sprites/RescueShip3.png"],
-         "Destroyer": [2, "./Sprites/Destroyer2.png"],
-         "Aeroplane": [1, "./Sprites/Plane1.png"]}
-
-SOUNDS = {"boom": ["./Sounds/boom1.mp3", "./Sounds/boom2.mp3", "./Sounds/boom3.mp3"],
-          "splash": ["./Sounds/splash1.mp3", "./Sounds/splash2.mp3", "./Sounds/splash3.mp3"],
-          "sink": "./Sounds/sink.mp3",
-          "bgm": "./Sounds/valkyries.mid"}
-
-
-# Debugging ship set for quicker game
-# SHIPS = {"Battleship": [5, r".\Sprites\Battleship5.png"],
-#          "Cruiser": [4, r".\Sprites\Cruiser4.png"]}
-
-pygame.init()
-window_surface = pygame.display.set_mode((1160, 580), 0, 32)
-
-title_font_60 = pygame.font.Font(Path("./Fonts/INVASION2000.TTF"), 60)
-title_font_80 = pygame.font.Font(Path("./Fonts/INVASION2000.TTF"), 80)
-grid_header_font = pygame.font.Font(Path("./Fonts/ARCADECLASSIC.TTF"), 35)
-instruction_font = pygame.font.SysFont(None, 42)
-body_font = pygame.font.Font(Path("./Fonts/INVASION2000.TTF"), 35)
+FPS = 60  # frame rate cap while something on screen is moving
+IDLE_WAIT_MS = 1000  # longest the frame loop sleeps waiting for input when nothing is moving
+NETWORK_POLL_MS = 50  # how often the frame loop checks for the network opponent's messages when idle
+
+# Created by init_display(), so importing this module doesn't need a display
+window_surface = None
+renderer = None
+layout = None
+
+
+class Layout:
+    """Where everything goes on screen for a GameConfig: the player grid at the top left, the ships to place and
+    the setup buttons to its right, then the enemy grid, with the instruction line along the bottom. The window is
+    sized to fit, which for the default config is the original 1160x580."""
+    SPRITE_CELL_WIDTH = 40  # cell width the sprites were drawn for
+
+    def __init__(self, config: GameConfig):
+        self.scale = config.cell_width / self.SPRITE_CELL_WIDTH
+        grid_width = config.num_cols * config.cell_width
+        grid_height = config.num_rows * config.cell_width
+        self.grid_top = 80
+        self.player_grid_x = 40
+        self.ships_x = self.player_grid_x + grid_width + 40
+        self.ships_y = 70
+        self.ship_spacing = config.cell_width
+        self.enemy_grid_x = self.ships_x + max(200, max(config.fleet.values()) * config.cell_width) + 40
+        self.rotate_button_y = self.ships_y + len(config.fleet) * self.ship_spacing + 20
+        self.lock_in_button_y = self.rotate_button_y + 90
+        self.divider_y = max(self.grid_top + grid_height + 2, self.lock_in_button_y + 60) + 18
+        self.width = self.enemy_grid_x + grid_width + 40
+        self.height = self.divider_y + 80
+        self.player_header = (self.player_grid_x + grid_width // 2, 60)
+        self.enemy_header = (self.enemy_grid_x + grid_width // 2, 60)
+        self.instruction_centre = (self.width // 2, self.divider_y + 35)
+        self.instruction_area = pygame.Rect(11, self.divider_y + 1, self.width - 21, 69)  # inside the frame lines
 
 
 class Grid:
     """Container class for cell objects, performs checks and updates to the cells,
     also responsible for drawing the grid to the display window,"""
-    def __init__(self, num_rows=10,
-                 num_cols=10,
-                 cell_width=40,
-                 grid_size=402,  # 2 extra pixels to allow line width not to be cut off
+    def __init__(self, num_rows=DEFAULT_CONFIG.num_rows,
+                 num_cols=DEFAULT_CONFIG.num_cols,
+                 cell_width=DEFAULT_CONFIG.cell_width,
                  y_loc=80,
-                 x_loc=40):
+                 x_loc=40,
+                 bitboard=False):
         self.y_loc = y_loc
         self.x_loc = x_loc
-        self.grid_size = grid_size
         self.cell_width = cell_width
         self.num_cols = num_cols
         self.num_rows = num_rows
-        self.rect = pygame.Rect(self.x_loc, self.y_loc, self.grid_size, self.grid_size)
-        self.surface = pygame.Surface((self.grid_size, self.grid_size))
+        # 2 extra pixels to allow line width not to be cut off
+        self.width = num_cols * cell_width + 2
+        self.height = num_rows * cell_width + 2
+        self.rect = pygame.Rect(self.x_loc, self.y_loc, self.width, self.height)
+        self.surface = pygame.Surface((self.width, self.height))
         self.cells = []
+        # Optional compact copy of the ship and shot state, making win and overlap checks single bitwise operations
+        self.bitboard = BitBoard(num_rows, num_cols) if bitboard else None
 
     def draw_grid(self):
         """Draws grid to the display screen based on the self parameters of the grid object."""
         self.surface.fill(BLUE)
-        grid_x = 0
-        grid_y = 0
-        for _ in range(self.num_cols + 1):
-            pygame.draw.line(self.surface, BLACK, (grid_x, 0), (grid_x, self.grid_size), 4)
-            pygame.draw.line(self.surface, BLACK, (0, grid_y), (self.grid_size, grid_y), 4)
-            grid_x += self.cell_width
-            grid_y += self.cell_width
+        for column in range(self.num_cols + 1):
+            grid_x = column * self.cell_width
+            pygame.draw.line(self.surface, BLACK, (grid_x, 0), (grid_x, self.height), 4)
+        for row in range(self.num_rows + 1):
+            grid_y = row * self.cell_width
+            pygame.draw.line(self.surface, BLACK, (0, grid_y), (self.width, grid_y), 4)
 
     def create_cells(self):
-        """Builds list of self.cells based on the dimensions of grid object."""
-        cell_y = self.y_loc
-        for col in range(self.num_rows):
-            cell_x = self.x_loc
-            for row in range(self.num_cols):
-                self.cells.append(Cell(x_coord=cell_x,
-                                       y_coord=cell_y,
-                                       cell_width=self.cell_width,
-                                       row=row,
-                                       column=col))
-                cell_x += self.cell_width
-            cell_y += self.cell_width
+        """Builds list of self.cells based on the dimensions of grid object, one column (y index) at a time."""
+        xs = [self.x_loc + row * self.cell_width for row in range(self.num_cols)]
+        self.cells = [Cell(x_coord, self.y_loc + col * self.cell_width, self.cell_width, row, col)
+                      for col in range(self.num_rows) for row, x_coord in enumerate(xs)]
+
+    def cell_at(self, row: int, column: int):
+        """Returns the cell at the given row (x index) and column (y index), or None if off the grid.
+        create_cells builds self.cells one column at a time, so the position in the list can be calculated
+        directly rather than searched for."""
+        if 0 <= row < self.num_cols and 0 <= column < self.num_rows:
+            return self.cells[column * self.num_cols + row]
 
     def get_cell(self, x: int, y: int):
         """Returns the matching cell object when supplied with x,y coordinates (from mouse click)"""
-        for cell in self.cells:
-            if cell.x_coord < x < cell.x_coord + cell.cell_width:
-                if cell.y_coord < y < cell.y_coord + cell.cell_width:
-                    return cell
+        row, x_offset = divmod(x - self.x_loc, self.cell_width)
+        column, y_offset = divmod(y - self.y_loc, self.cell_width)
+        # Clicks exactly on a grid line do not belong to either cell
+        if x_offset and y_offset:
+            return self.cell_at(row, column)
 
     def check_ship(self, ship_endpoint: tuple, horizontal: bool):
         """Returns details of the cell who's rect collides with the mid-left point of ship rect
         passed in as ship_endpoint. Ship orientation "horizontal used to determine whether to return the midtop or
         midleft point of the rect. This is used to align the chip rect to the centre of the cell."""
-        for cell in self.cells:
-            if cell.rect.collidepoint(ship_endpoint):
-                if horizontal:
-                    return cell.rect.midleft, cell.row, cell.column
-                else:
-                    return cell.rect.midtop, cell.row, cell.column
+        cell = self.cell_at((ship_endpoint[0] - self.x_loc) // self.cell_width,
+                            (ship_endpoint[1] - self.y_loc) // self.cell_width)
+        if cell:
+            if horizontal:
+                return cell.rect.midleft, cell.row, cell.column
+            else:
+                return cell.rect.midtop, cell.row, cell.column
 
     def update_cells_with_ship(self, starting_x: int, starting_y: int, ship_name: str, length: int, horizontal: bool):
         """Updates each cell's ship attribute with the ship name it contains.
         Uses ship starting x&y, orientation and length to update relevant cells."""
-        ship_coordinates = []
+        if self.bitboard:
+            self.bitboard.add_ship(ship_name, self.bitboard.ship_mask(starting_x, starting_y, length, horizontal))
         for i in range(length):
-            ship_coordinates.append((starting_x, starting_y))
+            cell = self.cell_at(starting_x, starting_y)
+            if cell:
+                cell.ship = ship_name
             if horizontal:
                 starting_x += 1
             else:
                 starting_y += 1
-        for cell in self.cells:
-            cell_coordinates = (cell.row, cell.column)
-            if cell_coordinates in ship_coordinates:
-                cell.ship = ship_name
 
     def return_cell(self, coordinates: tuple):
         """Used to return the cell object picked by the enemy_ai's turn."""
+        return self.cell_at(coordinates[1], coordinates[0])
+
+    def fire_at(self, cell):
+        """Marks the cell as clicked, recording the shot in the bitboard if there is one.
+        Returns the cell's rect centre and ship name as Cell.cell_clicked does. Whether the shot sank a ship or won
+        the game is worked out by the FleetTracker the ship name is passed to."""
+        if self.bitboard:
+            self.bitboard.mark_shot((cell.column, cell.row))
+        return cell.cell_clicked()
+
+    def is_shot(self, cell) -> bool:
+        if self.bitboard:
+            return self.bitboard.is_shot((cell.column, cell.row))
+        return cell.is_clicked
+
+    def clear_ships(self):
+        """Removes every ship from the grid."""
+        if self.bitboard:
+            self.bitboard.clear_ships()
         for cell in self.cells:
-            if cell.column == coordinates[0]:
-                if cell.row == coordinates[1]:
-                    return cell
+            cell.ship = None
 
 
 class Cell:
     """Cell object created for each cell in the grid. Rect is used to determine collisions with the user placed
-    ships, and for mouse clicks on the enemy grid to determine which cell is targeted."""
+    ships, and for mouse clicks on the enemy grid to determine which cell is targeted. Cells are never drawn
+    themselves, so the rect is made on demand rather than stored, and slots keep each cell a few dozen bytes."""
+    __slots__ = ("x_coord", "y_coord", "cell_width", "row", "column", "ship", "is_clicked")
+
     def __init__(self, x_coord: int, y_coord: int, cell_width: int, row: int, column: int):
         self.y_coord = y_coord
         self.x_coord = x_coord
         self.cell_width = cell_width
         self.row = row
         self.column = column
-        self.rect = pygame.Rect(self.x_coord, self.y_coord, self.cell_width, self.cell_width)
-        self.surface = pygame.Surface((self.cell_width, self.cell_width))
         self.ship = None
         self.is_clicked = False
 
+    @property
+    def rect(self):
+        return pygame.Rect(self.x_coord, self.y_coord, self.cell_width, self.cell_width)
+
     def cell_clicked(self):
         self.is_clicked = True
         return self.rect.center, self.ship
 
 
+class ShipIndex:
+    """Which ship covers each cell of a grid, keyed by (x, y) as in Grid.update_cells_with_ship. Answers whether a
+    ship fits, on the grid and clear of the ships already placed, in O(ship length) however big the grid is."""
+    def __init__(self, num_rows: int, num_cols: int):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.cells = {}  # (x, y) -> ship name
+        self.placed = {}  # ship name -> the cells it covers
+
+    def ship_cells(self, starting_x: int, starting_y: int, length: int, horizontal: bool):
+        """Returns the cells a ship would cover, or None if any of them is off the grid."""
+        end_x = starting_x + length - 1 if horizontal else starting_x
+        end_y = starting_y if horizontal else starting_y + length - 1
+        if starting_x < 0 or starting_y < 0 or end_x >= self.num_cols or end_y >= self.num_rows:
+            return None
+        if horizontal:
+            return [(x, starting_y) for x in range(starting_x, end_x + 1)]
+        return [(starting_x, y) for y in range(starting_y, end_y + 1)]
+
+    def fits(self, starting_x: int, starting_y: int, length: int, horizontal: bool) -> bool:
+        cells = self.ship_cells(starting_x, starting_y, length, horizontal)
+        return cells is not None and not any(cell in self.cells for cell in cells)
+
+    def place(self, ship_name: str, starting_x: int, starting_y: int, length: int, horizontal: bool):
+        """Records a ship that fits, replacing wherever it was before."""
+        self.remove(ship_name)
+        cells = self.ship_cells(starting_x, starting_y, length, horizontal)
+        self.placed[ship_name] = cells
+        for cell in cells:
+            self.cells[cell] = ship_name
+
+    def remove(self, ship_name: str):
+        for cell in self.placed.pop(ship_name, ()):
+            del self.cells[cell]
+
+
+class PlacementPreview(pygame.sprite.Sprite):
+    """Highlights the cells a dragged ship would snap to, green if it can go there and red if it would overlap
+    another ship or hang off the grid."""
+    images = {}  # (width, height, valid) -> translucent highlight, shared by every preview
+
+    def __init__(self):
+        super().__init__()
+        self.image = None
+        self.rect = None
+        self.valid = False
+
+    def show(self, grid, starting_x: int, starting_y: int, length: int, horizontal: bool, valid: bool):
+        width = length if horizontal else 1
+        height = 1 if horizontal else length
+        rect = pygame.Rect(grid.x_loc + starting_x * grid.cell_width, grid.y_loc + starting_y * grid.cell_width,
+                           width * grid.cell_width, height * grid.cell_width)
+        rect = rect.clip(grid.x_loc, grid.y_loc, grid.num_cols * grid.cell_width, grid.num_rows * grid.cell_width)
+        key = (rect.width, rect.height, valid)
+        if key not in self.images:
+            image = pygame.Surface(rect.size)
+            image.fill(GREEN if valid else RED)
+            image.set_alpha(110)
+            self.images[key] = image
+        self.image = self.images[key]
+        self.rect = rect
+        self.valid = valid
+
+
 class Ship(pygame.sprite.Sprite):
     def __init__(self, name: str, length: int, image: Path, x=0, y=0, column=0, row=0, horizontal=True):
         super().__init__()
@@ -153,24 +264,26 @@ class Ship(pygame.sprite.Sprite):
         self.column = column
         self.length = length
         self.name = name
-        self.image = pygame.image.load(image)
+        # Both orientations of the sprite are shared by every Ship drawn with it, see AssetRegistry.ship_sprites
+        self.images = assets.ship_sprites(image, layout.scale if layout else 1)
+        self.image = self.images[horizontal]
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.centery = y + 20
 
     def rotate(self, x, y):
-        self.image = pygame.transform.rotate(self.image, 90)
+        self.horizontal = not self.horizontal
+        self.image = self.images[self.horizontal]
         self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.centery = y
-        self.horizontal = not self.horizontal
 
 
 class Button(pygame.sprite.Sprite):
     def __init__(self, name: str, image: Path, x, y):
         super().__init__()
         self.name = name
-        self.image = pygame.image.load(image)
+        self.image = assets.sprite(image)
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.centery = y + 20
@@ -179,499 +292,911 @@ class Button(pygame.sprite.Sprite):
 class CellHit(pygame.sprite.Sprite):
     def __init__(self, image: Path, rect_center):
         super().__init__()
-        self.image = pygame.image.load(image)
+        self.image = assets.sprite(image, layout.scale if layout else 1)
         self.rect = self.image.get_rect()
         self.rect.center = (rect_center[0] + 1, rect_center[1] + 1)
 
 
-class EnemyAi:
-    """Enemy AI for battleships, contains basic logic for choosing a target to ensure once ship is hit it will
-    target relevant cells until ship is sunk."""
-    def __init__(self, grid):
-        self.grid = grid
-        self.ships = [Ship(ship, SHIPS[ship][0], SHIPS[ship][1]) for ship in SHIPS]
-        self.ship_hit = None
-        self.second_hit = None
-        self.tested_no_hit = None
-        self.tested_no_hit_2 = None
-        self.available_cells = self.populate_available_cells()
-
-    def populate_available_cells(self):
-        """Creates a list of coordinate pair tuples to keep track of available targets."""
-        rows = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
-        columns = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
-        grid = itertools.product(rows, columns)
-        return [cell for cell in grid]
-
-    def reset_hit_logs(self):
-        """After a ship is sunk, attributes for hit memory reset to none so the enemy goes back to random choices."""
-        self.ship_hit = None
-        self.second_hit = None
-        self.tested_no_hit = None
-        self.tested_no_hit_2 = None
-
-    def randomise_ships(self):
-        """Creates a list to reflect coordinates of a 10x10 grid, then adds each of the ships in turn to
-        self.grid, removing the coordinates from the list so they cannot be used again."""
-        rows = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
-        columns = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
-        ship_coord_mapping = {}
-        grid = itertools.product(rows, columns)
-        available_cells = [cell for cell in grid]
-        for ship in self.ships:
-            ship_coordinates = self.randomize_ship_coordinates(columns, rows, ship, available_cells)
-            cells_minus_ship = [cell for cell in available_cells if cell not in ship_coordinates]
-            ship_coord_mapping[ship.name] = ship_coordinates
-            available_cells = cells_minus_ship
-            self.grid.update_cells_with_ship(starting_x=ship.column,
-                                             starting_y=ship.row,
-                                             ship_name=ship.name,
-                                             length=ship.length,
-                                             horizontal=ship.horizontal)
-
-    def randomize_ship_coordinates(self, columns, rows, ship, available_cells) -> list:
-        """Produces a list of randomized ship coordinates for randomize_ships() to populate to the cells.
-        Checks that all coordinate pairs are in available_cells, and if not calls recursively until valid
-        Coordinate list is created."""
-        ship.horizontal = random.choice([True, False])
-        ship_coordinates = []
-        if ship.horizontal:
-            ship.row = random.choice(rows)  # choose any y coordinate
-            available_columns = columns[:-ship.length]  # x coordinate only those which can contain ship's length
-            ship.column = random.choice(available_columns)
-            x = ship.column
-            for _ in range(ship.length):
-                ship_coordinates.append((x, ship.row))
-                x += 1
-        else:
-            ship.column = random.choice(columns)
-            available_rows = rows[:-ship.length]
-            ship.row = random.choice(available_rows)
-            y = ship.row
-            for _ in range(ship.length):
-                ship_coordinates.append((ship.column, y))
-                y += 1
-        if all(coord in available_cells for coord in ship_coordinates):
-            return ship_coordinates
-        else:
-            #  If any ship in a cell already taken, re-call the function to try again
-            return self.randomize_ship_coordinates(columns, rows, ship, available_cells)
-
-    def random_pick(self):
-        return random.choice(self.available_cells)
-
-    def enemy_turn(self):
-        # If no hits have been registered, pick any random available cell
-        if not self.ship_hit:
-            pick = self.random_pick()
-        # If there have been 2 misses after 2 logged hits set second_hit back to none to go back to the original targets
-        elif self.tested_no_hit_2:
-            self.second_hit = None
-            return self.pick_target_after_first_hit()
-        # After the first successful hit, check the adjacent cells
-        elif self.ship_hit and not self.second_hit:
-            pick = self.pick_target_after_first_hit()
-        # If two successful hits, check in a line extending outwards from those hits
-        elif self.ship_hit and self.second_hit:
-            pick = self.pick_target_after_second_hit(1)
-        # Catchall in case unable to choose valid location, goes back to choosing a random target
-        else:
-            pick = self.random_pick()
-        self.available_cells.remove(pick)
-        return pick
-
-    def pick_target_after_first_hit(self):
-        """Picks a random adjacent target to the cell with the successful hit"""
-        next_targets = [(self.ship_hit[0] + 1, self.ship_hit[1]),
-                        (self.ship_hit[0] - 1, self.ship_hit[1]),
-                        (self.ship_hit[0], self.ship_hit[1] + 1),
-                        (self.ship_hit[0], self.ship_hit[1] - 1)]
-        # compares the list of 4 targets to the available cells to ensure valid target returned
-        next_targets_verified = [cell for cell in next_targets if cell in self.available_cells]
-        pick = random.choice(next_targets_verified)
-        return pick
-
-    def pick_target_after_second_hit(self, check_distance):
-        """If enemy makes two successful hits, it will check along the same axis as those hits,
-        check distance gets incremented and method recursively called to expand search area"""
-        if self.ship_hit[0] == self.second_hit[0]:  # Check for same X axis coordinate on each hit
-            next_targets = [(self.ship_hit[0], (max(self.ship_hit[1], self.second_hit[1]) + check_distance)),
-                            (self.ship_hit[0], (min(self.ship_hit[1], self.second_hit[1]) - check_distance))]
-            next_targets_verified = [cell for cell in next_targets if cell in self.available_cells]
-            if next_targets_verified:
-                return random.choice(next_targets_verified)
-            else:
-                # If no targets available, and there has already been two misses, reset the second hit counter
-                # and restart the turn. This prevents recursion from continuing if enemy is on the wrong track,
-                # i.e caused by two adjacent ships being hit 1 and hit 2.
-                if self.tested_no_hit_2:
-                    self.second_hit = None
-                    return self.enemy_turn()
-                # If no unsuccessful second hit, increase the check distance and try again.
-                else:
-                    check_distance += 1
-                    return self.pick_target_after_second_hit(check_distance)
-        else:  # Check for same Y axis coordinate on each hit
-            next_targets = [(max(self.ship_hit[0], self.second_hit[0] + check_distance), self.ship_hit[1]),
-                            (min(self.ship_hit[0], self.second_hit[0] - check_distance), self.ship_hit[1])]
-            next_targets_verified = [cell for cell in next_targets if cell in self.available_cells]
-            if next_targets_verified:
-                return random.choice(next_targets_verified)
-            else:
-                if self.tested_no_hit_2:
-                    self.second_hit = None
-                    return self.enemy_turn()
-                else:
-                    check_distance += 1
-                    return self.pick_target_after_second_hit(check_distance)
-
+class MetricsOverlay(pygame.sprite.Sprite):
+    """Performance readout in the top left corner: FPS, frame time percentiles and the enemy's think time.
+    The text is only re-rendered every REFRESH_MS, so the overlay itself doesn't add a redraw to every frame."""
+    REFRESH_MS = 250
 
-def display_permanent_text():
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.next_refresh = 0
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect(topleft=(12, 12))
+
+    def update(self):
+        now = pygame.time.get_ticks()
+        if now < self.next_refresh:
+            return
+        self.next_refresh = now + self.REFRESH_MS
+        frame = metrics.histogram("frame")
+        work = metrics.histogram("frame_work")
+        ai = metrics.histogram("ai_think")
+        lines = [f"FPS {self.clock.get_fps():.0f}",
+                 f"frame p50 {frame.percentile(50):.1f} p99 {frame.percentile(99):.1f} ms",
+                 f"work p50 {work.percentile(50):.2f} p99 {work.percentile(99):.2f} ms",
+                 f"AI last {ai.last:.2f} p99 {ai.percentile(99):.2f} ms"]
+        # Rendered directly rather than through render_text, as the numbers change too often to be worth caching
+        font = assets.font("overlay")
+        rendered = [font.render(line, True, WHITE) for line in lines]
+        self.image = pygame.Surface((max(line.get_width() for line in rendered) + 8,
+                                     sum(line.get_height() for line in rendered) + 8))
+        self.image.fill(DARK_GREY)
+        line_y = 4
+        for line in rendered:
+            self.image.blit(line, (4, line_y))
+            line_y += line.get_height()
+        self.rect = self.image.get_rect(topleft=(12, 12))
+
+
+text_cache = {}
+
+
+def render_text(font_name: str, text: str, colour, background=None) -> pygame.Surface:
+    """Renders text with one of the asset registry's fonts, reusing the surface if the same text has been
+    rendered before in the same colours."""
+    key = (font_name, text, colour, background)
+    if key not in text_cache:
+        text_cache[key] = assets.font(font_name).render(text, True, colour, background)
+    return text_cache[key]
+
+
+def display_permanent_text(surface):
     """Displays game title and grid headers."""
-    title_text = title_font_60.render("Battleships!", True, BLACK, None)
-    title_text_rect = title_text.get_rect(center=(window_surface.get_rect().centerx, 38))
+    title_text = render_text("title_60", "Battleships!", BLACK)
+    title_text_rect = title_text.get_rect(center=(surface.get_rect().centerx, 38))
 
-    player_text = grid_header_font.render("Player Grid", True, BLACK, None)
-    player_text_rect = player_text.get_rect(center=(240, 60))
+    player_text = render_text("grid_header", "Player Grid", BLACK)
+    player_text_rect = player_text.get_rect(center=layout.player_header)
 
-    enemy_text = grid_header_font.render("Enemy Grid", True, BLACK, None)
-    enemy_text_rect = enemy_text.get_rect(center=(920,60))
+    enemy_text = render_text("grid_header", "Enemy Grid", BLACK)
+    enemy_text_rect = enemy_text.get_rect(center=layout.enemy_header)
 
-    window_surface.blit(title_text, title_text_rect)
-    window_surface.blit(player_text, player_text_rect)
-    window_surface.blit(enemy_text, enemy_text_rect)
+    surface.blit(title_text, title_text_rect)
+    surface.blit(player_text, player_text_rect)
+    surface.blit(enemy_text, enemy_text_rect)
 
 
-def display_instruction(text, colour=WHITE):
+def display_instruction(surface, text, colour=WHITE):
     """Displays instruction line at the bottom of the screen, pass 'text' to display"""
-    instruction_text = instruction_font.render(text, True, colour, GREY)
-    instruction_text_rect = instruction_text.get_rect(center=(580, 535))
-    window_surface.blit(instruction_text, instruction_text_rect)
-
-
-def create_ships(ship_list):
-    """Creates the player's ship sprites from the SHIPS dict and draws to the area
+    instruction_text = render_text("instruction", text, colour, GREY)
+    instruction_text_rect = instruction_text.get_rect(center=layout.instruction_centre)
+    surface.blit(instruction_text, instruction_text_rect)
+
+
+class Renderer:
+    """Draws the game screen. The static layer (frame lines, titles and grids) is composed once, and after the
+    first frame only the areas where sprites or the instruction text changed are redrawn and pushed to the display."""
+    def __init__(self, surface, instruction_area):
+        self.surface = surface
+        self.instruction_area = instruction_area  # below the grids
+        self.background = None
+        self.drawn = {}  # sprite -> (rect, image) as last drawn
+        self.instruction = None  # (text, colour) as last drawn
+
+    def invalidate(self):
+        """Forces the next frame to be redrawn in full, e.g. after something else has drawn over the screen."""
+        self.background = None
+
+    def build_background(self, player_grid, enemy_grid):
+        self.background = pygame.Surface(self.surface.get_size()).convert()
+        self.background.fill(GREY)
+        draw_lines(self.background)
+        self.background.blit(player_grid.surface, player_grid.rect)
+        self.background.blit(enemy_grid.surface, enemy_grid.rect)
+        display_permanent_text(self.background)
+
+    def render(self, player_grid, enemy_grid, sprite_groups, instruction_text, colour=WHITE):
+        """Draws the sprite groups in order over the background, with the instruction text at the bottom."""
+        sprites = [sprite for group in sprite_groups for sprite in group]
+        current = {sprite: (sprite.rect.copy(), sprite.image) for sprite in sprites}
+        instruction = (instruction_text, colour)
+        if self.background is None:
+            self.build_background(player_grid, enemy_grid)
+            dirty = [self.surface.get_rect()]
+        else:
+            dirty = []
+            for sprite, (rect, image) in self.drawn.items():
+                now = current.get(sprite)
+                if now is None or now[0] != rect or now[1] is not image:
+                    dirty.append(rect)
+            for sprite, (rect, image) in current.items():
+                before = self.drawn.get(sprite)
+                if before is None or before[0] != rect or before[1] is not image:
+                    dirty.append(rect)
+            if instruction != self.instruction:
+                dirty.append(self.instruction_area)
+        self.drawn = current
+        self.instruction = instruction
+        if not dirty:
+            return
+        for area in dirty:
+            # Clip to the area so sprites overlapping its edge don't get drawn over those above them outside it
+            self.surface.set_clip(area)
+            self.surface.blit(self.background, area, area)
+            if area.colliderect(self.instruction_area):
+                display_instruction(self.surface, instruction_text, colour)
+            for sprite in sprites:
+                if sprite.rect.colliderect(area):
+                    self.surface.blit(sprite.image, sprite.rect)
+        self.surface.set_clip(None)
+        pygame.display.update(dirty)
+
+
+def init_display(config=DEFAULT_CONFIG):
+    """Initialises pygame, opens a game window laid out for config and loads the assets. Called by main(); nothing
+    here runs on import, so the grids and game logic can be used from tests or simulations without a display."""
+    global window_surface, renderer, layout
+    if window_surface is None:
+        pygame.init()
+        layout = Layout(config)
+        window_surface = pygame.display.set_mode((layout.width, layout.height), 0, 32)
+        assets.load(config.sprites.values(), layout.scale)
+        audio.init()
+        renderer = Renderer(window_surface, layout.instruction_area)
+    return window_surface
+
+
+def create_ships(ship_list, config=DEFAULT_CONFIG):
+    """Creates the player's ship sprites from the config's fleet and draws to the area
     between the player and enemy grid"""
-    ship_y = 70
-    ship_x = 480
-    for ship in SHIPS:
-        path = Path(SHIPS[ship][1])
-        name = ship
-        length = SHIPS[ship][0]
+    ship_y = layout.ships_y
+    ship_x = layout.ships_x
+    for name, length in config.fleet.items():
+        path = Path(config.sprites[name])
         ship_list.add(Ship(name, length, path, ship_x, ship_y))
-        ship_y += 40
-    ship_list.draw(window_surface)
-
-
-def refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list, colour=WHITE):
-    """Updates each graphical element to the main display"""
-    window_surface.fill(GREY)
-    draw_lines()
-    window_surface.blit(player_grid.surface, player_grid.rect)
-    window_surface.blit(enemy_grid.surface, enemy_grid.rect)
-    display_permanent_text()
-    display_instruction(instruction_text, colour)
-    button_list.update()
-    button_list.draw(window_surface)
-    ship_list.update()
-    ship_list.draw(window_surface)
-    hit_list.update()
-    hit_list.draw(window_surface)
-    pygame.display.update()
-
-
-def set_up_player_ships(player_grid, enemy_grid, ship_list, button_list, hit_list):
-    """Game loop for the ship setup phase of the game"""
-    setting_up = True
-    selected = None
-    instruction_text = "Move the ships to the player grid, then press 'Lock-in ships'"
-    while setting_up:
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == MOUSEBUTTONDOWN:
-                # print(event.pos[0], event.pos[1]) # Uncomment to print coordinates of mouse click to console
-                if selected is None:  # First click selects the ship and will start dragging
-                    for i, ship in enumerate(ship_list):
-                        if ship.rect.collidepoint(event.pos):
-                            selected = i
-                            shipmove_x = ship.rect.x - event.pos[0]
-                            shipmove_y = ship.rect.y - event.pos[1]
-                    for sprite in button_list.sprites():
-                        if sprite.rect.collidepoint(event.pos):
-                            # Detect if the Lock in button has been clicked
-                            if sprite.name == "lock-in":
-                                setting_up, instruction_text = lock_in_ships(player_grid, setting_up, ship_list)
-                else:
-                    for sprite in button_list.sprites():
-                        if sprite.rect.collidepoint(event.pos):
-                            if sprite.name == "rotate":
-                                ships = ship_list.sprites()
-                                ships[selected].rotate(event.pos[0], event.pos[1])
-                                break  # break out of sprite checking loop to avoid selected=None if button pressed
-                        else:
-                            selected = None  # Second click puts the ship down
-            elif event.type == pygame.MOUSEMOTION:
-                if selected is not None:  # selected can be `0` so `is not None` is required
-                    ships = ship_list.sprites()
-                    ships[selected].rect.x = event.pos[0] + shipmove_x
-                    ships[selected].rect.y = event.pos[1] + shipmove_y
-
-        refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list)
+        ship_y += layout.ship_spacing
+
+
+@metrics.timed("draw")
+def refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list, colour=WHITE,
+                   overlay_list=None, preview_list=None):
+    """Updates each graphical element to the main display. overlay_list is drawn on top of everything else, and
+    preview_list under the ships."""
+    sprite_groups = ([button_list] + ([preview_list] if preview_list else []) + [ship_list, hit_list]
+                     + ([overlay_list] if overlay_list else []))
+    for group in sprite_groups:
+        group.update()
+    renderer.render(player_grid, enemy_grid, sprite_groups, instruction_text, colour)
+
+
+@metrics.timed("setup_event")
+def set_up_player_ships(game, event):
+    """Handles an event during the ship setup phase of the game"""
+    if event.type == MOUSEBUTTONDOWN:
+        # print(event.pos[0], event.pos[1]) # Uncomment to print coordinates of mouse click to console
+        if game.selected is None:  # First click selects the ship and will start dragging
+            for i, ship in enumerate(game.ship_list):
+                if ship.rect.collidepoint(event.pos):
+                    game.selected = i
+                    game.shipmove_x = ship.rect.x - event.pos[0]
+                    game.shipmove_y = ship.rect.y - event.pos[1]
+                    game.picked_up_from = (ship.rect.topleft, ship.horizontal)
+            if game.selected is not None:
+                game.ship_placements.remove(game.ship_list.sprites()[game.selected].name)
+                preview_placement(game)
+            for sprite in game.button_list.sprites():
+                if sprite.rect.collidepoint(event.pos):
+                    # Detect if the Lock in button has been clicked
+                    if sprite.name == "lock-in":
+                        setting_up, game.instruction_text = lock_in_ships(game.player_grid, True, game.ship_list)
+                        if not setting_up:
+                            game.ships_locked_in()
+        else:
+            for sprite in game.button_list.sprites():
+                if sprite.rect.collidepoint(event.pos) and sprite.name == "rotate":
+                    ships = game.ship_list.sprites()
+                    ships[game.selected].rotate(event.pos[0], event.pos[1])
+                    preview_placement(game)
+                    break  # break out of sprite checking loop to avoid putting the ship down if button pressed
+            else:
+                put_down_ship(game)  # Second click puts the ship down
+    elif event.type == pygame.MOUSEMOTION:
+        if game.selected is not None:  # selected can be `0` so `is not None` is required
+            ships = game.ship_list.sprites()
+            ships[game.selected].rect.x = event.pos[0] + game.shipmove_x
+            ships[game.selected].rect.y = event.pos[1] + game.shipmove_y
+            preview_placement(game)
+
+
+def ship_snap(grid, ship):
+    """Returns the (point, x, y) the ship's end snaps to on grid, as Grid.check_ship does, or None if it is off
+    the grid."""
+    if ship.horizontal:
+        return grid.check_ship(ship.rect.midleft, True)
+    return grid.check_ship(ship.rect.midtop, False)
+
+
+def preview_placement(game):
+    """Shows where the dragged ship would snap to and whether it can go there, or nothing while its end is off
+    the player grid."""
+    ship = game.ship_list.sprites()[game.selected]
+    snap = ship_snap(game.player_grid, ship)
+    if snap is None:
+        game.preview_list.empty()
+        return
+    _, starting_x, starting_y = snap
+    valid = game.ship_placements.fits(starting_x, starting_y, ship.length, ship.horizontal)
+    game.preview.show(game.player_grid, starting_x, starting_y, ship.length, ship.horizontal, valid)
+    game.preview_list.add(game.preview)
+
+
+def put_down_ship(game):
+    """Drops the dragged ship, snapping it into its cells if it fits there. A ship dropped over the player grid
+    where it doesn't fit goes back to where it was picked up, so every ship on the grid is recorded in
+    game.ship_placements and the preview agrees with lock_in_ships."""
+    ship = game.ship_list.sprites()[game.selected]
+    if not snap_into_place(game, ship) and ship.rect.colliderect(game.player_grid.rect):
+        topleft, horizontal = game.picked_up_from
+        if ship.horizontal != horizontal:
+            ship.rotate(*ship.rect.center)
+        ship.rect.topleft = topleft
+        snap_into_place(game, ship)
+    game.selected = None
+    game.preview_list.empty()
+
+
+def snap_into_place(game, ship) -> bool:
+    """Snaps the ship into the player grid cells under it and records it, if it fits there. Returns whether it
+    did."""
+    snap = ship_snap(game.player_grid, ship)
+    if not snap or not game.ship_placements.fits(snap[1], snap[2], ship.length, ship.horizontal):
+        return False
+    if ship.horizontal:
+        ship.rect.midleft = snap[0]
+    else:
+        ship.rect.midtop = snap[0]
+    game.ship_placements.place(ship.name, snap[1], snap[2], ship.length, ship.horizontal)
+    return True
 
 
+@metrics.timed("sound")
 def play_sound(effect_type):
-    if effect_type == "hit":
-        explosion = random.choice([Path(r"./Sounds/boom1.mp3"),
-                                   Path(r"./Sounds/boom2.mp3"),
-                                   Path(r"./Sounds/boom3.mp3")])
-        explosion_sound = pygame.mixer.Sound(explosion)
-        pygame.mixer.Sound.play(explosion_sound)
-    elif effect_type == "miss":
-        splash = random.choice([Path(r"./Sounds/splash1.mp3"),
-                                Path(r"./Sounds/splash2.mp3"),
-                                Path(r"./Sounds/splash3.mp3")])
-        splash_sound = pygame.mixer.Sound(splash)
-        pygame.mixer.Sound.play(splash_sound)
-    elif effect_type == "sink":
-        splash_sound = pygame.mixer.Sound(Path(r"./Sounds/sink.mp3"))
-        pygame.mixer.Sound.play(splash_sound)
+    """Plays a random variant of the effect's sound on the effect's own channels, see audio.py."""
+    audio.play(effect_type)
 
 
 def lock_in_ships(player_grid, setting_up, ship_list):
     """Locks the ships into place on the Grid, centering them with the cell rect centre.
-    Calls the grid method to update the cells with the details of the ships."""
+    Checks every ship is fully on the grid and clear of the others first, then calls the grid method to update
+    the cells with the details of the ships."""
     instruction_text = "Move the ships to the player grid, then press 'Lock-in ships'"
+    placements = ShipIndex(player_grid.num_rows, player_grid.num_cols)
+    fits = True
     for ship in ship_list.sprites():
+        # Retrieve the details of the left/top cell the ship is on
+        cell_details = ship_snap(player_grid, ship)
+        if not cell_details:
+            fits = False
+            continue
         if ship.horizontal:
-            # Retrieve the details of the left/top cell the ship is on
-            cell_details = player_grid.check_ship(ship.rect.midleft, True)
-            if cell_details:
-                ship.rect.midleft = cell_details[0]
-                # Update all cells the ship falls on with the shipname
-                player_grid.update_cells_with_ship(starting_x=cell_details[1],
-                                                   starting_y=cell_details[2],
-                                                   ship_name=ship.name,
-                                                   length=ship.length,
-                                                   horizontal=True)
+            ship.rect.midleft = cell_details[0]
+        else:
+            ship.rect.midtop = cell_details[0]
+        ship.column, ship.row = cell_details[1], cell_details[2]
+        if placements.fits(ship.column, ship.row, ship.length, ship.horizontal):
+            placements.place(ship.name, ship.column, ship.row, ship.length, ship.horizontal)
         else:
-            cell_details = player_grid.check_ship(ship.rect.midtop, False)
-            if cell_details:
-                ship.rect.midtop = cell_details[0]
-                player_grid.update_cells_with_ship(starting_x=cell_details[1],
-                                                   starting_y=cell_details[2],
-                                                   ship_name=ship.name,
-                                                   length=ship.length,
-                                                   horizontal=False)
-
-    # Count the total number of cells with a ship, compare with the sum of the lengths of ships in the input dict
-    # This will ensure all ships are fully on grid, and none are overlapping
-    ship_cell_total = len([cell.ship for cell in player_grid.cells if cell.ship is not None])
-    ship_dict_total = sum([ship[0] for ship in SHIPS.values()])
-
-    # End setup phase if ship check passes
-    if ship_cell_total == ship_dict_total:
+            fits = False
+
+    # End setup phase if every ship is fully on the grid and none are overlapping
+    if fits:
+        for ship in ship_list.sprites():
+            # Update all cells the ship falls on with the shipname
+            player_grid.update_cells_with_ship(starting_x=ship.column,
+                                               starting_y=ship.row,
+                                               ship_name=ship.name,
+                                               length=ship.length,
+                                               horizontal=ship.horizontal)
         setting_up = False
         instruction_text = "Ships locked in!"
     else:
-        # clear the ship attribute from all cells
-        for cell in player_grid.cells:
-            cell.ship = None
-            instruction_text = "Make sure all ships are fully on the grid and not overlapping!"
+        instruction_text = "Make sure all ships are fully on the grid and not overlapping!"
     return setting_up, instruction_text
 
 
-def check_for_win(grid):
-    """Checks each cell's ship attribute, if all are None then True returned for win."""
-    for cell in grid.cells:
-        if cell.ship is not None:
-            return False
-    return True
-
-
-def game_over(win: bool):
-    """Game over screen, displays different text based on result.
-    Exits or restarts game based on click location"""
+def game_over(win: bool, summary=None):
+    """Game over screen, displays different text based on result, and the summary line of the game's statistics
+    if given. Clicking on the left (Yes) half restarts the game and the right (No) half exits, see Game.handle_event."""
+    renderer.invalidate()
     window_surface.fill(GREY)
     if win:
-        game_over_text = title_font_80.render("You Win!", True, BLACK, None)
+        game_over_text = render_text("title_80", "You Win!", BLACK)
     else:
-        game_over_text = _80.render("Game Over!", True, BLACK, None)
-    game_over_text_rect = game_over_text.get_rect(center=(580, 200))
+        game_over_text = render_text("title_80", "Game Over!", BLACK)
+    centre_x, centre_y = window_surface.get_rect().center
+    game_over_text_rect = game_over_text.get_rect(center=(centre_x, centre_y - 90))
+
+    if summary:
+        summary_text = render_text("body", summary, BLACK)
+        window_surface.blit(summary_text, summary_text.get_rect(center=(centre_x, centre_y - 30)))
 
-    play_again_text = body_font.render("Play again?", True, BLACK, None)
-    play_again_text_rect = play_again_text.get_rect(center=(580, 300))
+    play_again_text = render_text("body", "Play again?", BLACK)
+    play_again_text_rect = play_again_text.get_rect(center=(centre_x, centre_y + 10))
 
-    yes_no_text = body_font.render("Yes                 /                 No", True, BLACK, None)
-    yes_no_text_rect = yes_no_text.get_rect(center=(580, 400))
+    yes_no_text = render_text("body", "Yes                 /                 No", BLACK)
+    yes_no_text_rect = yes_no_text.get_rect(center=(centre_x, centre_y + 110))
 
     window_surface.blit(game_over_text, game_over_text_rect)
     window_surface.blit(play_again_text, play_again_text_rect)
     window_surface.blit(yes_no_text, yes_no_text_rect)
 
     pygame.display.update()
-    while True:
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == MOUSEBUTTONDOWN:
-                if event.pos[0] > 580:
+
+
+def draw_lines(surface):
+    right = surface.get_width() - 10
+    bottom = surface.get_height() - 10
+    pygame.draw.line(surface, DARK_GREY, (10, 10), (right, 10))
+    pygame.draw.line(surface, DARK_GREY, (right, 10), (right, bottom))
+    pygame.draw.line(surface, DARK_GREY, (right, bottom), (10, bottom))
+    pygame.draw.line(surface, DARK_GREY, (10, 10), (10, bottom))
+    pygame.draw.line(surface, DARK_GREY, (10, layout.divider_y), (right, layout.divider_y))
+
+
+class EnemyThinker:
+    """Works out the EnemyAi's moves on a worker thread, so that however long its targeting takes the frame loop
+    keeps drawing and handling input. Slow targeting modes refine their move until the EnemyAi's time budget runs
+    out and then return the best one found. Only one move is worked on at a time, and the game leaves the EnemyAi
+    alone until it is done."""
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="enemy-ai")
+        self.future = None
+
+    @staticmethod
+    def think(enemy) -> tuple:
+        start = time.perf_counter()
+        target = enemy.enemy_turn()
+        return target, (time.perf_counter() - start) * 1000
+
+    def start(self, enemy):
+        self.future = self.executor.submit(self.think, enemy)
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self) -> tuple:
+        """Returns the move worked out and the milliseconds it took, and clears it."""
+        target, think_ms = self.future.result()
+        self.future = None
+        return target, think_ms
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Game:
+    """State of one game, from ship setup to the game over screen. Pauses between turns are queued on
+    self.scheduler instead of waiting, so the frame loop in main() keeps handling events and drawing throughout."""
+    SETUP = "setup"
+    PLAYER_TURN = "player turn"
+    WAITING = "waiting"  # between the player's shot and their next turn, input is ignored
+    GAME_OVER = "game over"
+
+    def __init__(self, opponent=None, recorder=None, difficulty="hunt", config=DEFAULT_CONFIG, think_time=0.05):
+        """opponent is a client.NetworkOpponent to play a human over the network, or None to play EnemyAi.
+        recorder is an optional replay.ReplayWriter that games against EnemyAi are written to.
+        difficulty is the EnemyAi's targeting mode and think_time the seconds it may take over a move, and config
+        the board size and fleet, which must be those init_display() laid the window out for."""
+        # Set up and draw the player and enemy grids
+        self.player_grid = Grid(config.num_rows, config.num_cols, config.cell_width, layout.grid_top,
+                                layout.player_grid_x, bitboard=True)
+        self.enemy_grid = Grid(config.num_rows, config.num_cols, config.cell_width, layout.grid_top,
+                               layout.enemy_grid_x, bitboard=True)
+        self.player_grid.draw_grid()
+        self.enemy_grid.draw_grid()
+        self.player_grid.create_cells()
+        self.enemy_grid.create_cells()
+        renderer.invalidate()
+
+        # Create sprite list groups
+        self.ship_list = pygame.sprite.Group()
+        self.button_list = pygame.sprite.Group()
+        self.hit_list = pygame.sprite.Group()
+        create_ships(self.ship_list, config)
+
+        # Create Buttons
+        rotate_button = Button("rotate", Path(SPRITES["rotate"]), layout.ships_x + 20, layout.rotate_button_y)
+        lock_in_button = Button("lock-in", Path(SPRITES["lock-in"]), layout.ships_x + 20, layout.lock_in_button_y)
+        self.button_list.add(rotate_button)
+        self.button_list.add(lock_in_button)
+
+        # Against a network opponent the enemy fleet only exists on the server
+        self.opponent = opponent
+        self.inbox = deque()  # messages from the opponent waiting for the previous one's pause to finish
+        self.resume_at = 0
+        self.enemy = None
+        self.thinker = None
+        self.events = None
+        self.tally = None
+        self.seed = random.randrange(2 ** 63)  # reproduces the enemy fleet
+        if opponent is None:
+            self.enemy = EnemyAi(self.enemy_grid, difficulty, think_time, fleet=config.fleet)
+            self.enemy.randomise_ships(self.seed)
+            self.thinker = EnemyThinker()
+            # Shots against EnemyAi are resolved by a FleetTracker per fleet, and everything that follows from a
+            # shot is done by the subscribers to the events it publishes
+            self.events = EventStream()
+            self.enemy_fleet = FleetTracker(config.fleet, self.events, 0)
+            self.player_fleet = FleetTracker(config.fleet, self.events, 1)
+            self.tally = ShotTally(self.events)
+            self.events.subscribe(ShotFired, self.remember_shot)
+            self.events.subscribe(Hit, self.remember_shot)
+            self.events.subscribe(ShotFired, self.shot_fired)
+            self.events.subscribe(Hit, self.ship_hit)
+            self.events.subscribe(Sunk, self.ship_sunk)
+            self.events.subscribe(FleetDestroyed, self.fleet_destroyed)
+        self.recorder = recorder if opponent is None else None
+        self.recording = False
+
+        self.scheduler = Scheduler(pygame.time.get_ticks)
+        self.phase = Game.SETUP
+        self.instruction_text = "Move the ships to the player grid, then press 'Lock-in ships'"
+        self.colour = WHITE
+        self.selected = None  # index of the ship being dragged during setup
+        self.shipmove_x = 0
+        self.shipmove_y = 0
+        self.picked_up_from = None  # (rect.topleft, horizontal) of the dragged ship when it was picked up
+        self.ship_placements = ShipIndex(config.num_rows, config.num_cols)  # ships put down where they fit
+        self.preview = PlacementPreview()
+        self.preview_list = pygame.sprite.Group()  # holds the preview while a dragged ship is over the grid
+        self.win = None
+        self.restart = False
+
+    def show(self, instruction_text, colour=WHITE):
+        self.instruction_text = instruction_text
+        self.colour = colour
+
+    def ships_locked_in(self):
+        self.button_list.empty()
+        self.preview_list.empty()
+        self.phase = Game.WAITING
+        if self.opponent:
+            self.opponent.place(self.ship_list.sprites())
+            self.show("Ships locked in! Waiting for your opponent...")
+        else:
+            if self.recorder:
+                self.recorder.start_game(self.player_grid.num_rows, self.player_grid.num_cols,
+                                         [self.ship_list.sprites(), self.enemy.ships], self.seed)
+                self.recording = True
+            self.show("Ships locked in!")
+            self.scheduler.after(1000, self.start_player_turn)
+
+    def record_shot(self, shooter: int, target: tuple, result):
+        """Writes a shot by the player (0) or the enemy (1) to the replay, if one is being recorded."""
+        if self.recording:
+            self.recorder.shot(shooter, target, result)
+            if result.won:
+                self.close()
+
+    def close(self):
+        """Ends the replay of a game left unfinished, so the file stays readable, and drops any move the enemy is
+        still working out."""
+        if self.recording:
+            self.recorder.end_game()
+            self.recording = False
+        if self.thinker:
+            self.thinker.close()
+
+    def remember_shot(self, event):
+        """Tells the EnemyAi how each of its shots landed."""
+        if event.shooter != 1:
+            return
+        if isinstance(event, Hit):
+            self.enemy.record_result(event.target, True, event.remaining == 0, event.ship)
+        elif event.ship is None:
+            self.enemy.record_result(event.target, False, False)
+
+    def shot_fired(self, event):
+        """Marks the cell shot at and plays its sound, and shows a miss."""
+        grid = self.enemy_grid if event.shooter == 0 else self.player_grid
+        self.hit_list.add(CellHit(Path(SPRITES["hit" if event.ship else "miss"]),
+                                  grid.return_cell(event.target).rect.center))
+        play_sound("hit" if event.ship else "miss")
+        if event.ship is None:
+            self.show("Miss!" if event.shooter == 0 else
+                      f"Enemy attacked, x{event.target[0]} : y{event.target[1]}. They missed!")
+
+    def ship_hit(self, event):
+        if event.shooter == 0:
+            self.show(f"You hit the enemy's {event.ship}!")
+        else:
+            self.show(f"Enemy attacked, x{event.target[0]} : y{event.target[1]}. They hit your {event.ship}!")
+
+    def ship_sunk(self, event):
+        """Shows the sinking in red, going back to white after 2 seconds unless the fleet is destroyed."""
+        instruction_text = f"You sunk the enemy's {event.ship}!" if event.shooter == 0 else \
+            f"Enemy sunk your {event.ship}!"
+        play_sound("sink")
+        self.show(instruction_text, RED)
+        if event.ships_left:
+            self.scheduler.after(2000, self.show, instruction_text)
+
+    def fleet_destroyed(self, event):
+        won = event.shooter == 0
+        self.scheduler.after(2000, self.show, "You sunk all the enemy's ships. You win!" if won
+                             else "Enemy sunk all your ships. You lose!", RED)
+        self.scheduler.after(4000, self.end, won)
+
+    def start_player_turn(self):
+        self.phase = Game.PLAYER_TURN
+        self.show("Your go. Choose enemy cell to target.")
+
+    def end(self, win: bool):
+        self.phase = Game.GAME_OVER
+        self.win = win
+        if self.opponent:
+            self.opponent.close()
+        summary = None
+        if self.tally:
+            summary = f"Your accuracy {self.tally.accuracy(0):.0%}, the enemy's {self.tally.accuracy(1):.0%}"
+        game_over(win, summary)
+
+    def pause(self, delay_ms):
+        """Holds back the opponent's next message for delay_ms, so each result stays on screen as long as it
+        would against EnemyAi."""
+        self.resume_at = self.scheduler.clock() + delay_ms
+
+    def receive(self) -> int:
+        """Handles the network opponent's messages in order, waiting for any pause or scheduled action the
+        previous one started to finish first. Returns the number of messages handled."""
+        handled = 0
+        try:
+            self.inbox.extend(self.opponent.poll())
+        except (ConnectionError, OSError):
+            self.opponent.close()
+            self.inbox.clear()
+            self.phase = Game.WAITING
+            self.show("Lost the connection to the server.", RED)
+            self.scheduler.after(2000, self.end, False)
+            handled = 1  # the message shown has changed
+        while (self.inbox and self.phase != Game.GAME_OVER and not self.scheduler.busy()
+               and self.scheduler.clock() >= self.resume_at):
+            opponent_message(self, self.inbox.popleft())
+            handled += 1
+        return handled
+
+    def animating(self) -> bool:
+        """Whether something is moving on screen, so frames should be drawn at the full frame rate."""
+        return self.selected is not None
+
+    def handle_event(self, event):
+        if self.phase == Game.SETUP:
+            set_up_player_ships(self, event)
+        elif self.phase == Game.PLAYER_TURN:
+            if event.type == MOUSEBUTTONDOWN and self.enemy_grid.rect.collidepoint(event.pos):
+                enemy_cell_clicked(self, event.pos)
+        elif self.phase == Game.GAME_OVER:
+            if event.type == MOUSEBUTTONDOWN:
+                if event.pos[0] > window_surface.get_width() // 2:
                     pygame.quit()
                     sys.exit()
                 else:
-                    return True
-
-
-def draw_lines():
-    pygame.draw.line(window_surface, DARK_GREY, (10, 10), (1150, 10))
-    pygame.draw.line(window_surface, DARK_GREY, (1150, 10), (1150, 570))
-    pygame.draw.line(window_surface, DARK_GREY, (1150, 570), (10, 570))
-    pygame.draw.line(window_surface, DARK_GREY, (10, 10), (10, 570))
-    pygame.draw.line(window_surface, DARK_GREY, (10, 500), (1150, 500))
-
-
-def main():
-    pygame.mixer.music.load(Path(r"./Sounds/valkyries.mid"))
-    pygame.mixer.music.play()
-    # Set up and draw the player and enemy grids
-    player_grid = Grid()
-    enemy_grid = Grid(x_loc=720)
-    player_grid.draw_grid()
-    enemy_grid.draw_grid()
-    player_grid.create_cells()
-    enemy_grid.create_cells()
-
-    # Create sprite list groups
-    ship_list = pygame.sprite.Group()
-    button_list = pygame.sprite.Group()
-    hit_list = pygame.sprite.Group()
-    create_ships(ship_list)
-
-    # Create Buttons
-    rotate_button = Button("rotate", Path(r"./Sprites/Rotate_button.png"), 500, 330)
-    lock_in_button = Button("lock-in", Path(r"./Sprites/lock-in_button.png"), 500, 420)
-    button_list.add(rotate_button)
-    button_list.add(lock_in_button)
-
-    enemy = EnemyAi(enemy_grid)
-    enemy.randomise_ships()
-
+                    self.restart = True
+
+    def draw(self, overlay_list=None):
+        # The game over screen is drawn once by end()
+        if self.phase != Game.GAME_OVER:
+            refresh_screen(self.player_grid, self.enemy_grid, self.button_list, self.ship_list,
+                           self.instruction_text, self.hit_list, self.colour, overlay_list, self.preview_list)
+
+
+class ReplayViewer:
+    """Steps through a recorded game (see replay.py) with both fleets shown. The right arrow or space shows the
+    next shot, A plays the rest automatically and R starts again. Runs in main()'s frame loop in place of Game."""
+    AUTOPLAY_MS = 500
+
+    def __init__(self, recorded, cell_width=DEFAULT_CONFIG.cell_width):
+        """cell_width must be the one init_display() laid the window out with, for a board the recorded game's size."""
+        self.recorded = recorded
+        self.shots = list(recorded.shots())
+        self.next_shot = 0
+        self.player_grid = Grid(recorded.num_rows, recorded.num_cols, cell_width, layout.grid_top,
+                                layout.player_grid_x)
+        self.enemy_grid = Grid(recorded.num_rows, recorded.num_cols, cell_width, layout.grid_top, layout.enemy_grid_x)
+        self.ship_list = pygame.sprite.Group()
+        self.button_list = pygame.sprite.Group()
+        self.hit_list = pygame.sprite.Group()
+        for grid, fleet in ((self.player_grid, recorded.fleets[0]), (self.enemy_grid, recorded.fleets[1])):
+            grid.draw_grid()
+            grid.create_cells()
+            for name, x, y, horizontal, length in fleet:
+                # A ship recorded at another length than in SHIPS is drawn as GameConfig draws one
+                sprite = SHIPS[name][1] if SHIPS[name][0] == length else GameConfig.default_sprite(length)
+                ship = Ship(name, length, Path(sprite))
+                cell = grid.cell_at(x, y)
+                if horizontal:
+                    ship.rect.midleft = cell.rect.midleft
+                else:
+                    ship.rotate(0, 0)
+                    ship.rect.midtop = cell.rect.midtop
+                self.ship_list.add(ship)
+        renderer.invalidate()
+        self.scheduler = Scheduler(pygame.time.get_ticks)
+        self.opponent = None
+        self.autoplay = False
+        self.restart = False
+        self.instruction_text = f"Replay of {len(self.shots)} shots. Right arrow: next shot, A: autoplay"
+        self.colour = WHITE
+
+    def step(self):
+        """Shows the next shot, if there is one."""
+        if self.next_shot >= len(self.shots):
+            return
+        shot = self.shots[self.next_shot]
+        self.next_shot += 1
+        grid = self.enemy_grid if shot.shooter == 0 else self.player_grid
+        cell = grid.return_cell((shot.row, shot.column))
+        self.hit_list.add(CellHit(Path(SPRITES["hit" if shot.ship else "miss"]), cell.rect.center))
+        play_sound("hit" if shot.ship else "miss")
+        shooter = "Player" if shot.shooter == 0 else "Enemy"
+        outcome = f"sunk the {shot.ship}" if shot.sunk else f"hit the {shot.ship}" if shot.ship else "missed"
+        self.colour = RED if shot.sunk else WHITE
+        self.instruction_text = f"{self.next_shot}/{len(self.shots)}: {shooter} fired at x{shot.row} : " \
+                                f"y{shot.column} and {outcome}."
+        if shot.won:
+            self.instruction_text += f" {shooter} wins! Press R to watch again."
+        if self.autoplay:
+            self.scheduler.after(self.AUTOPLAY_MS, self.step)
+
+    def animating(self) -> bool:
+        return False
+
+    def handle_event(self, event):
+        if event.type != KEYDOWN:
+            return
+        if event.key in (K_RIGHT, K_SPACE):
+            self.step()
+        elif event.key == K_a and not self.autoplay:
+            self.autoplay = True
+            self.step()
+        elif event.key == K_r:
+            self.restart = True
+
+    def draw(self, overlay_list=None):
+        refresh_screen(self.player_grid, self.enemy_grid, self.button_list, self.ship_list,
+                       self.instruction_text, self.hit_list, self.colour, overlay_list)
+
+    def close(self):
+        pass
+
+
+def start_music():
+    """Starts the background music from the beginning. It was loaded once by init_display(), and the game
+    carries on silently if it can't be played, e.g. when there is no audio device or MIDI support."""
+    audio.start_music()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Battleships in Pygame. Press F3 in game to show performance stats.")
+    parser.add_argument("--metrics-json", metavar="PATH", help="write the performance metrics to PATH on exit")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="play another player through the server at HOST:PORT "
+                                                              "(see server.py) instead of the computer")
+    parser.add_argument("--difficulty", choices=EnemyAi.TARGETING_MODES, default="hunt",
+                        help="how the computer picks its shots: hunt, or density or perfect, which play about as well")
+    parser.add_argument("--think-time", type=float, default=0.05, metavar="SECONDS",
+                        help="time the computer may take over a move, which perfect uses to refine it")
+    parser.add_argument("--config", metavar="PATH", help="JSON board size and fleet (see config.py)")
+    parser.add_argument("--record", metavar="PATH", help="append games against the computer to a replay file")
+    parser.add_argument("--replay", metavar="PATH", help="step through a game from a replay file instead of playing")
+    parser.add_argument("--replay-game", type=int, default=0, metavar="N", help="which game of the replay file to show")
+    args = parser.parse_args(argv)
+    try:
+        config = GameConfig.load(args.config) if args.config else DEFAULT_CONFIG
+    except (OSError, ValueError) as error:
+        parser.error(f"can't use {args.config}: {error}")
+    if args.record and not config.uses_ships():
+        parser.error("only fleets made of the ships in SHIPS, at their lengths there, can be recorded")
+    if args.connect and not args.connect.rpartition(":")[2].isdigit():
+        parser.error(f"--connect needs HOST:PORT or PORT, not {args.connect}")
+    if args.connect and config.fleet != DEFAULT_CONFIG.fleet:
+        parser.error("network games are played with the ships in SHIPS, so --config can only change the board size")
+    recording = open(args.record, "ab") if args.record else None
+    try:
+        run(args, config, recording)
+    finally:
+        if recording:
+            recording.close()
+        if args.metrics_json:
+            metrics.dump(args.metrics_json)
+
+
+def run(args, config=DEFAULT_CONFIG, recording=None):
+    # Imported here so the single player game doesn't depend on the replay and network modules
+    if args.replay or recording:
+        from replay import ReplayWriter, read_games
+    recorder = ReplayWriter(recording) if recording else None
+    recorded = None
+    if args.replay:
+        recorded = next((game for number, game in enumerate(read_games(args.replay)) if number == args.replay_game),
+                        None)
+        if recorded is None:
+            raise SystemExit(f"{args.replay} has no game {args.replay_game}")
+        config = config.resized(recorded.num_rows, recorded.num_cols)
+    init_display(config)
+    start_music()
     clock = pygame.time.Clock()
-
-    # Main game loop
-
-    set_up_player_ships(player_grid, enemy_grid, ship_list, button_list, hit_list)
-    button_list.empty()
-    instruction_text = "Ships locked in!"
-    refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list)
-    pygame.time.wait(1000)
-
-    playing = True
-    while playing:
-        instruction_text = "Your go. Choose enemy cell to target."
-        for event in pygame.event.get():
+    overlay_list = pygame.sprite.GroupSingle()
+    overlay = MetricsOverlay(clock)
+
+    def new_game():
+        if recorded:
+            return ReplayViewer(recorded, config.cell_width)
+        if not args.connect:
+            return Game(recorder=recorder, difficulty=args.difficulty, config=config, think_time=args.think_time)
+        from client import NetworkOpponent
+        host, _, port = args.connect.rpartition(":")
+        try:
+            opponent = NetworkOpponent(host or "127.0.0.1", int(port))
+        except OSError as error:
+            raise SystemExit(f"Can't connect to the server at {args.connect}: {error}")
+        return Game(opponent, config=config)
+    game = new_game()
+    game.draw(overlay_list)
+    try:
+        # Main game loop, shared by every phase of every game so that restarting never deepens the stack
+        while True:
+            run_frame(game, clock, overlay_list, overlay)
+            if game.restart:
+                game.close()
+                start_music()
+                game = new_game()
+                game.draw(overlay_list)
+    finally:
+        # Ends any replay being recorded, however the loop is left
+        game.close()
+
+
+def next_events(game, active: bool) -> list:
+    """Returns the events to handle this frame. While active the frame loop runs at up to FPS and this doesn't
+    wait; otherwise it sleeps until an event arrives, the next scheduled action is due or the network opponent
+    should be polled, so an idle game uses next to no CPU."""
+    if active:
+        return pygame.event.get()
+    timeout = IDLE_WAIT_MS
+    due = game.scheduler.next_due()
+    if due is not None:
+        timeout = min(timeout, due - game.scheduler.clock())
+    if game.opponent:
+        timeout = min(timeout, NETWORK_POLL_MS)
+    if timeout <= 0:
+        return pygame.event.get()
+    # Rounded up, so the loop doesn't wake just before a scheduled action and spin until it is due
+    event = pygame.event.wait(int(timeout) + 1)
+    return ([event] if event.type != NOEVENT else []) + pygame.event.get()
+
+
+def run_frame(game, clock, overlay_list, overlay):
+    """One pass of the frame loop: handles input, runs the actions that are due and redraws if anything changed.
+    Runs at the FPS cap while a ship is being dragged or the metrics overlay is shown, and otherwise waits in
+    next_events for something to happen."""
+    active = bool(overlay_list) or game.animating()
+    events = next_events(game, active)
+    frame_start = time.perf_counter()
+    with metrics.timer("events"):
+        for event in events:
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
-            elif event.type == MOUSEBUTTONDOWN:
-                if enemy_grid.rect.collidepoint(event.pos):
-                    instruction_text = enemy_cell_clicked(button_list, enemy, enemy_grid, hit_list, player_grid,
-                                                          ship_list, instruction_text)
-            else:
-                pygame.display.update()
-
-        refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list)
-        clock.tick(30)
+            if event.type == KEYDOWN and event.key == K_F3:
+                if overlay_list:
+                    overlay_list.empty()
+                else:
+                    overlay_list.add(overlay)
+                continue
+            game.handle_event(event)
+    changed = bool(events)
+    with metrics.timer("scheduled"):
+        changed = game.scheduler.run_due() > 0 or changed
+    if game.opponent:
+        with metrics.timer("network"):
+            changed = game.receive() > 0 or changed
+    if changed or active or game.restart:
+        game.draw(overlay_list)
+        metrics.record("frame_work", (time.perf_counter() - frame_start) * 1000)
+    if active:
+        metrics.record("frame", clock.tick(FPS))
+    else:
+        clock.tick()
 
 
-def enemy_cell_clicked(button_list, enemy, enemy_grid, hit_list, player_grid, ship_list, instruction_text):
-    x, y = pygame.mouse.get_pos()
-    cell = enemy_grid.get_cell(x, y)
+@metrics.timed("player_shot")
+def enemy_cell_clicked(game, pos):
+    """Resolves the player's shot at the enemy grid, then queues the enemy's reply."""
+    cell = game.enemy_grid.get_cell(*pos)
     # Check the cell clicked on to see if it had been clicked before
-    if not cell.is_clicked:
-        cell_rect_center, cell_ship = cell.cell_clicked()
-        if cell_ship:  # ship name will be returned if there is a hit
-            hit_list.add(CellHit(Path(r"./Sprites/hit.png"), cell_rect_center))
-            play_sound("hit")
-            instruction_text = f"You hit the enemy's {cell_ship}!"
-            for ship in enemy.ships:
-                if ship.name == cell.ship:
-                    cell.ship = None
-                    ship.length -= 1
-                    if ship.length == 0:
-                        instruction_text = f"You sunk the enemy's {cell_ship}!"
-                        play_sound("sink")
-                        refresh_screen(player_grid, enemy_grid, button_list, ship_list,
-                                       instruction_text, hit_list, colour=RED)
-                        pygame.time.wait(2000)
-                        if check_for_win(enemy_grid):
-                            instruction_text = "You sunk all the enemy's ships. You win!"
-                            refresh_screen(player_grid, enemy_grid, button_list, ship_list,
-                                           instruction_text, hit_list, colour=RED)
-                            pygame.time.wait(2000)
-                            if game_over(True):
-                                ship_list.empty()
-                                hit_list.empty()
-                                main()
+    if not cell or game.enemy_grid.is_shot(cell):
+        return
+    game.phase = Game.WAITING
+    if game.opponent:
+        # The server resolves the shot, and the result arrives through Game.receive
+        game.opponent.fire(cell.column, cell.row)
+        return
+    _, cell_ship = game.enemy_grid.fire_at(cell)
+    # The markers, sounds and messages, and the end of the game, come from Game's subscribers to these events
+    events = game.enemy_fleet.fire((cell.column, cell.row), cell_ship)
+    game.record_shot(0, (cell.column, cell.row), shot_result(events))
+    if not game.enemy_fleet.destroyed:
+        queue_enemy_move(game, 3000 if isinstance(events[-1], Sunk) else 1000)
+
+
+def queue_enemy_move(game, delay_ms):
+    """Starts the enemy thinking about its move straight away, and queues the move to be shown after delay_ms."""
+    game.thinker.start(game.enemy)
+    game.scheduler.after(delay_ms, enemy_move, game)
+
+
+def enemy_move(game):
+    """Resolves the enemy's shot at the player grid, then queues the player's next turn. If the enemy is still
+    thinking it checks again next frame instead, so the frame loop never waits for it."""
+    if not game.thinker.done():
+        if game.instruction_text != "Enemy is thinking...":
+            game.show("Enemy is thinking...")
+        game.scheduler.after(1000 // FPS, enemy_move, game)
+        return
+    enemy_hit, think_ms = game.thinker.result()
+    metrics.record("ai_think", think_ms)
+    _, cell_ship = game.player_grid.fire_at(game.player_grid.return_cell(enemy_hit))
+    events = game.player_fleet.fire(enemy_hit, cell_ship)
+    game.record_shot(1, enemy_hit, shot_result(events))
+    if not game.player_fleet.destroyed:
+        game.scheduler.after(3000 if isinstance(events[-1], Sunk) else 1000, game.start_player_turn)
+
+
+def opponent_message(game, message):
+    """Shows a message from the network opponent's server, pausing afterwards as enemy_cell_clicked and
+    enemy_move do against EnemyAi."""
+    me = game.opponent.player
+    if isinstance(message, Start):
+        if (message.num_rows, message.num_cols) != (game.player_grid.num_rows, game.player_grid.num_cols):
+            game.opponent.close()
+            game.phase = Game.WAITING
+            game.show(f"The server plays {message.num_rows}x{message.num_cols} games, use a --config of that size.",
+                      RED)
+            game.scheduler.after(4000, game.end, False)
+    elif isinstance(message, Turn):
+        if message.player == me:
+            game.start_player_turn()
         else:
-            hit_list.add(CellHit(Path(r"./Sprites/miss.png"), cell_rect_center))
-            play_sound("miss")
-            instruction_text = "Miss!"
-
-        refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list)
-        pygame.time.wait(1000)
-
-        enemy_hit = enemy.enemy_turn()
-        cell = player_grid.return_cell(enemy_hit)
-        cell_rect_center, cell_ship = cell.cell_clicked()
-        if cell_ship:  # ship name will be returned if there is a hit
-            hit_list.add(CellHit(Path(r"./Sprites/hit.png"), cell_rect_center))
-            if not enemy.ship_hit:
-                enemy.ship_hit = enemy_hit
-            elif enemy.ship_hit:
-                enemy.second_hit = enemy_hit
-            play_sound("hit")
-            instruction_text = f"Enemy attacked, x{enemy_hit[0]} : y{enemy_hit[1]}. " \
-                               f"They hit your {cell_ship}!"
-            for ship in ship_list:
-                if ship.name == cell.ship:
-                    cell.ship = None
-                    ship.length -= 1
-                    if ship.length == 0:
-                        instruction_text = f"Enemy sunk your {cell_ship}!"
-                        play_sound("sink")
-                        enemy.reset_hit_logs()
-                        refresh_screen(player_grid, enemy_grid, button_list, ship_list,
-                                       instruction_text, hit_list, colour=RED)
-                        pygame.time.wait(2000)
-                        if check_for_win(player_grid):
-                            instruction_text = "Enemy sunk all your ships. You lose!"
-                            refresh_screen(player_grid, enemy_grid, button_list, ship_list,
-                                           instruction_text, hit_list, colour=RED)
-                            pygame.time.wait(2000)
-                            if game_over(False):
-                                ship_list.empty()
-                                hit_list.empty()
-                                main()
+            game.show("Your opponent is choosing a target.")
+    elif isinstance(message, Result):
+        mine = message.shooter == me
+        grid = game.enemy_grid if mine else game.player_grid
+        cell_rect_center, _ = grid.fire_at(grid.return_cell((message.row, message.column)))
+        game.hit_list.add(CellHit(Path(SPRITES["hit" if message.ship else "miss"]), cell_rect_center))
+        play_sound("hit" if message.ship else "miss")
+        if mine:
+            instruction_text = f"You hit the enemy's {message.ship}!" if message.ship else "Miss!"
         else:
-            hit_list.add(CellHit(Path(r"./Sprites/miss.png"), cell_rect_center))
-            play_sound("miss")
-            instruction_text = f"Enemy attacked, x{enemy_hit[0]} : y{enemy_hit[1]}. They missed!"
-            if enemy.ship_hit and enemy.second_hit:
-                if not enemy.tested_no_hit:
-                    # record the miss if 2 hits are logged
-                    enemy.tested_no_hit = enemy_hit
-                else:
-                    # if a miss again after a miss already logged, this means the enemy is not
-                    # correctly tracking a ship (eg if 2 ships next to each other)
-                    # set tested_no_hit_2 to break out of the recursion to avoid crash
-                    enemy.tested_no_hit_2 = enemy_hit
-
-        refresh_screen(player_grid, enemy_grid, button_list, ship_list, instruction_text, hit_list)
-        pygame.time.wait(1000)
-    return instruction_text
+            instruction_text = f"Enemy attacked, x{message.row} : y{message.column}. " + \
+                               (f"They hit your {message.ship}!" if message.ship else "They missed!")
+        if message.sunk:
+            instruction_text = f"You sunk the enemy's {message.ship}!" if mine else f"Enemy sunk your {message.ship}!"
+            play_sound("sink")
+            game.show(instruction_text, RED)
+            if message.won:
+                game.scheduler.after(2000, game.show, "You sunk all the enemy's ships. You win!" if mine
+                                     else "Enemy sunk all your ships. You lose!", RED)
+                game.scheduler.after(4000, game.end, mine)
+            else:
+                game.scheduler.after(2000, game.show, instruction_text)
+                game.pause(3000)
+        else:
+            game.show(instruction_text)
+            game.pause(1000)
+    elif isinstance(message, Error):
+        game.show("The server rejected that move.", RED)
+        if message.code in (ALREADY_SHOT, OFF_BOARD):
+            game.scheduler.after(1000, game.start_player_turn)
+    elif isinstance(message, OpponentLeft):
+        game.phase = Game.WAITING
+        game.show("Your opponent left the game. You win!", RED)
+        game.scheduler.after(2000, game.end, True)
 
 
 if __name__ == '__main__':
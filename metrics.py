@@ -0,0 +1,110 @@
+# Lightweight timing instrumentation for the game loop. Each named phase keeps a histogram of its durations,
+# so recording a sample is O(1) however long the game runs, and percentiles can be read at any time.
+
+import functools
+import json
+import math
+import time
+
+
+class Histogram:
+    """Durations in milliseconds, counted into log-spaced buckets each RESOLUTION wider than the last.
+    Percentiles are reported as the upper edge of their bucket, so within RESOLUTION of the true value."""
+    MIN_MS = 0.001  # everything below 1 microsecond shares the first bucket
+    RESOLUTION = 1.05
+    NUM_BUCKETS = 340  # up to about 16 seconds, anything longer goes in the last bucket
+
+    def __init__(self):
+        self.buckets = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, ms: float):
+        if ms <= self.MIN_MS:
+            index = 0
+        else:
+            index = min(int(math.log(ms / self.MIN_MS, self.RESOLUTION)) + 1, self.NUM_BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.last = ms
+
+    def percentile(self, percent: float) -> float:
+        """Returns the duration that percent of the samples are at or below, or 0 if there are none."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= max(rank, 1):
+                return min(self.MIN_MS * self.RESOLUTION ** index, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> dict:
+        return {"count": self.count, "mean_ms": self.mean(), "p50_ms": self.percentile(50),
+                "p99_ms": self.percentile(99), "max_ms": self.max}
+
+
+class Timer:
+    """Context manager that records the time spent inside it in one of a Metrics object's phases."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record((time.perf_counter() - self.start) * 1000)
+
+
+class Metrics:
+    """Histograms of named phases, e.g. "frame", "draw" or "ai_think".
+    Time a block with `with metrics.timer("draw"):` or a whole function with the @metrics.timed("draw") decorator."""
+    def __init__(self):
+        self.phases = {}  # phase name -> Histogram
+
+    def histogram(self, name: str) -> Histogram:
+        if name not in self.phases:
+            self.phases[name] = Histogram()
+        return self.phases[name]
+
+    def record(self, name: str, ms: float):
+        self.histogram(name).record(ms)
+
+    def timer(self, name: str) -> Timer:
+        return Timer(self.histogram(name))
+
+    def timed(self, name: str):
+        """Decorator recording every call of the function in the named phase."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self) -> dict:
+        return {name: histogram.summary() for name, histogram in sorted(self.phases.items())}
+
+    def dump(self, path: str):
+        """Writes the summary of every phase to path as JSON."""
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def reset(self):
+        self.phases.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,171 @@
+# Random fleet placement without retries.
+# The placements of a ship are numbered arithmetically, horizontal ones first, so each ship can be drawn
+# uniformly from the placements that don't overlap the ships already placed without ever building the full list.
+# NumPy is only imported by the methods that use it, so placing a fleet one ship at a time doesn't load it.
+
+import functools
+import random
+
+# On boards with more cells than this a ship is first drawn from all its placements and redrawn if it overlaps,
+# which is quicker than working out every overlapping placement when the board is mostly empty
+REJECTION_CELLS = 1 << 16
+REJECTION_TRIES = 32
+
+
+class Placement:
+    """One position a ship can take. starting_x is the column and starting_y the row of its left/top cell."""
+    __slots__ = ("starting_x", "starting_y", "horizontal", "length")
+
+    def __init__(self, starting_x: int, starting_y: int, horizontal: bool, length: int):
+        self.starting_x = starting_x
+        self.starting_y = starting_y
+        self.horizontal = horizontal
+        self.length = length
+
+    def cells(self) -> list:
+        """Returns the (row, column) cells the ship covers."""
+        if self.horizontal:
+            return [(self.starting_y, self.starting_x + i) for i in range(self.length)]
+        return [(self.starting_y + i, self.starting_x) for i in range(self.length)]
+
+
+class PlacementEngine:
+    """Samples fleets for a board size and list of ship lengths."""
+    def __init__(self, num_rows: int, num_cols: int, lengths: tuple):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.lengths = tuple(lengths)
+        self._covering = {}  # (length, row, column) -> placement numbers, filled in as cells get used
+        self._batch_tables = None
+
+    def horizontal_count(self, length: int) -> int:
+        return self.num_rows * max(self.num_cols - length + 1, 0)
+
+    def placement_count(self, length: int) -> int:
+        """Returns the number of on-board placements of a ship of the given length."""
+        if length == 1:
+            return self.num_rows * self.num_cols  # a single cell ship is the same either way round
+        return self.horizontal_count(length) + max(self.num_rows - length + 1, 0) * self.num_cols
+
+    def placement(self, length: int, index: int) -> Placement:
+        """Returns the placement with the given number, 0 <= index < placement_count(length)."""
+        horizontal_count = self.horizontal_count(length)
+        if index < horizontal_count:
+            starting_y, starting_x = divmod(index, self.num_cols - length + 1)
+            return Placement(starting_x, starting_y, True, length)
+        starting_y, starting_x = divmod(index - horizontal_count, self.num_cols)
+        return Placement(starting_x, starting_y, False, length)
+
+    def placement_cells(self, length: int, indexes: "np.ndarray") -> "np.ndarray":
+        """Returns an array of shape (len(indexes), length) with the flat cell index of every cell covered
+        by each of the numbered placements."""
+        import numpy as np
+        horizontal_count = self.horizontal_count(length)
+        horizontal = indexes < horizontal_count
+        starting_y, starting_x = np.divmod(indexes, max(self.num_cols - length + 1, 1))
+        vertical_y, vertical_x = np.divmod(indexes - horizontal_count, self.num_cols)
+        first = np.where(horizontal, starting_y * self.num_cols + starting_x, vertical_y * self.num_cols + vertical_x)
+        step = np.where(horizontal, 1, self.num_cols)
+        return first[:, None] + step[:, None] * np.arange(length)
+
+    def covering(self, length: int, row: int, column: int) -> list:
+        """Returns the numbers of every placement of a ship of the given length that covers (row, column)."""
+        key = (length, row, column)
+        if key not in self._covering:
+            self._covering[key] = self.find_covering(length, row, column)
+        return self._covering[key]
+
+    def find_covering(self, length: int, row: int, column: int) -> list:
+        horizontal_starts = self.num_cols - length + 1
+        covering = [row * horizontal_starts + x
+                    for x in range(max(column - length + 1, 0), min(column, horizontal_starts - 1) + 1)]
+        if length > 1:
+            offset = self.horizontal_count(length)
+            covering.extend(offset + y * self.num_cols + column
+                            for y in range(max(row - length + 1, 0), min(row, self.num_rows - length) + 1))
+        return covering
+
+    def sample_ship(self, length: int, occupied, rng=random) -> Placement:
+        """Draws a placement uniformly from those that avoid every (row, column) cell in occupied, a set.
+        Raises ValueError if there is nowhere left for the ship."""
+        if self.num_rows * self.num_cols > REJECTION_CELLS and self.placement_count(length):
+            for _ in range(REJECTION_TRIES):
+                placement = self.placement(length, rng.randrange(self.placement_count(length)))
+                if occupied.isdisjoint(placement.cells()):
+                    return placement
+        excluded = set()
+        for row, column in occupied:
+            excluded.update(self.covering(length, row, column))
+        legal_count = self.placement_count(length) - len(excluded)
+        if legal_count <= 0:
+            raise ValueError(f"No room left for a ship of length {length}")
+        # Pick the k-th legal placement by stepping k past every excluded number at or below it
+        index = rng.randrange(legal_count)
+        for excluded_index in sorted(excluded):
+            if excluded_index > index:
+                break
+            index += 1
+        return self.placement(length, index)
+
+    def sample(self, rng=random, occupied=()) -> list:
+        """Returns one Placement per ship, in the order of self.lengths, with no overlaps.
+        occupied is a collection of (row, column) cells that must be left empty."""
+        occupied = set(occupied)
+        fleet = []
+        for length in self.lengths:
+            placement = self.sample_ship(length, occupied, rng)
+            occupied.update(placement.cells())
+            fleet.append(placement)
+        return fleet
+
+    def batch_tables(self) -> dict:
+        """Every placement of each length as 64 bit words of a row-major cell mask, for the vectorised sampler.
+        Built on first use."""
+        import numpy as np
+        if self._batch_tables is None:
+            num_words = (self.num_rows * self.num_cols + 63) // 64
+            self._batch_tables = {}
+            for length in set(self.lengths):
+                placements = [self.placement(length, index) for index in range(self.placement_count(length))]
+                words = np.zeros((len(placements), num_words), dtype=np.uint64)
+                for i, placement in enumerate(placements):
+                    for row, column in placement.cells():
+                        word, bit = divmod(row * self.num_cols + column, 64)
+                        words[i, word] |= np.uint64(1 << bit)
+                details = np.array([(placement.starting_x, placement.starting_y, placement.horizontal)
+                                    for placement in placements], dtype=np.int32)
+                self._batch_tables[length] = (words, details)
+        return self._batch_tables
+
+    def sample_batch(self, num_fleets: int, seed=None, chunk_size=4096) -> "np.ndarray":
+        """Samples num_fleets fleets at once with NumPy. Returns an int32 array of shape
+        (num_fleets, number of ships, 3) holding starting_x, starting_y and horizontal for each ship."""
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        tables = self.batch_tables()
+        num_words = (self.num_rows * self.num_cols + 63) // 64
+        fleets = np.empty((num_fleets, len(self.lengths), 3), dtype=np.int32)
+        for start in range(0, num_fleets, chunk_size):
+            count = min(chunk_size, num_fleets - start)
+            occupancy = np.zeros((count, num_words), dtype=np.uint64)
+            for ship, length in enumerate(self.lengths):
+                words, details = tables[length]
+                conflict = np.zeros((count, len(words)), dtype=bool)
+                for word in range(num_words):
+                    conflict |= (occupancy[:, word, None] & words[None, :, word]) != 0
+                # As in sample_ship, pick the k-th legal placement with k uniform over the legal placements
+                legal_so_far = np.cumsum(~conflict, axis=1, dtype=np.int32)
+                legal_count = legal_so_far[:, -1]
+                if not legal_count.all():
+                    raise ValueError(f"No room left for a ship of length {length}")
+                pick = (rng.random(count) * legal_count).astype(np.int32)
+                chosen = np.argmax(legal_so_far > pick[:, None], axis=1)
+                occupancy |= words[chosen]
+                fleets[start:start + count, ship] = details[chosen]
+        return fleets
+
+
+@functools.lru_cache(maxsize=None)
+def placement_engine(num_rows: int, num_cols: int, lengths: tuple) -> PlacementEngine:
+    """Returns a shared PlacementEngine, so the batch tables are only built once per board and fleet."""
+    return PlacementEngine(num_rows, num_cols, lengths)
@@ -0,0 +1,148 @@
+# Binary protocol spoken between server.py and its clients.
+# Every message is a 2 byte header, the message type then the payload length, followed by a fixed layout payload
+# of network order integers. Cells are (row, column), as in engine.py, and ships are sent as their index in SHIPS.
+
+import struct
+from typing import NamedTuple, Optional
+
+from engine import SHIPS
+
+SHIP_NAMES = list(SHIPS)
+
+HEADER = struct.Struct("!BB")
+
+# Error codes carried by Error messages
+NOT_YOUR_TURN = 1
+BAD_PLACEMENT = 2
+ALREADY_SHOT = 3
+OFF_BOARD = 4
+UNEXPECTED = 5
+EXPIRED = 6  # the game was idle for too long, or evicted to make room for new ones
+
+
+class Join(NamedTuple):
+    """Client -> server: asks to be paired with the next player to join."""
+
+
+class Start(NamedTuple):
+    """Server -> client: an opponent was found. player is 0 or 1, player 0 fires first."""
+    player: int
+    num_rows: int
+    num_cols: int
+
+
+class Place(NamedTuple):
+    """Client -> server: the whole fleet, as (ship name, starting_x, starting_y, horizontal) tuples."""
+    ships: tuple
+
+
+class Turn(NamedTuple):
+    """Server -> both clients: the given player may fire. Sent once both fleets are placed and after every shot
+    that doesn't end the game."""
+    player: int
+
+
+class Shot(NamedTuple):
+    """Client -> server: fire at a cell of the opponent's board."""
+    row: int
+    column: int
+
+
+class Result(NamedTuple):
+    """Server -> both clients: the outcome of a shot. ship is the name of the ship hit, or None for a miss."""
+    shooter: int
+    row: int
+    column: int
+    ship: Optional[str]
+    sunk: bool
+    won: bool
+
+
+class Error(NamedTuple):
+    """Server -> client: the last message was rejected, code is one of the error codes above."""
+    code: int
+
+
+class OpponentLeft(NamedTuple):
+    """Server -> client: the opponent disconnected before the game was over."""
+
+
+class JoinAi(NamedTuple):
+    """Client -> server: asks for a game against an EnemyAi run by the server. targeting is the index of its
+    targeting mode in EnemyAi.TARGETING_MODES."""
+    targeting: int = 0
+
+
+MESSAGE_TYPES = [Join, Start, Place, Turn, Shot, Result, Error, OpponentLeft, JoinAi]  # type byte is the index + 1
+TYPE_IDS = {message_type: i + 1 for i, message_type in enumerate(MESSAGE_TYPES)}
+PAYLOADS = {Start: struct.Struct("!BHH"), Turn: struct.Struct("!B"), Shot: struct.Struct("!HH"),
+            Result: struct.Struct("!BHHBB"), Error: struct.Struct("!B"), JoinAi: struct.Struct("!B")}
+SHIP_PLACEMENT = struct.Struct("!BHHB")  # one per ship in a Place message
+SUNK = 1  # Result flags
+WON = 2
+
+
+def encode(message) -> bytes:
+    """Returns the header and payload of a message."""
+    message_type = type(message)
+    if message_type is Place:
+        payload = b"".join(SHIP_PLACEMENT.pack(SHIP_NAMES.index(name), x, y, horizontal)
+                           for name, x, y, horizontal in message.ships)
+    elif message_type is Result:
+        ship = SHIP_NAMES.index(message.ship) + 1 if message.ship else 0
+        payload = PAYLOADS[Result].pack(message.shooter, message.row, message.column, ship,
+                                        SUNK * message.sunk | WON * message.won)
+    elif message_type in PAYLOADS:
+        payload = PAYLOADS[message_type].pack(*message)
+    else:
+        payload = b""
+    return HEADER.pack(TYPE_IDS[message_type], len(payload)) + payload
+
+
+def decode(type_id: int, payload: bytes):
+    """Returns the message for a type byte and payload. Raises ValueError if they are malformed."""
+    if not 1 <= type_id <= len(MESSAGE_TYPES):
+        raise ValueError(f"Unknown message type {type_id}")
+    message_type = MESSAGE_TYPES[type_id - 1]
+    try:
+        if message_type is Place:
+            ships = tuple((SHIP_NAMES[index], x, y, bool(horizontal))
+                          for index, x, y, horizontal in SHIP_PLACEMENT.iter_unpack(payload))
+            return Place(ships)
+        if message_type is Result:
+            shooter, row, column, ship, flags = PAYLOADS[Result].unpack(payload)
+            return Result(shooter, row, column, SHIP_NAMES[ship - 1] if ship else None,
+                          bool(flags & SUNK), bool(flags & WON))
+        if message_type in PAYLOADS:
+            return message_type(*PAYLOADS[message_type].unpack(payload))
+    except (struct.error, IndexError) as error:
+        raise ValueError(f"Malformed {message_type.__name__} message") from error
+    if payload:
+        raise ValueError(f"Malformed {message_type.__name__} message")
+    return message_type()
+
+
+async def read_message(reader):
+    """Reads the next message from an asyncio StreamReader. Raises asyncio.IncompleteReadError when the
+    connection closes."""
+    type_id, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return decode(type_id, await reader.readexactly(length) if length else b"")
+
+
+class Decoder:
+    """Splits a byte stream read from a plain socket into messages."""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        """Adds the bytes received and returns every message now complete."""
+        self.buffer += data
+        messages = []
+        while len(self.buffer) >= HEADER.size:
+            type_id, length = HEADER.unpack_from(self.buffer)
+            end = HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            messages.append(decode(type_id, bytes(self.buffer[HEADER.size:end])))
+            del self.buffer[:end]
+        return messages
@@ -0,0 +1,280 @@
+# Compact binary replays. A replay file is a sequence of games, each written as it is played:
+#   header   5 little-endian 32 bit words: magic, seed (2 words), num_rows | num_cols << 16,
+#            number of ships | flags << 8
+#   fleets   2 words per ship, player 0's fleet then player 1's: ship index | horizontal << 8 | starting_x << 16,
+#            then starting_y | length << 16. Files from before lengths were stored have a length of 0, which is read
+#            as the ship's length in SHIPS
+#   shots    1 word per shot: row-major cell index (24 bits) | shooter << 24 | sunk << 25 | won << 26
+#            | (ship index + 1, or 0 for a miss) << 27
+#   end      1 word, END
+# Every field is a whole 32 bit word, so an archive of millions of games can be loaded as one NumPy array.
+# Run to print statistics of an archive: python replay.py PATH
+
+import argparse
+import struct
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from engine import SHIPS, BitBoard, GameResult
+
+SHIP_NAMES = list(SHIPS)
+MAGIC = 0x31525342  # b"BSR1"
+END = 0xFFFFFFFF
+HEADER = struct.Struct("<IQIBBH")
+SHIP = struct.Struct("<BBHHH")
+WORD = struct.Struct("<I")
+HEADER_WORDS = HEADER.size // 4
+SHIP_WORDS = SHIP.size // 4
+HAS_SEED = 1  # header flags
+MAX_CELLS = 1 << 24  # cell indexes have 24 bits, and the all-ones record is END
+
+
+class ShotRecord(NamedTuple):
+    """One shot of a replay. ship is the name of the ship hit, or None for a miss."""
+    shooter: int
+    row: int
+    column: int
+    ship: Optional[str]
+    sunk: bool
+    won: bool
+
+
+class ReplayGame(NamedTuple):
+    """One recorded game. fleets holds each player's ships as (ship name, starting_x, starting_y, horizontal,
+    length) tuples, and records the packed shots as a uint32 array; shots() decodes them."""
+    seed: Optional[int]
+    num_rows: int
+    num_cols: int
+    fleets: tuple
+    records: np.ndarray
+
+    def shots(self):
+        for record in self.records.tolist():
+            yield decode_shot(record, self.num_cols)
+
+
+def encode_shot(shooter: int, row: int, column: int, num_cols: int, ship: Optional[str], sunk: bool,
+                won: bool) -> int:
+    ship_index = SHIP_NAMES.index(ship) + 1 if ship else 0
+    return (row * num_cols + column) | shooter << 24 | sunk << 25 | won << 26 | ship_index << 27
+
+
+def decode_shot(record: int, num_cols: int) -> ShotRecord:
+    row, column = divmod(record & 0xFFFFFF, num_cols)
+    ship_index = record >> 27
+    return ShotRecord(record >> 24 & 1, row, column, SHIP_NAMES[ship_index - 1] if ship_index else None,
+                      bool(record >> 25 & 1), bool(record >> 26 & 1))
+
+
+class ReplayWriter:
+    """Streams games to a binary file object. Call start_game, then shot for every shot as it is fired, then
+    end_game. Each game is flushed when it ends, so a crash loses at most the game in progress."""
+    def __init__(self, file):
+        self.file = file
+        self.num_cols = None  # of the game in progress
+
+    def start_game(self, num_rows: int, num_cols: int, fleets: tuple, seed=None):
+        """fleets holds each player's ships as (ship name, starting_x, starting_y, horizontal, length) tuples,
+        or objects with name, column, row, horizontal and length attributes such as FleetShip."""
+        if num_rows * num_cols >= MAX_CELLS or max(num_rows, num_cols) > 0xFFFF:
+            raise ValueError(f"Replays hold boards of fewer than {MAX_CELLS} cells and 65536 rows or columns")
+        fleets = [[ship if isinstance(ship, tuple) else (ship.name, ship.column, ship.row, ship.horizontal,
+                                                         ship.length)
+                   for ship in fleet] for fleet in fleets]
+        if len(fleets) != 2 or len(fleets[0]) != len(fleets[1]):
+            raise ValueError("A replay needs two fleets of the same size")
+        self.num_cols = num_cols
+        self.file.write(HEADER.pack(MAGIC, seed or 0, num_rows | num_cols << 16, len(fleets[0]),
+                                    HAS_SEED if seed is not None else 0, 0))
+        self.file.write(b"".join(SHIP.pack(SHIP_NAMES.index(name), horizontal, x, y, length)
+                                 for fleet in fleets for name, x, y, horizontal, length in fleet))
+
+    def shot(self, shooter: int, target: tuple, result):
+        """Records a shot by player 0 or 1 at the (row, column) target, and its ShotResult."""
+        self.file.write(WORD.pack(encode_shot(shooter, *target, self.num_cols, result.ship, result.sunk,
+                                              result.won)))
+
+    def end_game(self):
+        self.file.write(WORD.pack(END))
+        self.file.flush()
+        self.num_cols = None
+
+
+class ReplayReader:
+    """Reads the games of a binary file object one at a time, without loading the whole file."""
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = b""
+        self.position = 0
+
+    def read(self, size: int) -> bytes:
+        while len(self.buffer) - self.position < size:
+            chunk = self.file.read(self.CHUNK_SIZE)
+            if not chunk:
+                raise EOFError("Replay ends in the middle of a game")
+            self.buffer = self.buffer[self.position:] + chunk
+            self.position = 0
+        data = self.buffer[self.position:self.position + size]
+        self.position += size
+        return data
+
+    def at_end(self) -> bool:
+        if self.position < len(self.buffer):
+            return False
+        self.buffer = self.file.read(self.CHUNK_SIZE)
+        self.position = 0
+        return not self.buffer
+
+    def read_records(self) -> np.ndarray:
+        """Reads shot records up to and including the END word, returning the shots."""
+        parts = []
+        while True:
+            available = (len(self.buffer) - self.position) // 4 * 4
+            if not available:
+                self.read(4)  # fills the buffer, or raises EOFError
+                self.position -= 4
+                continue
+            words = np.frombuffer(self.buffer, dtype="<u4", count=available // 4, offset=self.position)
+            ends = np.flatnonzero(words == END)
+            if len(ends):
+                parts.append(words[:ends[0]])
+                self.position += (int(ends[0]) + 1) * 4
+                return np.concatenate(parts) if len(parts) > 1 else parts[0].copy()
+            parts.append(words.copy())
+            self.position += available
+
+    def __iter__(self):
+        while not self.at_end():
+            magic, seed, size, num_ships, flags, _ = HEADER.unpack(self.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("Not a replay file, or a corrupted one")
+            ships = [SHIP.unpack(self.read(SHIP.size)) for _ in range(num_ships * 2)]
+            fleets = tuple(tuple((SHIP_NAMES[index], x, y, bool(horizontal), length or SHIPS[SHIP_NAMES[index]][0])
+                                 for index, horizontal, x, y, length in fleet)
+                           for fleet in (ships[:num_ships], ships[num_ships:]))
+            yield ReplayGame(seed if flags & HAS_SEED else None, size & 0xFFFF, size >> 16, fleets,
+                             self.read_records())
+
+
+def read_games(path: str):
+    """Yields every game in the replay file at path."""
+    with open(path, "rb") as file:
+        yield from ReplayReader(file)
+
+
+def replay(game: ReplayGame, board_class=BitBoard) -> GameResult:
+    """Plays a recorded game back on fresh boards, checking every shot resolves as it was recorded.
+    Raises ValueError if it doesn't."""
+    boards = [board_class(game.num_rows, game.num_cols), board_class(game.num_rows, game.num_cols)]
+    for board, fleet in zip(boards, game.fleets):
+        for name, x, y, horizontal, length in fleet:
+            board.update_cells_with_ship(x, y, name, length, horizontal)
+    shots = [0, 0]
+    for shot in game.shots():
+        result = boards[1 - shot.shooter].fire((shot.row, shot.column))
+        if tuple(result) != (shot.ship, shot.sunk, shot.won):
+            raise ValueError(f"Shot {shot} resolved as {result} on replay")
+        shots[shot.shooter] += 1
+        if result.won:
+            return GameResult(shot.shooter, tuple(shots))
+    raise ValueError("Replay ends before the game was won")
+
+
+class ReplayArchive:
+    """Every game of a replay file loaded at once into NumPy arrays, for statistics over large archives.
+    starts and ends are the word offsets of each game's header and END word, and records holds every shot of
+    every game in order, with record_game the game each belongs to."""
+    def __init__(self, path: str):
+        self.words = np.fromfile(path, dtype="<u4")
+        self.starts, self.ends = self.find_games()
+        self.sizes = self.words[self.starts + 3]
+        self.num_ships = self.words[self.starts + 4] & 0xFF
+        first_shot = self.starts + HEADER_WORDS + 2 * SHIP_WORDS * self.num_ships
+        self.shot_counts = self.ends - first_shot
+        # Mark the words between each game's first shot and its END, by summing +1/-1 steps at the boundaries
+        steps = np.zeros(len(self.words) + 1, dtype=np.int8)
+        np.add.at(steps, first_shot, 1)
+        np.add.at(steps, self.ends, -1)
+        self.records = self.words[np.cumsum(steps[:-1], dtype=np.int8).astype(bool)]
+        self.record_game = np.repeat(np.arange(len(self.starts)), self.shot_counts)
+
+    def find_games(self) -> tuple:
+        """Returns the start and END offsets of every game. Shot records can never equal END, so when every
+        END word found is preceded by a whole header, they are the games' ends; a header word that happens to
+        equal END is caught by that check and the games are walked one by one instead."""
+        ends = np.flatnonzero(self.words == END)
+        starts = np.concatenate(([0], ends[:-1] + 1)).astype(ends.dtype)
+        if len(ends) and ends[-1] == len(self.words) - 1 and (self.words[starts] == MAGIC).all():
+            header_words = HEADER_WORDS + 2 * SHIP_WORDS * (self.words[starts + 4] & 0xFF)
+            if (ends - starts >= header_words).all():
+                return starts, ends
+        starts, ends = [], []
+        position = 0
+        while position < len(self.words):
+            if self.words[position] != MAGIC:
+                raise ValueError("Not a replay file, or a corrupted one")
+            first_shot = position + HEADER_WORDS + 2 * SHIP_WORDS * int(self.words[position + 4] & 0xFF)
+            end = first_shot + int(np.argmax(self.words[first_shot:] == END))
+            starts.append(position)
+            ends.append(end)
+            position = end + 1
+        return np.array(starts), np.array(ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def statistics(self) -> dict:
+        """Returns the number of games and shots, each player's win rate, the mean and spread of the winner's
+        shot count and the overall hit rate."""
+        shooters = (self.records >> 24 & 1).astype(np.int64)
+        won = (self.records >> 26 & 1).astype(bool)
+        hits = self.records >> 27 != 0
+        winners = np.full(len(self), -1)
+        winners[self.record_game[won]] = shooters[won]
+        # Shots fired by each player in each game, as a (games, 2) array
+        shots = np.bincount(self.record_game * 2 + shooters, minlength=len(self) * 2).reshape(-1, 2)
+        finished = winners >= 0
+        winning_shots = shots[finished, winners[finished]]
+        return {"games": len(self),
+                "shots": len(self.records),
+                "unfinished": int((~finished).sum()),
+                "first_player_win_rate": float((winners[finished] == 0).mean()) if finished.any() else 0.0,
+                "mean_shots_to_win": float(winning_shots.mean()) if finished.any() else 0.0,
+                "stdev_shots_to_win": float(winning_shots.std()) if finished.any() else 0.0,
+                "hit_rate": float(hits.mean()) if len(hits) else 0.0}
+
+    def heatmap(self, num_rows: int, num_cols: int, hits_only=False) -> np.ndarray:
+        """Returns how often each cell was fired at (or hit) over every game played on a num_rows x num_cols
+        board."""
+        same_size = self.sizes[self.record_game] == (num_rows | num_cols << 16)
+        records = self.records[same_size]
+        if hits_only:
+            records = records[records >> 27 != 0]
+        return np.bincount(records & 0xFFFFFF, minlength=num_rows * num_cols).reshape(num_rows, num_cols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print statistics of a replay archive.")
+    parser.add_argument("path")
+    parser.add_argument("--verify", action="store_true", help="also replay every game to check it is consistent")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    archive = ReplayArchive(args.path)
+    statistics = archive.statistics()
+    elapsed = time.perf_counter() - start
+    for name, value in statistics.items():
+        print(f"{name}: {value:.4g}" if isinstance(value, float) else f"{name}: {value}")
+    print(f"Loaded and summarised in {elapsed:.2f}s ({len(archive) / elapsed:.0f} games/sec)")
+    if args.verify:
+        start = time.perf_counter()
+        count = sum(1 for game in read_games(args.path) if replay(game))
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {count} games in {elapsed:.2f}s ({count / elapsed:.0f} games/sec)")
+
+
+if __name__ == '__main__':
+    main()
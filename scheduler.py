@@ -0,0 +1,43 @@
+# Timeline of delayed actions, run from a frame loop so that pauses never block event handling or drawing.
+
+import heapq
+import itertools
+import time
+
+
+def monotonic_ms() -> float:
+    return time.monotonic() * 1000
+
+
+class Scheduler:
+    """Queue of actions due at a given time in milliseconds. clock returns the current time, e.g.
+    pygame.time.get_ticks; actions are only ever run by run_due, from the caller's loop."""
+    def __init__(self, clock=monotonic_ms):
+        self.clock = clock
+        self._queue = []
+        self._order = itertools.count()  # keeps actions due at the same time in the order they were queued
+
+    def after(self, delay_ms, action, *args):
+        """Queues action(*args) to run delay_ms from now."""
+        heapq.heappush(self._queue, (self.clock() + delay_ms, next(self._order), action, args))
+
+    def run_due(self) -> int:
+        """Runs every action whose time has come, including any they queue that are already due.
+        Returns the number of actions run."""
+        now = self.clock()
+        count = 0
+        while self._queue and self._queue[0][0] <= now:
+            _, _, action, args = heapq.heappop(self._queue)
+            action(*args)
+            count += 1
+        return count
+
+    def next_due(self):
+        """Returns the time the next action is due, or None if nothing is queued."""
+        return self._queue[0][0] if self._queue else None
+
+    def busy(self) -> bool:
+        return bool(self._queue)
+
+    def clear(self):
+        self._queue.clear()
@@ -0,0 +1,224 @@
+# Game server. Players are paired in the order they join, or given a hosted EnemyAi opponent, and the server keeps
+# the authoritative board of each game, so clients only ever learn the outcome of a shot. Run with:
+# python server.py [--host HOST] [--port PORT] [--rows ROWS] [--cols COLS] [--ai-workers N]
+#                  [--max-sessions N] [--idle-timeout SECONDS]
+
+import argparse
+import asyncio
+
+from engine import SHIPS, BitBoard, EnemyAi
+from protocol import (ALREADY_SHOT, BAD_PLACEMENT, EXPIRED, NOT_YOUR_TURN, OFF_BOARD, UNEXPECTED, Decoder, Error,
+                      Join, JoinAi, OpponentLeft, Place, Result, Shot, Start, Turn, encode)
+from sessions import AiPlayer, AiWorkers, SessionManager
+
+DEFAULT_PORT = 5555
+
+
+class Connection(asyncio.Protocol):
+    """One client's connection, and its seat in a game once it has been paired. Incoming bytes are decoded and
+    handled in data_received, so no coroutine is kept per client and a shot is answered in the same callback."""
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.decoder = Decoder()
+        self.session = None
+        self.player = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        try:
+            messages = self.decoder.feed(data)
+        except ValueError:
+            # Anything that isn't the protocol ends the connection
+            return self.transport.close()
+        for message in messages:
+            self.server.dispatch(self, message)
+
+    def connection_lost(self, exc):
+        self.server.leave(self)
+
+    def send(self, *messages):
+        """Writes the messages in a single call, so a reply of several messages costs one system call."""
+        if not self.transport.is_closing():
+            self.transport.write(b"".join(encode(message) for message in messages))
+
+    def close(self):
+        self.transport.close()
+
+
+class GameSession:
+    """State of one game between two players, each a Connection or an AiPlayer. Boards are BitBoards, to keep
+    thousands of games per process small. boards[player] is the board holding that player's own fleet."""
+    __slots__ = ("connections", "boards", "placed", "turn", "over")
+
+    def __init__(self, connections: list, num_rows: int, num_cols: int):
+        self.connections = connections
+        self.boards = [BitBoard(num_rows, num_cols), BitBoard(num_rows, num_cols)]
+        self.placed = [False, False]
+        self.turn = 0
+        self.over = False
+        for player, connection in enumerate(connections):
+            connection.session = self
+            connection.player = player
+            connection.send(Start(player, num_rows, num_cols))
+
+    def broadcast(self, *messages):
+        for connection in self.connections:
+            connection.send(*messages)
+
+    def place(self, player: int, ships: tuple):
+        """Places a player's fleet, which must hold every ship in SHIPS exactly once. Fire starts once both
+        fleets are in."""
+        connection = self.connections[player]
+        if self.placed[player]:
+            return connection.send(Error(UNEXPECTED))
+        board = self.boards[player]
+        try:
+            if sorted(name for name, *_ in ships) != sorted(SHIPS):
+                raise ValueError("Fleet doesn't match SHIPS")
+            for name, starting_x, starting_y, horizontal in ships:
+                board.update_cells_with_ship(starting_x, starting_y, name, SHIPS[name][0], horizontal)
+        except ValueError:
+            board.clear_ships()
+            return connection.send(Error(BAD_PLACEMENT))
+        self.placed[player] = True
+        if all(self.placed):
+            self.broadcast(Turn(self.turn))
+
+    def shot(self, player: int, row: int, column: int):
+        connection = self.connections[player]
+        if self.over or not all(self.placed) or player != self.turn:
+            return connection.send(Error(NOT_YOUR_TURN))
+        board = self.boards[1 - player]
+        if not (0 <= row < board.num_rows and 0 <= column < board.num_cols):
+            return connection.send(Error(OFF_BOARD))
+        if board.is_shot((row, column)):
+            return connection.send(Error(ALREADY_SHOT))
+        result = board.fire((row, column))
+        message = Result(player, row, column, result.ship, result.sunk, result.won)
+        if result.won:
+            self.over = True
+            self.broadcast(message)
+        else:
+            self.turn = 1 - player
+            self.broadcast(message, Turn(self.turn))
+
+    def leave(self, player: int):
+        """Ends the game when a player disconnects, letting the other know if it was still being played."""
+        if not self.over:
+            self.over = True
+            self.connections[1 - player].send(OpponentLeft())
+
+    def expire(self):
+        """Ends the game on the server's behalf, disconnecting both players."""
+        self.over = True
+        for connection in self.connections:
+            connection.send(Error(EXPIRED))
+            connection.close()
+
+
+class GameServer:
+    """Accepts connections and starts GameSessions on num_rows x num_cols boards, either between two connections
+    or against a hosted EnemyAi. ai_workers is the number of processes the hosted AIs think in; with 0 they
+    run in the event loop, which is quicker for the cheap "hunt" targeting. Games are tracked by a
+    SessionManager, which expires idle ones."""
+    SWEEP_SECONDS = 10  # how often idle games are looked for when no messages are arriving
+
+    def __init__(self, num_rows=10, num_cols=10, max_sessions=10000, idle_timeout=300.0, ai_workers=0):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.waiting = None  # connection that has joined and not yet been paired
+        self.sessions = SessionManager(max_sessions, idle_timeout)
+        self.workers = AiWorkers(ai_workers) if ai_workers else None
+        self.games_started = 0
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Starts listening and returns the asyncio server. port 0 picks a free port."""
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.SWEEP_SECONDS, self.sweep)
+        return await loop.create_server(lambda: Connection(self), host, port)
+
+    def sweep(self):
+        self.sessions.expire_idle()
+        asyncio.get_running_loop().call_later(self.SWEEP_SECONDS, self.sweep)
+
+    def close(self):
+        if self.workers:
+            self.workers.shutdown()
+
+    def start_game(self, players: list):
+        self.sessions.add(GameSession(players, self.num_rows, self.num_cols))
+        self.games_started += 1
+
+    def join(self, connection: Connection):
+        if connection.session or connection is self.waiting:
+            return connection.send(Error(UNEXPECTED))
+        if self.waiting is None:
+            self.waiting = connection
+        else:
+            self.start_game([self.waiting, connection])
+            self.waiting = None
+
+    def join_ai(self, connection: Connection, targeting: int):
+        if connection.session or connection is self.waiting or targeting >= len(EnemyAi.TARGETING_MODES):
+            return connection.send(Error(UNEXPECTED))
+        self.start_game([connection, AiPlayer(EnemyAi.TARGETING_MODES[targeting], self.workers)])
+
+    def dispatch(self, connection: Connection, message):
+        session = connection.session
+        if isinstance(message, Join):
+            self.join(connection)
+        elif isinstance(message, JoinAi):
+            self.join_ai(connection, message.targeting)
+        elif session is None:
+            connection.send(Error(UNEXPECTED))
+        elif isinstance(message, Place):
+            self.sessions.touch(session)
+            session.place(connection.player, message.ships)
+        elif isinstance(message, Shot):
+            self.sessions.touch(session)
+            session.shot(connection.player, message.row, message.column)
+        else:
+            connection.send(Error(UNEXPECTED))
+
+    def leave(self, connection: Connection):
+        if self.waiting is connection:
+            self.waiting = None
+        if connection.session:
+            connection.session.leave(connection.player)
+            self.sessions.remove(connection.session)
+
+
+async def serve(host: str, port: int, game_server: GameServer):
+    server = await game_server.start(host, port)
+    print(f"Serving {game_server.num_rows}x{game_server.num_cols} games on "
+          f"{', '.join(str(sock.getsockname()) for sock in server.sockets)}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a two player Battleships server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--ai-workers", type=int, default=0,
+                        help="processes for hosted EnemyAi moves, 0 to run them in the event loop")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="games kept before the oldest is expired")
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an idle game is expired")
+    args = parser.parse_args()
+    game_server = GameServer(args.rows, args.cols, args.max_sessions, args.idle_timeout, args.ai_workers)
+    try:
+        asyncio.run(serve(args.host, args.port, game_server))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# Hosted EnemyAi opponents, and the bookkeeping that lets one server keep thousands of games in memory.
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import time
+
+from engine import BitBoard, EnemyAi
+from protocol import OpponentLeft, Result, Start, Turn
+
+
+# EnemyAis of the games assigned to this process, when it is one of AiWorkers' workers: game id -> EnemyAi
+worker_ais = {}
+
+
+def worker_start(game_id: int, num_rows: int, num_cols: int, targeting: str) -> tuple:
+    """Creates a game's EnemyAi in the worker and returns its fleet, as the ships of a Place message."""
+    ai = worker_ais[game_id] = EnemyAi(BitBoard(num_rows, num_cols), targeting)
+    ai.randomise_ships()
+    return tuple((ship.name, ship.column, ship.row, ship.horizontal) for ship in ai.ships)
+
+
+def worker_turn(game_id: int, last_result) -> tuple:
+    """Records the outcome of the EnemyAi's previous shot, if any, as (target, hit, sunk, ship name) and returns
+    its next target."""
+    ai = worker_ais[game_id]
+    if last_result:
+        ai.record_result(*last_result)
+    return ai.enemy_turn()
+
+
+def worker_end(game_id: int):
+    worker_ais.pop(game_id, None)
+
+
+class AiWorkers:
+    """Process pool for hosted EnemyAis in which each game always goes to the same worker, so its EnemyAi lives
+    in that worker and only shots cross between processes, rather than the whole AI state on every move."""
+    def __init__(self, num_workers: int):
+        self.executors = [ProcessPoolExecutor(1) for _ in range(num_workers)]
+
+    def submit(self, game_id: int, func, *args) -> asyncio.Future:
+        executor = self.executors[game_id % len(self.executors)]
+        return asyncio.get_running_loop().run_in_executor(executor, func, game_id, *args)
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
+
+
+class AiPlayer:
+    """Plays one seat of a GameSession with an EnemyAi. It is sent the session's messages like a Connection,
+    and fires back through the session. With AiWorkers the EnemyAi lives in a worker process, so an expensive
+    targeting mode never holds up the event loop; without, it runs in the event loop."""
+    game_ids = itertools.count()
+
+    def __init__(self, targeting="hunt", workers=None):
+        self.targeting = targeting
+        self.workers = workers
+        self.game_id = next(AiPlayer.game_ids)
+        self.session = None
+        self.player = None
+        self.ai = None  # only when running in the event loop
+        self.last_result = None  # outcome of the last shot, sent to the worker with the next turn
+        self.ended = False
+
+    def send(self, *messages):
+        for message in messages:
+            if isinstance(message, Start):
+                self.start(message.num_rows, message.num_cols)
+            elif isinstance(message, Turn) and message.player == self.player:
+                self.move()
+            elif isinstance(message, Result) and message.shooter == self.player:
+                result = ((message.row, message.column), message.ship is not None, message.sunk, message.ship)
+                if self.ai:
+                    self.ai.record_result(*result)
+                else:
+                    self.last_result = result
+            if isinstance(message, OpponentLeft) or isinstance(message, Result) and message.won:
+                self.close()
+
+    def start(self, num_rows: int, num_cols: int):
+        if self.workers is None:
+            self.ai = EnemyAi(BitBoard(num_rows, num_cols), self.targeting)
+            self.ai.randomise_ships()
+            self.place(tuple((ship.name, ship.column, ship.row, ship.horizontal) for ship in self.ai.ships))
+        else:
+            future = self.workers.submit(self.game_id, worker_start, num_rows, num_cols, self.targeting)
+            future.add_done_callback(lambda done: self.worker_done(done, self.place))
+
+    def worker_done(self, done: asyncio.Future, then):
+        """Passes the result of a worker call to then. Calls cancelled by AiWorkers.shutdown are dropped, and if
+        the call failed, say because the worker died, the AI leaves the game rather than keep its opponent waiting."""
+        if done.cancelled():
+            return
+        if done.exception() is not None:
+            self.ended = True  # the worker may be gone, so nothing is sent to it to free the EnemyAi
+            self.session.leave(self.player)
+            return
+        then(done.result())
+
+    def place(self, ships: tuple):
+        if not self.session.over:
+            self.session.place(self.player, ships)
+
+    def move(self):
+        if self.workers is None:
+            # Fire on the next loop iteration rather than from inside the broadcast that brought the Turn
+            asyncio.get_running_loop().call_soon(self.fire, self.ai.enemy_turn())
+        else:
+            future = self.workers.submit(self.game_id, worker_turn, self.last_result)
+            future.add_done_callback(lambda done: self.worker_done(done, self.fire))
+            self.last_result = None
+
+    def fire(self, target: tuple):
+        if not self.session.over:
+            self.session.shot(self.player, *target)
+
+    def close(self):
+        """Frees the EnemyAi once the game is over."""
+        if not self.ended:
+            self.ended = True
+            self.ai = None
+            if self.workers:
+                self.workers.submit(self.game_id, worker_end)
+
+
+class SessionManager:
+    """Every game in progress, from least to most recently active. A game is expired when it has had no message
+    for idle_timeout seconds, or when it is the least recently active and room is needed for a new one, so
+    memory stays bounded however clients behave."""
+    def __init__(self, max_sessions=10000, idle_timeout=300.0, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.sessions = OrderedDict()  # GameSession -> time of its last message
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, session):
+        self.sessions[session] = self.clock()
+        while len(self.sessions) > self.max_sessions:
+            self.expire(next(iter(self.sessions)))
+
+    def touch(self, session):
+        """Marks a game as active. Also expires any idle games, which are found at the front in O(1)."""
+        if session in self.sessions:
+            self.sessions[session] = self.clock()
+            self.sessions.move_to_end(session)
+        self.expire_idle()
+
+    def remove(self, session):
+        self.sessions.pop(session, None)
+
+    def expire_idle(self):
+        cutoff = self.clock() - self.idle_timeout
+        while self.sessions:
+            session, last_active = next(iter(self.sessions.items()))
+            if last_active > cutoff:
+                break
+            self.expire(session)
+
+    def expire(self, session):
+        self.remove(session)
+        session.expire()
+        self.expired += 1
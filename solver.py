@@ -0,0 +1,191 @@
+# Posterior solver for EnemyAi's "perfect" targeting.
+# A hit names the ship it struck, so each ship still afloat must cover every hit on it and no miss, sunk ship or
+# hit on another ship. Every fleet meeting those rules is equally likely, and the chance that a cell holds a ship
+# is the share of those fleets covering it. The fleets are counted exactly while there are few enough, and
+# otherwise estimated from fleets drawn by sequential importance sampling, within a time budget per move.
+
+import random
+import time
+
+import numpy as np
+
+from placement import placement_engine
+
+
+class OutOfTime(Exception):
+    """Raised inside the exact count when the time budget runs out."""
+
+
+class Solver:
+    """Tracks the shots fired at one opponent's num_rows x num_cols board and returns the hit probability of
+    every cell. ships maps each ship name to its length. time_budget is the seconds next_target may take:
+    the exact count is abandoned for sampling when it runs out, and sampling stops when it does."""
+    # Largest product of the ships' candidate placement counts the exact count is tried on
+    EXACT_LIMIT = 2_000_000
+    SAMPLE_BATCH = 512
+    MAX_SAMPLES = 200_000
+
+    def __init__(self, num_rows: int, num_cols: int, ships: dict, time_budget=0.05):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.ships = dict(ships)
+        self.time_budget = time_budget
+        self.placements = placement_engine(num_rows, num_cols, tuple(sorted(set(ships.values()))))
+        self.shot = np.zeros(num_rows * num_cols, dtype=bool)
+        self.misses = 0  # bitmask of cells shot without a hit, bit row * num_cols + column
+        self.hits = {name: 0 for name in ships}  # ship name -> bitmask of the hits on it
+        self.sunk = set()
+        self._masks = {}  # ship length -> bitmask of each of its placements
+        self.exact = None  # whether the last probabilities were counted exactly
+
+    def record_result(self, target: tuple, hit: bool, sunk: bool, ship_name=None):
+        row, column = target
+        cell = row * self.num_cols + column
+        self.shot[cell] = True
+        if not hit or ship_name not in self.hits:
+            # A hit on an unnamed ship can't be placed, so it only rules the cell out for the others
+            self.misses |= 1 << cell
+            return
+        self.hits[ship_name] |= 1 << cell
+        if sunk:
+            self.sunk.add(ship_name)
+
+    def masks(self, length: int) -> list:
+        if length not in self._masks:
+            cells = self.placements.placement_cells(length, np.arange(self.placements.placement_count(length)))
+            self._masks[length] = [sum(1 << int(cell) for cell in placement) for placement in cells]
+        return self._masks[length]
+
+    def candidates(self) -> list:
+        """Returns (length, placement numbers, bitmasks) for each ship afloat that may still go somewhere, fewest
+        placements first so the count branches as little as possible near its root."""
+        afloat_names = [name for name in self.ships if name not in self.sunk]
+        taken = self.misses
+        for name in self.sunk:
+            taken |= self.hits[name]
+        afloat = []
+        for name in afloat_names:
+            own_hits = self.hits[name]
+            blocked = taken
+            for other in afloat_names:
+                if other != name:
+                    blocked |= self.hits[other]
+            masks = self.masks(self.ships[name])
+            indexes = [index for index, mask in enumerate(masks) if not mask & blocked and mask & own_hits == own_hits]
+            afloat.append((self.ships[name], indexes, [masks[index] for index in indexes]))
+        return sorted(afloat, key=lambda ship: len(ship[1]))
+
+    def probabilities(self) -> np.ndarray:
+        """Returns the chance that each cell, as a flat row-major array, holds part of a ship afloat."""
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        afloat = self.candidates()
+        size = 1
+        for _, indexes, _ in afloat:
+            size *= max(len(indexes), 1)
+        if size <= self.EXACT_LIMIT:
+            try:
+                # Leave half the budget to sample in, should the count not finish
+                total, heat = self.count_exact(afloat, start + self.time_budget / 2)
+                if total:
+                    self.exact = True
+                    return heat / total
+            except OutOfTime:
+                pass
+        self.exact = False
+        total, heat = self.sample(afloat, deadline)
+        if total:
+            return heat / total
+        # No consistent fleet was drawn in time, so fall back to each ship's placements on their own
+        heat = np.zeros(self.num_rows * self.num_cols)
+        for length, indexes, _ in afloat:
+            if indexes:
+                cells = self.placements.placement_cells(length, np.array(indexes))
+                heat += np.bincount(cells.ravel(), minlength=len(heat)) / len(indexes)
+        return heat
+
+    def count_exact(self, afloat: list, deadline: float) -> tuple:
+        """Counts the fleets that fit, memoised on the ship reached and the cells the ships before it took.
+        Returns (number of fleets, number of fleets covering each cell)."""
+        num_cells = self.num_rows * self.num_cols
+        cells = [self.placements.placement_cells(length, np.array(indexes, dtype=np.int64))
+                 for length, indexes, _ in afloat]
+        memo = {}
+
+        def count(ship: int, occupied: int) -> tuple:
+            if ship == len(afloat):
+                return 1, None
+            key = (ship, occupied)
+            if key in memo:
+                return memo[key]
+            if time.perf_counter() > deadline:
+                raise OutOfTime
+            total = 0
+            heat = np.zeros(num_cells, dtype=np.int64)
+            for placement, mask in enumerate(afloat[ship][2]):
+                if mask & occupied:
+                    continue
+                fleets, rest_heat = count(ship + 1, occupied | mask)
+                if fleets:
+                    total += fleets
+                    heat[cells[ship][placement]] += fleets
+                    if rest_heat is not None:
+                        heat += rest_heat
+            memo[key] = total, heat
+            return memo[key]
+
+        total, heat = count(0, 0)
+        return total, (heat if heat is not None else np.zeros(num_cells))
+
+    def sample(self, afloat: list, deadline: float) -> tuple:
+        """Estimates the counts by drawing fleets ship by ship, each ship uniformly from the placements left
+        free by the ships before it. A fleet is weighted by the product of the number of choices each ship had,
+        which makes the weighted counts unbiased. Returns (total weight, weight covering each cell)."""
+        num_cells = self.num_rows * self.num_cols
+        num_words = (num_cells + 63) // 64
+        rng = np.random.default_rng(random.getrandbits(64))
+        tables = []
+        for length, indexes, masks in afloat:
+            words = np.array([[(mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for word in range(num_words)]
+                              for mask in masks], dtype=np.uint64).reshape(len(masks), num_words)
+            tables.append((words, self.placements.placement_cells(length, np.array(indexes, dtype=np.int64))))
+        total = 0.0
+        heat = np.zeros(num_cells)
+        drawn = 0
+        batch_seconds = 0.0
+        # Stop once another batch would overrun the deadline, but always draw at least one
+        while drawn < self.MAX_SAMPLES and (not drawn or time.perf_counter() + batch_seconds < deadline):
+            batch_start = time.perf_counter()
+            count = self.SAMPLE_BATCH
+            occupancy = np.zeros((count, num_words), dtype=np.uint64)
+            weight = np.ones(count)
+            chosen = []
+            for words, _ in tables:
+                if not len(words):
+                    weight[:] = 0
+                    break
+                conflict = np.zeros((count, len(words)), dtype=bool)
+                for word in range(num_words):
+                    conflict |= (occupancy[:, word, None] & words[None, :, word]) != 0
+                legal_so_far = np.cumsum(~conflict, axis=1, dtype=np.int32)
+                legal_count = legal_so_far[:, -1]
+                weight *= legal_count
+                pick = (rng.random(count) * legal_count).astype(np.int32)
+                # argmax is 0 where nothing is legal, and those fleets already weigh nothing
+                placement = np.argmax(legal_so_far > pick[:, None], axis=1)
+                occupancy |= words[placement]
+                chosen.append(placement)
+            drawn += count
+            if weight.any():
+                total += weight.sum()
+                for (words, cells), placement in zip(tables, chosen):
+                    heat += np.bincount(cells[placement].ravel(), weights=np.repeat(weight, cells.shape[1]),
+                                        minlength=num_cells)
+            batch_seconds = time.perf_counter() - batch_start
+        return total, heat
+
+    def next_target(self) -> tuple:
+        """Returns the untried cell most likely to hold a ship, breaking ties at random."""
+        chances = np.where(self.shot, -1.0, self.probabilities())
+        best = np.flatnonzero(chances == chances.max())
+        return divmod(int(random.choice(best)), self.num_cols)
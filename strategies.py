@@ -0,0 +1,61 @@
+# Computer players implementing engine.Strategy, registered by name in STRATEGIES for tournament.py and play_game.
+# EnemyAi provides "hunt", "density" and "perfect"; the strategies here are baselines to measure it against.
+
+from engine import EnemyAi, Strategy, UntriedCells
+
+
+class RandomStrategy(Strategy):
+    """Fires at a random untried cell every turn, ignoring its hits. The baseline every other strategy
+    should beat by a wide margin."""
+    def enemy_turn(self):
+        pick = self.random_pick()
+        self.remove_available_cell(pick)
+        return pick
+
+    def record_result(self, target: tuple, hit: bool, sunk: bool, ship_name=None):
+        pass
+
+
+class ParityStrategy(EnemyAi):
+    """EnemyAi's hunt/target heuristics, but searching only the cells of one colour of a checkerboard while no
+    ship is being chased. A ship at least 2 long always covers a cell of either colour, so the search needs about
+    half as many shots; once that colour is used up it moves on to the rest, where the 1 cell Aeroplane may be."""
+    # Draws made on a board too big to list its cells before giving up on finding an untried cell of the colour
+    SPARSE_DRAWS = 32
+
+    def __init__(self, grid, fleet=None):
+        super().__init__(grid, "hunt", fleet=fleet)
+        self.parity_cells = None
+        if isinstance(self.available_cells, UntriedCells):
+            self.parity_cells = UntriedCells(cell for cell in self.available_cells if sum(cell) % 2 == 0)
+
+    def random_pick(self):
+        if self.parity_cells is None:
+            for _ in range(self.SPARSE_DRAWS):
+                cell = super().random_pick()
+                if sum(cell) % 2 == 0:
+                    return cell
+        elif self.parity_cells:
+            return self.parity_cells.random_pick()
+        return super().random_pick()
+
+    def remove_available_cell(self, cell):
+        super().remove_available_cell(cell)
+        if self.parity_cells is not None and cell in self.parity_cells:
+            self.parity_cells.remove(cell)
+
+
+def hunt(grid, fleet=None):
+    return EnemyAi(grid, "hunt", fleet=fleet)
+
+
+def density(grid, fleet=None):
+    return EnemyAi(grid, "density", fleet=fleet)
+
+
+def perfect(grid, fleet=None):
+    return EnemyAi(grid, "perfect", fleet=fleet)
+
+
+# Strategy name -> callable taking a board and a fleet and returning the Strategy playing on it
+STRATEGIES = {"random": RandomStrategy, "hunt": hunt, "parity": ParityStrategy, "density": density, "perfect": perfect}
@@ -0,0 +1,109 @@
+# Probability density targeting for EnemyAi.
+# Every placement of every ship still afloat that fits the shots taken so far adds weight to the cells it covers,
+# and the AI fires at the heaviest untried cell. After each shot only the placements covering that cell change,
+# so the heatmap is updated in place rather than rebuilt.
+
+import random
+
+import numpy as np
+
+from placement import placement_engine
+
+
+class DensityTargeter:
+    """Heatmap of the legal placements of the opponent's remaining ships on a num_rows x num_cols board.
+    Placements are numbered as in PlacementEngine. Targets are (row, column) tuples, as used by EnemyAi."""
+    # Each unsunk hit a placement covers multiplies its weight, so once a ship is hit the AI concentrates
+    # on the cells that could finish it
+    HIT_WEIGHT = 50.0
+
+    def __init__(self, num_rows: int, num_cols: int, lengths: tuple):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.placements = placement_engine(num_rows, num_cols, tuple(lengths))
+        self.remaining = {}  # ship length -> number of ships of that length still afloat
+        for length in lengths:
+            self.remaining[length] = self.remaining.get(length, 0) + 1
+        self.blocked = {}  # ship length -> per placement count of misses and sunk cells it covers
+        self.hit_counts = {}  # ship length -> per placement count of unsunk hits it covers
+        self.length_heat = {}  # ship length -> heat from one ship of that length
+        self.heat = np.zeros(num_rows * num_cols)
+        self.shot = np.zeros(num_rows * num_cols, dtype=bool)
+        self.hit = np.zeros(num_rows * num_cols, dtype=bool)
+        self._covering = {}  # (length, row, column) -> array of placement numbers
+        for length, count in self.remaining.items():
+            placement_count = self.placements.placement_count(length)
+            self.blocked[length] = np.zeros(placement_count, dtype=np.int32)
+            self.hit_counts[length] = np.zeros(placement_count, dtype=np.int32)
+            cells = self.placements.placement_cells(length, np.arange(placement_count))
+            self.length_heat[length] = np.bincount(cells.ravel(), minlength=num_rows * num_cols).astype(float)
+            self.heat += count * self.length_heat[length]
+
+    def covering(self, length: int, row: int, column: int) -> np.ndarray:
+        key = (length, row, column)
+        if key not in self._covering:
+            self._covering[key] = np.array(self.placements.covering(length, row, column), dtype=np.int64)
+        return self._covering[key]
+
+    def weights(self, length: int, indexes: np.ndarray) -> np.ndarray:
+        return (self.blocked[length][indexes] == 0) * self.HIT_WEIGHT ** self.hit_counts[length][indexes]
+
+    def update_placements(self, cells: list, blocked_change: int, hit_change: int):
+        """Adjusts the counters of every placement covering each (row, column) in cells, and moves the heat
+        accordingly."""
+        for length, count in self.remaining.items():
+            if len(cells) == 1:
+                indexes = unique = self.covering(length, *cells[0])
+            else:
+                indexes = np.concatenate([self.covering(length, row, column) for row, column in cells])
+                unique = np.unique(indexes)
+            if not len(indexes):
+                continue
+            before = self.weights(length, unique)
+            # add.at counts a placement once for every cell of it being updated
+            np.add.at(self.blocked[length], indexes, blocked_change)
+            np.add.at(self.hit_counts[length], indexes, hit_change)
+            change = self.weights(length, unique) - before
+            changed = change != 0
+            if changed.any():
+                cells_changed = self.placements.placement_cells(length, unique[changed]).ravel()
+                per_cell = np.repeat(change[changed], length)
+                np.add.at(self.length_heat[length], cells_changed, per_cell)
+                np.add.at(self.heat, cells_changed, count * per_cell)
+
+    def next_target(self) -> tuple:
+        """Returns the untried cell with the most weight, breaking ties at random."""
+        heat = np.where(self.shot, -np.inf, self.heat)
+        best = np.flatnonzero(heat == heat.max())
+        return divmod(int(random.choice(best)), self.num_cols)
+
+    def find_sunk_ship(self, row: int, column: int, length: int) -> list:
+        """Returns the cells of the ship of the given length just sunk at (row, column): a legal placement
+        through that cell made up entirely of unsunk hits. Falls back to the single cell if none fits."""
+        indexes = self.covering(length, row, column)
+        cells = self.placements.placement_cells(length, indexes)
+        candidates = np.flatnonzero((self.blocked[length][indexes] == 0) & self.hit[cells].all(axis=1))
+        if not len(candidates):
+            return [(row, column)]
+        return [divmod(int(cell), self.num_cols) for cell in cells[candidates[0]]]
+
+    def record_result(self, target: tuple, hit: bool, sunk: bool, ship_length=None):
+        """Updates the heatmap with the outcome of a shot at target. ship_length is the length of the ship
+        sunk, if any, so it can be taken out of the remaining fleet."""
+        row, column = target
+        self.shot[row * self.num_cols + column] = True
+        if not hit:
+            self.update_placements([target], 1, 0)
+            return
+        self.hit[row * self.num_cols + column] = True
+        self.update_placements([target], 0, 1)
+        if sunk and ship_length in self.remaining:
+            # The sunk ship's cells can no longer hold any other ship and stop counting as open hits
+            sunk_cells = self.find_sunk_ship(row, column, ship_length)
+            for sunk_row, sunk_column in sunk_cells:
+                self.hit[sunk_row * self.num_cols + sunk_column] = False
+            self.update_placements(sunk_cells, 1, -1)
+            self.heat -= self.length_heat[ship_length]
+            self.remaining[ship_length] -= 1
+            if not self.remaining[ship_length]:
+                del self.remaining[ship_length]
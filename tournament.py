@@ -0,0 +1,159 @@
+# Round-robin tournament between the strategies in strategies.py, played on every CPU core. Run with:
+# python tournament.py [games_per_pairing] [seed] [--strategies NAME ...] [--workers N] [--config PATH]
+# Every pair of strategies plays games_per_pairing games, half with each firing first. Games are played out, so
+# each side's shot count is the number of shots it needed to sink the other's fleet, whether it won or not.
+
+import argparse
+import itertools
+import math
+from multiprocessing import Pool
+import os
+import random
+import time
+
+from config import DEFAULT_CONFIG, GameConfig
+from engine import BitBoard, Board, play_game
+from strategies import STRATEGIES
+
+CHUNK_GAMES = 500  # games per task handed to a worker
+Z_95 = 1.96
+BITBOARD_CELLS = 1024  # largest board played on BitBoards, larger ones use Board
+# Strategies played when --strategies isn't given. perfect takes over a second a game, so it has to be asked for
+DEFAULT_STRATEGIES = [name for name in STRATEGIES if name != "perfect"]
+
+
+class ShotStats:
+    """Count, sum and sum of squares of shots-to-win, which merge exactly across workers."""
+    __slots__ = ("count", "total", "total_squares")
+
+    def __init__(self, count=0, total=0, total_squares=0):
+        self.count = count
+        self.total = total
+        self.total_squares = total_squares
+
+    def add(self, shots: int):
+        self.count += 1
+        self.total += shots
+        self.total_squares += shots * shots
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def variance(self) -> float:
+        """Sample variance."""
+        if self.count < 2:
+            return 0.0
+        return (self.total_squares - self.total * self.total / self.count) / (self.count - 1)
+
+    def confidence_interval(self) -> tuple:
+        """95% confidence interval of the mean."""
+        half_width = Z_95 * math.sqrt(self.variance() / self.count) if self.count else 0.0
+        return self.mean() - half_width, self.mean() + half_width
+
+
+def play_chunk(task: tuple) -> tuple:
+    """Plays one task's games in a worker and returns (first, second, wins of first, ShotStats of first,
+    ShotStats of second). Each game's seed is drawn from one seeded from the task, so a tournament is
+    reproducible however its tasks are spread over the workers."""
+    first, second, chunk, num_games, seed, num_rows, num_cols, fleet = task
+    rng = random.Random(f"{seed}:{first}:{second}:{chunk}")
+    players = (STRATEGIES[first], STRATEGIES[second])
+    # Board only stores ships and shots, so it stays quick on very large boards where BitBoard doesn't
+    board_class = BitBoard if num_rows * num_cols <= BITBOARD_CELLS else Board
+    wins = 0
+    stats = (ShotStats(), ShotStats())
+    for _ in range(num_games):
+        result = play_game(rng.getrandbits(64), num_rows, num_cols, board_class, players, play_out=True, fleet=fleet)
+        wins += result.winner == 0
+        stats[0].add(result.shots[0])
+        stats[1].add(result.shots[1])
+    return first, second, wins, stats[0], stats[1]
+
+
+def make_tasks(names: list, games_per_pairing: int, seed: int, num_rows: int, num_cols: int, fleet=None) -> list:
+    """Splits each ordered pairing's half of the games into tasks of at most CHUNK_GAMES games."""
+    tasks = []
+    for first, second in itertools.permutations(names, 2):
+        num_games = games_per_pairing // 2 if first < second else games_per_pairing - games_per_pairing // 2
+        for chunk, start in enumerate(range(0, num_games, CHUNK_GAMES)):
+            tasks.append((first, second, chunk, min(CHUNK_GAMES, num_games - start), seed, num_rows, num_cols,
+                          fleet))
+    return tasks
+
+
+def run_tournament(names: list, games_per_pairing: int, seed=0, workers=None, num_rows=10, num_cols=10,
+                   fleet=None) -> tuple:
+    """Plays the round-robin and returns (ShotStats per strategy, wins, games), where wins[a, b] and
+    games[a, b] count the games between a and b and how many of them a won. fleet maps ship names to lengths,
+    by default the ships in SHIPS."""
+    stats = {name: ShotStats() for name in names}
+    wins = {pairing: 0 for pairing in itertools.permutations(names, 2)}
+    games = dict(wins)
+    with Pool(workers or os.cpu_count()) as pool:
+        for first, second, first_wins, first_stats, second_stats in pool.imap_unordered(
+                play_chunk, make_tasks(names, games_per_pairing, seed, num_rows, num_cols, fleet)):
+            stats[first].merge(first_stats)
+            stats[second].merge(second_stats)
+            wins[first, second] += first_wins
+            wins[second, first] += first_stats.count - first_wins
+            games[first, second] += first_stats.count
+            games[second, first] += first_stats.count
+    return stats, wins, games
+
+
+def report(names: list, stats: dict, wins: dict, games: dict):
+    print(f"{'strategy':<10}{'games':>9}{'win %':>8}{'mean':>8}{'variance':>10}{'stdev':>7}   95% CI")
+    for name in sorted(names, key=lambda name: stats[name].mean()):
+        shot_stats = stats[name]
+        won = sum(wins[name, other] for other in names if other != name)
+        low, high = shot_stats.confidence_interval()
+        print(f"{name:<10}{shot_stats.count:>9}{won / shot_stats.count:>8.1%}{shot_stats.mean():>8.2f}"
+              f"{shot_stats.variance():>10.2f}{math.sqrt(shot_stats.variance()):>7.2f}   {low:.2f} - {high:.2f}")
+    print()
+    print("Win rate of each row against each column, +/- its 95% confidence interval")
+    print(f"{'':<10}" + "".join(f"{name:>16}" for name in names))
+    for name in names:
+        cells = []
+        for other in names:
+            if other == name:
+                cells.append(f"{'-':>16}")
+                continue
+            rate = wins[name, other] / games[name, other]
+            half_width = Z_95 * math.sqrt(rate * (1 - rate) / games[name, other])
+            cells.append(f"{rate:>9.1%} +/-{half_width:>4.1%}")
+        print(f"{name:<10}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a round-robin tournament between computer strategies.")
+    parser.add_argument("games_per_pairing", type=int, nargs="?", default=10000)
+    parser.add_argument("seed", type=int, nargs="?", default=0)
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), default=DEFAULT_STRATEGIES,
+                        help="strategies to play, by default all but perfect")
+    parser.add_argument("--workers", type=int, default=None, help="processes to play in, by default one per core")
+    parser.add_argument("--config", metavar="PATH", help="JSON board size and fleet (see config.py)")
+    args = parser.parse_args()
+    try:
+        config = GameConfig.load(args.config) if args.config else DEFAULT_CONFIG
+    except (OSError, ValueError) as error:
+        parser.error(f"can't use {args.config}: {error}")
+    names = list(dict.fromkeys(args.strategies))
+    if len(names) < 2:
+        parser.error("a tournament needs at least two strategies")
+    start = time.perf_counter()
+    stats, wins, games = run_tournament(names, args.games_per_pairing, args.seed, args.workers, config.num_rows,
+                                        config.num_cols, config.fleet)
+    elapsed = time.perf_counter() - start
+    total_games = sum(games[pairing] for pairing in itertools.combinations(names, 2))
+    print(f"{total_games} games in {elapsed:.2f}s ({total_games / elapsed:.0f} games/sec) "
+          f"on {args.workers or os.cpu_count()} processes")
+    report(names, stats, wins, games)
+
+
+if __name__ == '__main__':
+    main()